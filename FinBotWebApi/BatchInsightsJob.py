@@ -0,0 +1,57 @@
+"""
+Command line runner for batch insight jobs (Services/BatchInsights.py), e.g. the nightly spending
+insights for every user, without going through the HTTP endpoint.
+
+Input is NDJSON with one item per line: {"id": "...", "userId": "...", "authToken": "...",
+"prompt": "optional instruction"}. Results are appended to --output as they finish; the file is
+also the checkpoint, so running the same command again after an interruption only processes the
+items that have no successful result yet. Progress (throughput and ETA) goes to stderr.
+
+Usage (from the FinBotWebApi directory):
+    python BatchInsightsJob.py --input items.ndjson --output insights.ndjson [--fetch-concurrency 8] [--llm-concurrency 4]
+"""
+import sys
+import asyncio
+import argparse
+from contextlib import aclosing
+from typing import List
+
+from FinBotWebApi import app, lifespan, run_tool_call, READ_ONLY_TOOLS
+from Services.BatchInsights import BATCH_FETCH_CONCURRENCY, BATCH_LLM_CONCURRENCY, BatchCheckpoint, BatchJob, read_items
+from Services.LlmScheduler import LLM_SCHEDULER
+
+async def run_job(args: argparse.Namespace) -> int:
+    items = read_items(args.input, args.prompt)
+    checkpoint = BatchCheckpoint(args.output)
+    job = BatchJob(items, run_tool_call, READ_ONLY_TOOLS, checkpoint.completed_ids(), args.fetch_concurrency, args.llm_concurrency)
+    # The job is the only LLM user of this process, so the scheduler may hand it every slot it asks for.
+    LLM_SCHEDULER.max_concurrency = max(LLM_SCHEDULER.max_concurrency, job.llm_concurrency)
+    print(f"{len(items)} items, {job.progress.skipped} already done; writing to {args.output}", file=sys.stderr)
+    async with lifespan(app):
+        try:
+            async with aclosing(job.run()) as records:
+                async for record in records:
+                    if record["type"] == "result":
+                        checkpoint.append(record)
+                    else:
+                        print(job.progress.describe(), file=sys.stderr)
+        finally:
+            checkpoint.close()
+    return 1 if job.progress.failed else 0
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Generate insight messages for many users (resumable)")
+    parser.add_argument("--input", required=True, help="NDJSON items: id, userId, authToken and optionally prompt.")
+    parser.add_argument("--output", required=True, help="NDJSON results, also the checkpoint: rerun with the same file to resume.")
+    parser.add_argument("--prompt", default=None, help="Instruction for items without their own.")
+    parser.add_argument("--fetch-concurrency", type=int, default=BATCH_FETCH_CONCURRENCY, help="FinTrack tool calls in flight.")
+    parser.add_argument("--llm-concurrency", type=int, default=BATCH_LLM_CONCURRENCY, help="Ollama generations in flight.")
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(run_job(args))
+    except KeyboardInterrupt:
+        print(f"Interrupted; run the same command again to resume from {args.output}.", file=sys.stderr)
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+"""
+Concurrency load test for the /chat endpoint.
+
+Starts the fake Ollama (Benchmarks/FakeOllama.py) with a fixed generation latency and a FinBot
+instance pointed at it, then fires conversational (no tool) chats at increasing concurrency
+levels and reports throughput. With a non-blocking pipeline, throughput should grow
+roughly linearly with concurrency until the fake latency is no longer the bottleneck.
+
+With --workers, FinBot is started under gunicorn (gunicorn.conf.py) once per worker count
+and the fake Ollama runs in its own processes. Use --latency 0 to measure the non-LLM part
+of the pipeline: throughput should then scale with the worker count up to the number of
+free cores (leave some for the fake Ollama and the --clients load generator processes).
+After each run the merged /metrics must count every chat sent, whichever worker served it.
+
+Benchmarks/LoadDriver.py replays tool and confirmation scenarios and reports per-stage latencies.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.ChatLoadTest --latency 0.5 --requests 64 --concurrency 1 2 4 8 16
+    python -m Benchmarks.ChatLoadTest --latency 0 --requests 2000 --concurrency 64 --workers 1 2 4 --clients 2
+"""
+import os
+import re
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import httpx
+
+from Benchmarks.FakeOllama import FakeOllamaConfig, build_fake_ollama
+from Benchmarks.LoadDriver import FAKE_OLLAMA_PORT, FINBOT_PORT, start_fake_ollama, start_process, start_server, stop_process
+
+def fake_ollama_config(latency: float) -> FakeOllamaConfig:
+    """A fixed latency per generation and no prefill or decode time, so --latency is all the model costs."""
+    return FakeOllamaConfig(latency=latency, latency_distribution="fixed", token_rate=0, prompt_rate=0)
+
+async def run_chats(base_url: str, concurrency: int, first_index: int, count: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        async def one_chat(index: int) -> None:
+            async with semaphore:
+                response = await client.post("/chat", json={
+                    "userId": f"load-user-{index % concurrency}",
+                    "clientChatSessionId": f"load-session-{index}",
+                    "message": "Hello FinBot!",
+                    "history": [],
+                })
+                response.raise_for_status()
+
+        await asyncio.gather(*(one_chat(i) for i in range(first_index, first_index + count)))
+
+def _client_process(base_url: str, concurrency: int, first_index: int, count: int) -> None:
+    asyncio.run(run_chats(base_url, concurrency, first_index, count))
+
+def run_level(base_url: str, concurrency: int, total_requests: int, clients: int, offset: int) -> float:
+    """Sends `total_requests` chats with `concurrency` in flight, split over `clients` load generator processes."""
+    start = time.perf_counter()
+    if clients <= 1:
+        asyncio.run(run_chats(base_url, concurrency, offset, total_requests))
+    else:
+        shares = [total_requests // clients + (1 if client < total_requests % clients else 0) for client in range(clients)]
+        with ProcessPoolExecutor(max_workers=clients) as pool:
+            futures = [pool.submit(_client_process, base_url, max(1, concurrency // clients), offset + sum(shares[:client]), share)
+                       for client, share in enumerate(shares)]
+            for future in futures:
+                future.result()
+    return time.perf_counter() - start
+
+def counted_chats(base_url: str) -> Optional[float]:
+    """finbot_messages_processed_total as reported by /metrics (merged over all workers)."""
+    match = re.search(r"^finbot_messages_processed_total (\S+)$", httpx.get(f"{base_url}/metrics", timeout=10).text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+def run_levels(base_url: str, args: argparse.Namespace, label: str = "") -> int:
+    sent = 0
+    for concurrency in args.concurrency:
+        elapsed = run_level(base_url, concurrency, args.requests, args.clients, sent)
+        sent += args.requests
+        print(f"{label}{concurrency:>12} {args.requests:>9} {elapsed:>11.2f} {args.requests / elapsed:>9.2f}")
+    return sent
+
+def run_workers(args: argparse.Namespace) -> None:
+    """Starts FinBot under gunicorn for every worker count and compares throughput."""
+    fake_ollama = start_fake_ollama(fake_ollama_config(args.latency), args.ollama_workers or max(args.workers))
+    print(f"{'workers':>7} {'concurrency':>12} {'requests':>9} {'elapsed(s)':>11} {'chats/s':>9}   merged /metrics count")
+    try:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory(prefix="finbot-prometheus-") as metrics_dir, tempfile.TemporaryDirectory(prefix="finbot-history-") as history_dir:
+                finbot_env = dict(os.environ, FINBOT_WORKERS=str(workers), FINBOT_PORT=str(FINBOT_PORT), PROMETHEUS_MULTIPROC_DIR=metrics_dir,
+                                  OLLAMA_API_URL=f"http://127.0.0.1:{FAKE_OLLAMA_PORT}", FINBOT_RESPONSE_CACHE_ENABLED="false",
+                                  FINBOT_HISTORY_SQLITE_PATH=os.path.join(history_dir, "sessions.db"), FINBOT_LLM_MAX_CONCURRENCY="64")
+                base_url = f"http://127.0.0.1:{FINBOT_PORT}"
+                finbot = start_process([sys.executable, "-m", "gunicorn", "FinBotWebApi:app", "--config", "gunicorn.conf.py"],
+                                       finbot_env, f"{base_url}/metrics")
+                try:
+                    sent = run_levels(base_url, args, label=f"{workers:>7}")
+                    counted = counted_chats(base_url)
+                    print(f"{'':>7} {'':>12} {'':>9} {'':>11} {'':>9}   {counted:.0f} of {sent}" + ("" if counted == sent else "  MISMATCH"))
+                finally:
+                    stop_process(finbot)
+    finally:
+        stop_process(fake_ollama)
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="FinBot /chat concurrency load test")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake Ollama generation latency in seconds.")
+    parser.add_argument("--requests", type=int, default=64, help="Number of chats sent per concurrency level.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--target", default=None, help="Base URL of an already running FinBot. Starts a local one with a fake Ollama if omitted.")
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Start FinBot under gunicorn with each of these worker counts.")
+    parser.add_argument("--ollama-workers", type=int, default=None, help="Processes serving the fake Ollama in --workers mode (default: the largest worker count).")
+    parser.add_argument("--clients", type=int, default=1, help="Load generator processes.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    arguments = parse_args(sys.argv[1:])
+    if arguments.workers:
+        run_workers(arguments)
+        sys.exit(0)
+    if arguments.target is None:
+        os.environ["OLLAMA_API_URL"] = f"http://127.0.0.1:{FAKE_OLLAMA_PORT}"
+        start_server(build_fake_ollama(fake_ollama_config(arguments.latency)), FAKE_OLLAMA_PORT)
+        from FinBotWebApi import app as finbot_app
+        start_server(finbot_app, FINBOT_PORT)
+        arguments.target = f"http://127.0.0.1:{FINBOT_PORT}"
+    print(f"{'concurrency':>12} {'requests':>9} {'elapsed(s)':>11} {'chats/s':>9}")
+    run_levels(arguments.target, arguments)
@@ -0,0 +1,205 @@
+"""
+Stand-in for the FinTrack API (ASP.NET + Postgres) serving synthetic accounts, budgets,
+categories, memberships and transactions, so FinBot's tools can be load tested on one machine.
+
+Data is generated deterministically per user and request and transaction lists are streamed in
+chunks, so the server itself stays small at any size. Sizes are set per server (--transactions)
+and can be overridden per user: a bearer token of the form "bench-<count>[-anything]" gets
+<count> transactions, e.g. "bench-50000-7" for a user with a long history. Requests without a
+bearer token are answered with 401, like the real API.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.FakeFinTrackApi --port 8098 --transactions 500 --latency 0.01
+"""
+import os
+import re
+import sys
+import json
+import zlib
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Body, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from Benchmarks.TransactionAnalyticsBenchmark import ACCOUNTS, CATEGORIES, CURRENCIES, synthetic_transactions
+
+CHUNK_TRANSACTIONS = 1000
+_SIZED_TOKEN = re.compile(r"^bench-(\d+)")
+
+@dataclass
+class FakeFinTrackConfig:
+    transactions: int = 500
+    budgets: int = 6
+    # Added to every request, like a database round trip.
+    latency: float = 0.01
+    seed: int = 7
+
+    @classmethod
+    def from_env(cls) -> "FakeFinTrackConfig":
+        return cls(
+            transactions=int(os.getenv("FINBOT_FAKE_FINTRACK_TRANSACTIONS", "500")),
+            budgets=int(os.getenv("FINBOT_FAKE_FINTRACK_BUDGETS", "6")),
+            latency=float(os.getenv("FINBOT_FAKE_FINTRACK_LATENCY", "0.01")),
+            seed=int(os.getenv("FINBOT_FAKE_FINTRACK_SEED", "7")),
+        )
+
+    def to_env(self) -> Dict[str, str]:
+        return {
+            "FINBOT_FAKE_FINTRACK_TRANSACTIONS": str(self.transactions),
+            "FINBOT_FAKE_FINTRACK_BUDGETS": str(self.budgets),
+            "FINBOT_FAKE_FINTRACK_LATENCY": str(self.latency),
+            "FINBOT_FAKE_FINTRACK_SEED": str(self.seed),
+        }
+
+def synthetic_accounts(rng: random.Random) -> List[Dict[str, Any]]:
+    return [{"id": account["id"], "name": account["name"], "type": "Savings" if account["name"] == "Savings" else "Checking",
+             "isActive": True, "balance": rng.randrange(0, 10_000_000) / 100, "currency": rng.choice(CURRENCIES),
+             "createdAtUtc": "2024-01-01T00:00:00"} for account in ACCOUNTS]
+
+def synthetic_budgets(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    budgets = []
+    for index in range(1, count + 1):
+        name, _ = CATEGORIES[(index - 1) % len(CATEGORIES)]
+        allocated = rng.randrange(100, 5000)
+        budgets.append({"id": index, "name": f"{name} budget", "description": f"Monthly {name.lower()} limit", "category": name,
+                        "allocatedAmount": allocated, "reachedAmount": round(allocated * rng.random(), 2), "currency": rng.choice(CURRENCIES),
+                        "startDate": "2026-10-01T00:00:00", "endDate": "2026-10-31T00:00:00", "isActive": True})
+    return budgets
+
+MEMBERSHIP_PLANS = [
+    {"id": 1, "name": "Free", "price": 0, "currency": "USD", "billingCycle": "Monthly", "description": "Basic tracking"},
+    {"id": 2, "name": "Plus", "price": 5, "currency": "USD", "billingCycle": "Monthly", "description": "Budgets and reports"},
+    {"id": 3, "name": "Pro", "price": 50, "currency": "USD", "billingCycle": "Yearly", "description": "Everything, for power users"},
+]
+
+def build_fake_fintrack(config: FakeFinTrackConfig) -> FastAPI:
+    fake_fintrack = FastAPI(title="Fake FinTrack API")
+
+    def user_seed(request: Request) -> int:
+        return config.seed ^ zlib.crc32(request.headers.get("Authorization", "").encode())
+
+    def transaction_count(request: Request) -> int:
+        sized = _SIZED_TOKEN.match(request.headers.get("Authorization", "").removeprefix("Bearer "))
+        return int(sized.group(1)) if sized else config.transactions
+
+    def stream_transactions(size: int, rng: random.Random, account: Optional[Dict[str, Any]] = None) -> StreamingResponse:
+        async def body() -> AsyncIterator[bytes]:
+            yield b"["
+            for first_id in range(0, size, CHUNK_TRANSACTIONS):
+                chunk = synthetic_transactions(min(CHUNK_TRANSACTIONS, size - first_id), rng, first_id)
+                if account is not None:
+                    for transaction in chunk:
+                        transaction["account"] = account
+                yield (b"," if first_id else b"") + json.dumps(chunk)[1:-1].encode()
+                # Let other requests interleave with a large body, as a database cursor would.
+                await asyncio.sleep(0)
+            yield b"]"
+        return StreamingResponse(body(), media_type="application/json")
+
+    @fake_fintrack.middleware("http")
+    async def authenticate(request: Request, call_next):
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return JSONResponse({"message": "Unauthorized"}, status_code=401)
+        if config.latency:
+            await asyncio.sleep(config.latency)
+        return await call_next(request)
+
+    @fake_fintrack.get("/Account")
+    async def accounts(request: Request):
+        return synthetic_accounts(random.Random(user_seed(request)))
+
+    @fake_fintrack.get("/Account/{account_id}")
+    async def account(account_id: int, request: Request):
+        found = [item for item in synthetic_accounts(random.Random(user_seed(request))) if item["id"] == account_id]
+        return found[0] if found else JSONResponse(f"Account {account_id} not found.", status_code=404)
+
+    @fake_fintrack.post("/Account")
+    async def create_account(payload: dict = Body(...)):
+        return {"id": len(ACCOUNTS) + 1, "isActive": True, "balance": 0, **payload}
+
+    @fake_fintrack.get("/Budgets")
+    async def budgets(request: Request):
+        return synthetic_budgets(config.budgets, random.Random(user_seed(request)))
+
+    @fake_fintrack.get("/Budgets/{budget_id}")
+    async def budget(budget_id: int, request: Request):
+        found = [item for item in synthetic_budgets(config.budgets, random.Random(user_seed(request))) if item["id"] == budget_id]
+        return found[0] if found else JSONResponse(f"Budget {budget_id} not found.", status_code=404)
+
+    @fake_fintrack.post("/Budgets")
+    async def create_budget(payload: dict = Body(...)):
+        return {"id": config.budgets + 1, "reachedAmount": 0, "isActive": True, **payload}
+
+    @fake_fintrack.get("/Categories")
+    async def categories():
+        return [{"id": index, "name": name} for index, (name, kind) in enumerate(CATEGORIES) if kind == "Expense"]
+
+    @fake_fintrack.get("/TransactionCategory")
+    async def transaction_categories():
+        return [{"id": index, "name": name, "type": kind} for index, (name, kind) in enumerate(CATEGORIES)]
+
+    @fake_fintrack.post("/TransactionCategory")
+    async def create_transaction_category(payload: dict = Body(...)):
+        return {"id": len(CATEGORIES), **payload}
+
+    @fake_fintrack.get("/Transactions")
+    async def transactions(request: Request):
+        return stream_transactions(transaction_count(request), random.Random(user_seed(request)))
+
+    @fake_fintrack.get("/Transactions/account-id/{account_id}")
+    async def account_transactions(account_id: int, request: Request):
+        found = [item for item in ACCOUNTS if item["id"] == account_id]
+        if not found:
+            return JSONResponse(f"Account {account_id} not found.", status_code=404)
+        return stream_transactions(transaction_count(request) // len(ACCOUNTS), random.Random(user_seed(request) + account_id), found[0])
+
+    @fake_fintrack.post("/Transactions")
+    async def create_transaction(payload: dict = Body(...)):
+        return {"id": config.transactions + 1, **payload}
+
+    @fake_fintrack.get("/Membership/plans")
+    async def membership_plans():
+        return MEMBERSHIP_PLANS
+
+    @fake_fintrack.get("/Membership/current")
+    async def current_membership():
+        return {"id": 11, "planName": "Plus", "status": "Active", "startDate": "2026-10-01T00:00:00", "endDate": "2026-11-01T00:00:00", "autoRenew": True}
+
+    @fake_fintrack.get("/Membership/history")
+    async def membership_history():
+        return [{"id": 10, "planName": "Free", "status": "Expired", "startDate": "2026-01-01T00:00:00", "endDate": "2026-10-01T00:00:00"},
+                {"id": 11, "planName": "Plus", "status": "Active", "startDate": "2026-10-01T00:00:00", "endDate": "2026-11-01T00:00:00"}]
+
+    @fake_fintrack.post("/Membership/create-checkout-session")
+    async def checkout(payload: dict = Body(...)):
+        return {"checkoutUrl": f"https://checkout.example.com/session/{payload.get('planId', 0)}"}
+
+    @fake_fintrack.post("/Membership/{membership_id}/cancel")
+    async def cancel(membership_id: int):
+        return {"message": f"Membership {membership_id} cancelled."}
+
+    return fake_fintrack
+
+# Served by `uvicorn Benchmarks.FakeFinTrackApi:app` (the command line below sets its environment).
+app = build_fake_fintrack(FakeFinTrackConfig.from_env())
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    defaults = FakeFinTrackConfig()
+    parser = argparse.ArgumentParser(description="Fake FinTrack API server for FinBot benchmarks")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--transactions", type=int, default=defaults.transactions, help="Transactions per user (bench-<count> tokens override it).")
+    parser.add_argument("--budgets", type=int, default=defaults.budgets)
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Seconds added to every request.")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    import uvicorn
+    arguments = parse_args(sys.argv[1:])
+    os.environ.update(FakeFinTrackConfig(arguments.transactions, arguments.budgets, arguments.latency, arguments.seed).to_env())
+    uvicorn.run("Benchmarks.FakeFinTrackApi:app", host="127.0.0.1", port=arguments.port, workers=arguments.workers, log_level="warning")
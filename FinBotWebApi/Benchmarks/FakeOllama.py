@@ -0,0 +1,318 @@
+"""
+Stand-in for Ollama's /api/generate, so FinBot can be load tested without a GPU or a model.
+
+Every generation waits for a sampled first-token latency plus a prefill time proportional to
+the new prompt tokens (--prompt-rate), then emits its reply at --token-rate tokens per second,
+streamed as NDJSON chunks or returned at once, with the statistics Ollama puts in its final
+chunk. Returned contexts are remembered, so a request that resumes one only prefills its new
+text (as with the real server) and scripted replies can still see the earlier turns.
+
+A model named for the first time in a worker process takes --load-time seconds to "load"
+(reported as load_duration, like Ollama after a deploy or an unload), and --model-speeds makes
+some models faster, e.g. "phi3:mini=3" for a small model three times as fast as the default.
+A request without a prompt only loads the model, like Ollama's preload request.
+
+Replies come from a script: an ordered list of rules
+    {"stage": "plan" | "forced_tool" | "agent_step" | "summarize", "match": "<regex>", "response": "..."}
+where `match` is searched (case-insensitively) in the user request the stage is about and
+"{request}" in the response is replaced by that request (JSON-escaped). The first matching rule
+wins; DEFAULT_SCRIPT covers the LoadDriver scenarios.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.FakeOllama --port 11500 --latency 0.05 --token-rate 40 [--workers 2] [--script rules.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Body
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MODEL_NAME = "mistral:instruct"
+CHARS_PER_TOKEN = 4
+CONFIRMATIONS = frozenset({"yes", "yep", "ok", "okay", "proceed", "sure", "do it"})
+REMEMBERED_CONTEXTS = 10000
+
+DEFAULT_SCRIPT: List[Dict[str, str]] = [
+    {"stage": "plan", "match": r"\b(how (do|can) i|what is|is there)\b",
+     "response": '```json\n{"name": "get_application_faq", "arguments": {"query": "{request}"}}\n```'},
+    {"stage": "plan", "match": r"spen(d|t)|breakdown",
+     "response": '```json\n{"name": "get_spending_breakdown", "arguments": {"categoryType": "Expense"}}\n```'},
+    {"stage": "plan", "match": r"budget",
+     "response": "To answer that, I'll fetch your budgets and their progress. Is that okay?"},
+    {"stage": "plan", "match": r"transaction",
+     "response": "To answer that, I'll fetch all of your transactions. Is that okay?"},
+    {"stage": "plan", "match": r"account",
+     "response": "I'll look up your accounts first and then their transactions. Is that okay?"},
+    {"stage": "plan", "match": "",
+     "response": "Hello! How can I help you with your finances today?"},
+    {"stage": "forced_tool", "match": r"budget",
+     "response": '```json\n{"name": "get_budgets", "arguments": {}}\n```'},
+    {"stage": "forced_tool", "match": r"transaction",
+     "response": '```json\n{"name": "get_all_transactions", "arguments": {}}\n```'},
+    {"stage": "forced_tool", "match": r"account",
+     "response": '```json\n{"name": "get_user_accounts", "arguments": {}}\n```'},
+    {"stage": "forced_tool", "match": "",
+     "response": '```json\n{"name": "get_categories", "arguments": {}}\n```'},
+    {"stage": "agent_step", "match": "",
+     "response": "Here is what I found: your spending is spread over several categories, with groceries and rent the largest."},
+    {"stage": "summarize", "match": "",
+     "response": "Here is a short summary of the data I found for you."},
+    {"stage": "insight", "match": "",
+     "response": "Most of last month's spending went to rent and groceries. Your budgets are mostly on track; setting a weekly grocery limit could help."},
+]
+
+_USER_TURN = re.compile(r"<\|user\|>\n(.*?)\n?<\|end\|>", re.DOTALL)
+_QUOTED_REQUEST = re.compile(r'^The user\'s request was: "(.*?)"\.\n', re.DOTALL)
+
+@dataclass
+class FakeOllamaConfig:
+    latency: float = 0.05
+    # "fixed", "uniform" (latency +- spread), "lognormal" (median latency, sigma spread) or "exponential" (mean latency).
+    latency_distribution: str = "lognormal"
+    latency_spread: float = 0.5
+    # Generated tokens per second; 0 returns the whole reply at once.
+    token_rate: float = 40.0
+    # Prefilled prompt tokens per second; 0 makes prefill free.
+    prompt_rate: float = 2000.0
+    script: Optional[str] = None
+    seed: Optional[int] = None
+    # Share of generations answered with a 500, like an Ollama that cannot load its model.
+    error_rate: float = 0.0
+    # Seconds the first request for a model waits while it "loads".
+    load_time: float = 0.0
+    # "model=factor,...": latency, prefill and decode of these models are `factor` times as fast.
+    model_speeds: str = ""
+
+    @classmethod
+    def from_env(cls) -> "FakeOllamaConfig":
+        return cls(
+            latency=float(os.getenv("FINBOT_FAKE_OLLAMA_LATENCY", "0.05")),
+            latency_distribution=os.getenv("FINBOT_FAKE_OLLAMA_LATENCY_DISTRIBUTION", "lognormal"),
+            latency_spread=float(os.getenv("FINBOT_FAKE_OLLAMA_LATENCY_SPREAD", "0.5")),
+            token_rate=float(os.getenv("FINBOT_FAKE_OLLAMA_TOKEN_RATE", "40")),
+            prompt_rate=float(os.getenv("FINBOT_FAKE_OLLAMA_PROMPT_RATE", "2000")),
+            script=os.getenv("FINBOT_FAKE_OLLAMA_SCRIPT") or None,
+            seed=int(os.environ["FINBOT_FAKE_OLLAMA_SEED"]) if os.getenv("FINBOT_FAKE_OLLAMA_SEED") else None,
+            error_rate=float(os.getenv("FINBOT_FAKE_OLLAMA_ERROR_RATE", "0")),
+            load_time=float(os.getenv("FINBOT_FAKE_OLLAMA_LOAD_TIME", "0")),
+            model_speeds=os.getenv("FINBOT_FAKE_OLLAMA_MODEL_SPEEDS", ""),
+        )
+
+    def to_env(self) -> Dict[str, str]:
+        env = {
+            "FINBOT_FAKE_OLLAMA_LATENCY": str(self.latency),
+            "FINBOT_FAKE_OLLAMA_LATENCY_DISTRIBUTION": self.latency_distribution,
+            "FINBOT_FAKE_OLLAMA_LATENCY_SPREAD": str(self.latency_spread),
+            "FINBOT_FAKE_OLLAMA_TOKEN_RATE": str(self.token_rate),
+            "FINBOT_FAKE_OLLAMA_PROMPT_RATE": str(self.prompt_rate),
+            "FINBOT_FAKE_OLLAMA_ERROR_RATE": str(self.error_rate),
+            "FINBOT_FAKE_OLLAMA_LOAD_TIME": str(self.load_time),
+            "FINBOT_FAKE_OLLAMA_MODEL_SPEEDS": self.model_speeds,
+        }
+        if self.script:
+            env["FINBOT_FAKE_OLLAMA_SCRIPT"] = self.script
+        if self.seed is not None:
+            env["FINBOT_FAKE_OLLAMA_SEED"] = str(self.seed)
+        return env
+
+def load_script(path: Optional[str]) -> List[Dict[str, Any]]:
+    rules = DEFAULT_SCRIPT
+    if path:
+        with open(path, "r", encoding="utf-8") as script_file:
+            rules = json.load(script_file)
+    return [{**rule, "pattern": re.compile(rule.get("match", ""), re.IGNORECASE)} for rule in rules]
+
+def parse_model_speeds(spec: str) -> Dict[str, float]:
+    speeds = {}
+    for entry in spec.split(","):
+        if "=" in entry:
+            model, factor = entry.split("=", 1)
+            speeds[model.strip()] = float(factor)
+    return speeds
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def classify(conversation: str) -> tuple:
+    """The pipeline stage a prompt belongs to and the user request its reply should be about."""
+    if "**The user's data:**" in conversation:
+        return "insight", conversation.split("**TASK:** ", 1)[-1].split("\n", 1)[0]
+    quoted = _QUOTED_REQUEST.match(conversation)
+    if quoted:
+        return ("agent_step" if "These tools were just executed" in conversation else "summarize"), quoted.group(1)
+    user_turns = [turn.strip() for turn in _USER_TURN.findall(conversation)]
+    if "**TASK:** The user has confirmed." in conversation[-1000:]:
+        requests = [turn for turn in user_turns if turn.lower() not in CONFIRMATIONS]
+        return "forced_tool", requests[-1] if requests else ""
+    return "plan", user_turns[-1] if user_turns else conversation[-500:]
+
+class FakeOllama:
+    """Generation state of one server process: the script, the latency sampler and remembered contexts."""
+
+    def __init__(self, config: FakeOllamaConfig):
+        self.config = config
+        self.rules = load_script(config.script)
+        self.rng = random.Random(config.seed)
+        self.contexts: "OrderedDict[int, str]" = OrderedDict()
+        self._context_ids = itertools.count(1)
+        self.speeds = parse_model_speeds(config.model_speeds)
+        # When each model has finished loading in this process.
+        self.ready_at: Dict[str, float] = {}
+        self.generations = 0
+        self.in_flight = 0
+
+    def load_wait(self, model: str) -> float:
+        """Seconds until `model` is loaded; the first request for it starts the load."""
+        now = time.monotonic()
+        if model not in self.ready_at:
+            self.ready_at[model] = now + self.config.load_time
+        return max(0.0, self.ready_at[model] - now)
+
+    def speed(self, model: str) -> float:
+        return self.speeds.get(model, 1.0)
+
+    def first_token_latency(self, speed: float = 1.0) -> float:
+        return self._sample_latency() / speed
+
+    def _sample_latency(self) -> float:
+        config = self.config
+        if config.latency <= 0:
+            return 0.0
+        if config.latency_distribution == "uniform":
+            return max(0.0, self.rng.uniform(config.latency - config.latency_spread, config.latency + config.latency_spread))
+        if config.latency_distribution == "lognormal":
+            return self.rng.lognormvariate(0.0, config.latency_spread) * config.latency
+        if config.latency_distribution == "exponential":
+            return self.rng.expovariate(1 / config.latency)
+        return config.latency
+
+    def reply(self, stage: str, request: str) -> str:
+        for rule in self.rules:
+            if rule.get("stage", "plan") == stage and rule["pattern"].search(request):
+                return rule["response"].replace("{request}", json.dumps(request)[1:-1])
+        return ""
+
+    def resume(self, payload: Dict[str, Any]) -> str:
+        context = payload.get("context") or []
+        previous = self.contexts.get(context[-1], "") if context else ""
+        return previous + payload.get("prompt", "")
+
+    def remember(self, conversation: str) -> List[int]:
+        context_id = next(self._context_ids)
+        self.contexts[context_id] = conversation
+        if len(self.contexts) > REMEMBERED_CONTEXTS:
+            self.contexts.popitem(last=False)
+        return [context_id]
+
+    @staticmethod
+    def tokens(text: str) -> List[str]:
+        return [text[index:index + CHARS_PER_TOKEN] for index in range(0, len(text), CHARS_PER_TOKEN)]
+
+def build_fake_ollama(config: FakeOllamaConfig) -> FastAPI:
+    fake = FakeOllama(config)
+    fake_ollama = FastAPI(title="Fake Ollama")
+    # Lets in-process tests read counters and change the config of a running server.
+    fake_ollama.state.fake = fake
+
+    def final_chunk(payload: Dict[str, Any], conversation: str, text: str, prompt_tokens: int, prefill: float, decode: float, started: float,
+                    load: float) -> Dict[str, Any]:
+        return {
+            "model": payload.get("model", MODEL_NAME), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "response": "", "done": True, "done_reason": "stop", "context": fake.remember(conversation + text + "<|end|>\n"),
+            "total_duration": int((time.perf_counter() - started) * 1e9), "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": len(fake.tokens(text)), "eval_duration": int(decode * 1e9),
+        }
+
+    @fake_ollama.post("/api/generate")
+    async def generate(payload: dict = Body(...)):
+        started = time.perf_counter()
+        model = payload.get("model", MODEL_NAME)
+        load = fake.load_wait(model)
+        if not payload.get("prompt") and not payload.get("context"):
+            await asyncio.sleep(load)
+            return {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "response": "", "done": True,
+                    "done_reason": "load", "load_duration": int(load * 1e9), "total_duration": int((time.perf_counter() - started) * 1e9)}
+        conversation = fake.resume(payload)
+        stage, request = classify(conversation)
+        text = fake.reply(stage, request)
+        speed = fake.speed(model)
+        prompt_tokens = estimate_tokens(payload.get("prompt", ""))
+        prefill = prompt_tokens / (config.prompt_rate * speed) if config.prompt_rate > 0 else 0.0
+        token_delay = 1 / (config.token_rate * speed) if config.token_rate > 0 else 0.0
+        fake.generations += 1
+        if config.error_rate and fake.rng.random() < config.error_rate:
+            return JSONResponse({"error": "fake Ollama failure"}, status_code=500)
+
+        if not payload.get("stream", True):
+            fake.in_flight += 1
+            try:
+                await asyncio.sleep(load + fake.first_token_latency(speed) + prefill + token_delay * len(fake.tokens(text)))
+            finally:
+                fake.in_flight -= 1
+            body = final_chunk(payload, conversation, text, prompt_tokens, prefill, token_delay * len(fake.tokens(text)), started, load)
+            return {**body, "response": text}
+
+        async def chunks() -> AsyncIterator[str]:
+            fake.in_flight += 1
+            try:
+                await asyncio.sleep(load + fake.first_token_latency(speed) + prefill)
+                decode_started = time.perf_counter()
+                for token in fake.tokens(text):
+                    if token_delay:
+                        await asyncio.sleep(token_delay)
+                    yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+                yield json.dumps(final_chunk(payload, conversation, text, prompt_tokens, prefill, time.perf_counter() - decode_started, started, load)) + "\n"
+            finally:
+                fake.in_flight -= 1
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @fake_ollama.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": MODEL_NAME, "model": MODEL_NAME, "size": 0, "details": {"family": "fake"}}]}
+
+    @fake_ollama.get("/api/ps")
+    async def running_models():
+        loaded = [model for model, ready_at in fake.ready_at.items() if ready_at <= time.monotonic()]
+        return {"models": [{"name": model, "model": model, "size_vram": 0} for model in loaded], "generations": fake.generations, "inFlight": fake.in_flight}
+
+    return fake_ollama
+
+# Served by `uvicorn Benchmarks.FakeOllama:app` (the command line below sets its environment).
+app = build_fake_ollama(FakeOllamaConfig.from_env())
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    defaults = FakeOllamaConfig()
+    parser = argparse.ArgumentParser(description="Fake Ollama /api/generate server for FinBot benchmarks")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="First-token latency in seconds (median for lognormal, mean otherwise).")
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "lognormal", "exponential"], default=defaults.latency_distribution)
+    parser.add_argument("--latency-spread", type=float, default=defaults.latency_spread, help="Half-width for uniform, sigma for lognormal.")
+    parser.add_argument("--token-rate", type=float, default=defaults.token_rate, help="Generated tokens per second (0: no decode time).")
+    parser.add_argument("--prompt-rate", type=float, default=defaults.prompt_rate, help="Prefilled prompt tokens per second (0: no prefill time).")
+    parser.add_argument("--script", default=None, help="JSON file with reply rules replacing DEFAULT_SCRIPT.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Share of generations answered with a 500.")
+    parser.add_argument("--load-time", type=float, default=defaults.load_time, help="Seconds the first request for each model waits for it to load.")
+    parser.add_argument("--model-speeds", default=defaults.model_speeds, help='Faster models, e.g. "phi3:mini=3".')
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    import uvicorn
+    arguments = parse_args(sys.argv[1:])
+    os.environ.update(FakeOllamaConfig(arguments.latency, arguments.latency_distribution, arguments.latency_spread, arguments.token_rate,
+                                       arguments.prompt_rate, arguments.script, arguments.seed, arguments.error_rate,
+                                       arguments.load_time, arguments.model_speeds).to_env())
+    uvicorn.run("Benchmarks.FakeOllama:app", host="127.0.0.1", port=arguments.port, workers=arguments.workers, log_level="warning")
@@ -0,0 +1,102 @@
+"""
+FAQ lookup benchmark: the indexed BM25 search against the previous per-call linear scan.
+
+Grows a synthetic knowledge base from faq_data.json to the requested sizes (every entry gets
+its own distinctive words so that each generated question has exactly one right answer), then
+asks each entry's question with a word dropped and reports lookup latency and top-1 accuracy
+for both implementations. The legacy scan re-reads the file on every call, as it used to.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.FaqSearchBenchmark [--sizes 18 1000 5000] [--queries 500]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from typing import Any, Callable, Dict, List, Optional
+
+from Services.FaqIndex import FaqIndex
+from Tools.FaqTools import FAQ_FILE_PATH
+
+def legacy_scan(path: str, query: str) -> Optional[Dict[str, Any]]:
+    """The lookup get_application_faq used before the index: reload, then keyword set intersection."""
+    with open(path, 'r', encoding='utf-8') as f:
+        faq_data: List[Dict] = json.load(f)
+    query_words = set(query.lower().split())
+    best_match, max_score = None, 0
+    for item in faq_data:
+        score = len(query_words.intersection(set(item.get("keywords", []))))
+        if score > max_score:
+            max_score, best_match = score, item
+    return best_match if max_score > 0 else None
+
+def synthetic_knowledge_base(base: List[Dict[str, Any]], size: int, rng: random.Random) -> List[Dict[str, Any]]:
+    entries = [dict(entry) for entry in base[:size]]
+    syllables = ["ka", "lo", "mi", "ter", "vus", "no", "pra", "zel", "dor", "quin", "sa", "fu"]
+    while len(entries) < size:
+        template = base[len(entries) % len(base)]
+        topic = "".join(rng.sample(syllables, 3))
+        feature = "".join(rng.sample(syllables, 3))
+        entries.append({
+            "id": f"synthetic_{len(entries)}",
+            "question": f"{template['question'].rstrip('?')} for the {topic} {feature} module?",
+            "answer": f"The {topic} {feature} module: {template['answer']}",
+            "keywords": template["keywords"] + [topic, feature, f"{topic} {feature}"],
+        })
+    return entries
+
+def make_query(entry: Dict[str, Any], rng: random.Random) -> str:
+    words = entry["question"].rstrip("?").split()
+    if len(words) > 3:
+        del words[rng.randrange(len(words) - 2)]
+    return " ".join(words).lower()
+
+def time_lookups(lookup: Callable[[str], Optional[Dict[str, Any]]], queries: List[str], expected: List[str]):
+    latencies, correct = [], 0
+    for query, expected_id in zip(queries, expected):
+        started = time.perf_counter()
+        match = lookup(query)
+        latencies.append((time.perf_counter() - started) * 1e6)
+        correct += match is not None and match.get("id") == expected_id
+    return statistics.median(latencies), sorted(latencies)[int(len(latencies) * 0.99) - 1], correct / len(queries)
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="FinBot FAQ search benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[18, 1000, 5000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with open(FAQ_FILE_PATH, "r", encoding="utf-8") as f:
+        base = json.load(f)
+
+    print(f"{'entries':>8} | {'scan p50 us':>11} {'p99':>9} {'acc@1':>6} | {'index p50 us':>12} {'p99':>7} {'acc@1':>6} | {'build ms':>8}")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        entries = synthetic_knowledge_base(base, size, rng)
+        sample = [rng.choice(entries) for _ in range(args.queries)]
+        queries = [make_query(entry, rng) for entry in sample]
+        expected = [entry["id"] for entry in sample]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "faq_data.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+
+            index = FaqIndex(path)
+            started = time.perf_counter()
+            index.search("warm up")
+            build_ms = (time.perf_counter() - started) * 1000
+
+            scan = time_lookups(lambda query: legacy_scan(path, query), queries, expected)
+            indexed = time_lookups(lambda query: next((hit.entry for hit in index.search(query, top_k=1)), None), queries, expected)
+
+        print(f"{size:>8} | {scan[0]:>11.1f} {scan[1]:>9.1f} {scan[2]:>6.1%} | {indexed[0]:>12.1f} {indexed[1]:>7.1f} {indexed[2]:>6.1%} | {build_ms:>8.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
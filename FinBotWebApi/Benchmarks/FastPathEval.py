@@ -0,0 +1,48 @@
+"""
+Offline evaluation of the intent fast path.
+
+Replays labeled messages (Benchmarks/fast_path_cases.json) through IntentMatcher.confident_match
+with the configured thresholds and checks that each one takes the fast path with the expected tool,
+or, for "expected_tool": null, is left to the LLM. The cases pin known misroutes: definition
+questions, negations, advice and complaints must never get a canned tool listing.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.FastPathEval [--cases path/to/cases.json] [--verbose]
+"""
+import os
+import sys
+import json
+import argparse
+from typing import List
+
+from Services.IntentMatcher import IntentMatcher
+
+DEFAULT_CASES_PATH = os.path.join(os.path.dirname(__file__), "fast_path_cases.json")
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="FinBot intent fast path evaluation")
+    parser.add_argument("--cases", default=DEFAULT_CASES_PATH)
+    parser.add_argument("--verbose", action="store_true", help="Print every case, not only the failures.")
+    args = parser.parse_args(argv)
+
+    with open(args.cases, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    matcher = IntentMatcher()
+    passed = 0
+    for case in cases:
+        intent = matcher.confident_match(case["message"])
+        actual = intent.tool_name if intent is not None else None
+        ok = actual == case["expected_tool"]
+        passed += ok
+        if args.verbose or not ok:
+            confidence = f" ({intent.confidence})" if intent is not None else ""
+            print(f"[{'OK  ' if ok else 'FAIL'}] {case['message']!r} -> {actual}{confidence} (expected {case['expected_tool']})")
+
+    print()
+    print(f"cases:   {len(cases)}")
+    print(f"passed:  {passed}/{len(cases)}")
+    return 0 if passed == len(cases) else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
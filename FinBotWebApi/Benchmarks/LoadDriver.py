@@ -0,0 +1,374 @@
+"""
+Load driver for /chat: replays chat scenarios at set concurrency levels and reports throughput,
+client latency, p50/p95/p99 per pipeline stage and FinBot's memory, so every performance change
+can be compared against a saved baseline.
+
+By default it starts its own stack on this machine: the fake Ollama (Benchmarks/FakeOllama.py),
+the fake FinTrack API (Benchmarks/FakeFinTrackApi.py) and one FinBot process (uvicorn) pointed at
+both, with every request traced to a JSONL file so stage percentiles are exact. The response cache
+is off unless --env turns it on, so repeated scenarios exercise the whole pipeline. With --target
+an already running FinBot is driven instead; stage percentiles are then estimated from the
+finbot_stage_duration_seconds histogram buckets and memory is read from /metrics.
+
+A scenario is a short session: its turns are sent one after the other with the same
+clientChatSessionId (history stays on the server), and --concurrency sessions run at once. Each
+session uses its own bearer token, i.e. its own FinTrack user and API cache entries.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.LoadDriver --concurrency 1 8 32 --sessions 64 --output baseline.json
+    python -m Benchmarks.LoadDriver --concurrency 1 8 32 --sessions 64 --baseline baseline.json
+    python -m Benchmarks.LoadDriver --scenarios large_transactions --large-transactions 200000 --concurrency 4
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+from prometheus_client.parser import text_string_to_metric_families
+
+from Benchmarks.FakeOllama import FakeOllamaConfig
+from Benchmarks.FakeFinTrackApi import FakeFinTrackConfig
+
+FAKE_OLLAMA_PORT = 11500
+FAKE_FINTRACK_PORT = 8590
+FINBOT_PORT = 8500
+PERCENTILES = (50, 95, 99)
+
+@dataclass
+class Scenario:
+    name: str
+    turns: List[str]
+    # Transactions of the session's FinTrack user; None uses the fake API's default size.
+    transactions: Optional[int] = None
+
+    def auth_token(self, session: int) -> str:
+        return f"bench-{self.transactions}-{session}" if self.transactions is not None else f"bench-user-{session}"
+
+SCENARIOS: Dict[str, Scenario] = {
+    "conversation": Scenario("conversation", ["Hello FinBot!"]),
+    "faq": Scenario("faq", ["How do I pay with a credit card?"]),
+    "single_tool": Scenario("single_tool", ["How much did I spend per category?"]),
+    "confirmation": Scenario("confirmation", ["Can you check how my budgets are doing?", "yes"]),
+    "large_transactions": Scenario("large_transactions", ["Can you show me all of my transactions?", "yes"], transactions=50000),
+}
+DEFAULT_SCENARIOS = ["faq", "single_tool", "confirmation", "large_transactions"]
+
+def percentile(values: List[float], rank: float) -> float:
+    """Nearest-rank percentile; 0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(rank / 100 * len(ordered)) - 1)]
+
+def summarize_values(values: List[float]) -> Dict[str, float]:
+    return {"count": len(values), **{f"p{rank}": round(percentile(values, rank) * 1000, 2) for rank in PERCENTILES}}
+
+def wait_until_up(url: str, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+def start_server(app, port: int) -> uvicorn.Server:
+    """Serves an ASGI app from a daemon thread of this process; set `should_exit` on the result to stop it."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def start_process(command: List[str], env: Dict[str, str], health_url: str, log_path: Optional[str] = None) -> subprocess.Popen:
+    output = open(log_path, "ab") if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(command, env=env, stdout=output, stderr=subprocess.STDOUT)
+    try:
+        wait_until_up(health_url)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+def stop_process(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def start_fake_ollama(config: FakeOllamaConfig, workers: int = 1) -> subprocess.Popen:
+    return start_process([sys.executable, "-m", "uvicorn", "Benchmarks.FakeOllama:app", "--port", str(FAKE_OLLAMA_PORT),
+                          "--workers", str(workers), "--log-level", "warning"],
+                         dict(os.environ, **config.to_env()), f"http://127.0.0.1:{FAKE_OLLAMA_PORT}/api/tags")
+
+def start_fake_fintrack(config: FakeFinTrackConfig, workers: int = 1) -> subprocess.Popen:
+    return start_process([sys.executable, "-m", "uvicorn", "Benchmarks.FakeFinTrackApi:app", "--port", str(FAKE_FINTRACK_PORT),
+                          "--workers", str(workers), "--log-level", "warning"],
+                         dict(os.environ, **config.to_env()), f"http://127.0.0.1:{FAKE_FINTRACK_PORT}/docs")
+
+def process_memory(pid: int) -> Dict[str, float]:
+    """Current and peak resident memory of a local process in MiB (Linux /proc)."""
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as status:
+            for line in status:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    memory["rssMiB" if key == "VmRSS" else "peakRssMiB"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+class TraceReader:
+    """Reads the spans FinBot appended to its JSONL trace file since the previous read."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+
+    def read(self, settle: float = 0.3) -> List[Dict[str, Any]]:
+        # The exporter writes from a background thread; wait until the file stops growing.
+        size = -1
+        while size != self._size():
+            size = self._size()
+            time.sleep(settle)
+        if size <= self.offset:
+            return []
+        with open(self.path, "rb") as trace_file:
+            trace_file.seek(self.offset)
+            data = trace_file.read(size - self.offset)
+        complete = data[:data.rfind(b"\n") + 1]
+        self.offset += len(complete)
+        return [json.loads(line) for line in complete.splitlines() if line.strip()]
+
+    def _size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+def stage_key(name: str, tool: Optional[str]) -> str:
+    return f"tool:{tool}" if name == "tool" and tool else name
+
+def stages_from_spans(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    durations: Dict[str, List[float]] = {}
+    for record in spans:
+        durations.setdefault(stage_key(record["name"], record.get("tool")), []).append(record["durationMs"] / 1000)
+    return {stage: summarize_values(values) for stage, values in sorted(durations.items())}
+
+def scrape_metrics(base_url: str) -> Tuple[Dict[str, Dict[float, float]], Optional[float]]:
+    """Cumulative stage histogram buckets by stage and FinBot's resident memory from /metrics."""
+    buckets: Dict[str, Dict[float, float]] = {}
+    resident = None
+    for family in text_string_to_metric_families(httpx.get(f"{base_url}/metrics", timeout=10).text):
+        for sample in family.samples:
+            if sample.name == "finbot_stage_duration_seconds_bucket":
+                key = stage_key(sample.labels["stage"], None if sample.labels.get("tool") == "none" else sample.labels.get("tool"))
+                stage = buckets.setdefault(key, {})
+                bound = float(sample.labels["le"])
+                stage[bound] = stage.get(bound, 0.0) + sample.value
+            elif sample.name == "process_resident_memory_bytes":
+                resident = sample.value
+    return buckets, resident
+
+def bucket_quantile(buckets: Dict[float, float], quantile: float) -> float:
+    """Quantile of a cumulative histogram, interpolated linearly within the bucket (as Prometheus does)."""
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]] if bounds else 0
+    if not total:
+        return 0.0
+    rank = quantile * total
+    previous_bound, previous_count = 0.0, 0.0
+    for bound in bounds:
+        if buckets[bound] >= rank:
+            if math.isinf(bound):
+                return previous_bound
+            share = (rank - previous_count) / (buckets[bound] - previous_count) if buckets[bound] > previous_count else 0
+            return previous_bound + (bound - previous_bound) * share
+        previous_bound, previous_count = bound, buckets[bound]
+    return previous_bound
+
+def stages_from_histograms(before: Dict[str, Dict[float, float]], after: Dict[str, Dict[float, float]]) -> Dict[str, Dict[str, float]]:
+    stages = {}
+    for stage, cumulative in sorted(after.items()):
+        delta = {bound: count - before.get(stage, {}).get(bound, 0.0) for bound, count in cumulative.items()}
+        count = delta.get(math.inf, 0.0)
+        if count > 0:
+            stages[stage] = {"count": int(count), **{f"p{rank}": round(bucket_quantile(delta, rank / 100) * 1000, 2) for rank in PERCENTILES}}
+    return stages
+
+async def run_sessions(base_url: str, scenario: Scenario, concurrency: int, sessions: int, run_id: str) -> Tuple[List[float], int, float]:
+    """Runs `sessions` sessions of a scenario, `concurrency` at a time. Returns turn latencies, failed turns and wall time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        async def one_session(session: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                for message in scenario.turns:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post("/chat", json={
+                            "userId": f"bench-user-{session % max(concurrency, 1)}",
+                            "clientChatSessionId": f"{run_id}-{scenario.name}-{session}",
+                            "message": message,
+                            "authToken": scenario.auth_token(session),
+                        })
+                        failed = response.status_code != 200
+                    except httpx.HTTPError:
+                        failed = True
+                    latencies.append(time.perf_counter() - started)
+                    if failed:
+                        errors += 1
+                        return
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_session(session) for session in range(sessions)))
+        return latencies, errors, time.perf_counter() - started
+
+def run_level(base_url: str, scenario: Scenario, concurrency: int, sessions: int, finbot_pid: Optional[int], traces: Optional[TraceReader]) -> Dict[str, Any]:
+    if traces is not None:
+        traces.read(settle=0.05)
+    else:
+        buckets_before, _ = scrape_metrics(base_url)
+    latencies, errors, elapsed = asyncio.run(run_sessions(base_url, scenario, concurrency, sessions, uuid.uuid4().hex[:8]))
+
+    if traces is not None:
+        stages = stages_from_spans(traces.read())
+        memory = process_memory(finbot_pid) if finbot_pid else {}
+    else:
+        buckets_after, resident = scrape_metrics(base_url)
+        stages = stages_from_histograms(buckets_before, buckets_after)
+        memory = {"rssMiB": round(resident / (1024 * 1024), 1)} if resident else {}
+    return {
+        "scenario": scenario.name, "concurrency": concurrency, "sessions": sessions, "turns": len(latencies), "errors": errors,
+        "elapsedSeconds": round(elapsed, 3), "sessionsPerSecond": round(sessions / elapsed, 2), "turnsPerSecond": round(len(latencies) / elapsed, 2),
+        "latency": summarize_values(latencies), "stages": stages, "memory": memory,
+    }
+
+def print_result(result: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    latency, memory = result["latency"], result["memory"]
+    line = (f"{result['scenario']:<20} {result['concurrency']:>5} {result['turns']:>6} {result['errors']:>6} {result['turnsPerSecond']:>9.2f}"
+            f" {latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} {memory.get('rssMiB', '-'):>8} {memory.get('peakRssMiB', '-'):>8}")
+    if baseline is not None:
+        line += (f"   vs baseline: turns/s {change(baseline['turnsPerSecond'], result['turnsPerSecond'])},"
+                 f" p95 {change(baseline['latency']['p95'], latency['p95'])}")
+    print(line)
+    for stage, stats in result["stages"].items():
+        base_stage = (baseline or {}).get("stages", {}).get(stage)
+        note = f"   p95 {change(base_stage['p95'], stats['p95'])}" if base_stage else ""
+        print(f"    {stage:<40} {stats['count']:>6} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f}{note}")
+
+def change(before: float, after: float) -> str:
+    return f"{(after - before) / before:+.1%}" if before else "n/a"
+
+def load_baseline(path: Optional[str]) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as baseline_file:
+        return {(result["scenario"], result["concurrency"]): result for result in json.load(baseline_file)["results"]}
+
+def parse_env(pairs: List[str]) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        key, separator, value = pair.partition("=")
+        if not separator:
+            raise SystemExit(f"--env expects KEY=VALUE, got '{pair}'")
+        env[key] = value
+    return env
+
+def main(argv: List[str]) -> int:
+    ollama_defaults, fintrack_defaults = FakeOllamaConfig(), FakeFinTrackConfig()
+    parser = argparse.ArgumentParser(description="FinBot /chat load driver")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=DEFAULT_SCENARIOS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Sessions in flight.")
+    parser.add_argument("--sessions", type=int, default=32, help="Sessions per scenario and concurrency level.")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured sessions per scenario before the first level.")
+    parser.add_argument("--target", default=None, help="Base URL of an already running FinBot instead of the local stack.")
+    parser.add_argument("--env", nargs="*", default=[], help="Extra FinBot environment as KEY=VALUE (local stack only).")
+    parser.add_argument("--ollama-latency", type=float, default=ollama_defaults.latency)
+    parser.add_argument("--ollama-latency-distribution", default=ollama_defaults.latency_distribution, choices=["fixed", "uniform", "lognormal", "exponential"])
+    parser.add_argument("--ollama-latency-spread", type=float, default=ollama_defaults.latency_spread)
+    parser.add_argument("--token-rate", type=float, default=ollama_defaults.token_rate)
+    parser.add_argument("--prompt-rate", type=float, default=ollama_defaults.prompt_rate)
+    parser.add_argument("--script", default=None, help="Reply rules for the fake Ollama (see Benchmarks/FakeOllama.py).")
+    parser.add_argument("--ollama-load-time", type=float, default=ollama_defaults.load_time, help="Seconds the fake Ollama takes to load each model once.")
+    parser.add_argument("--ollama-model-speeds", default=ollama_defaults.model_speeds, help='Faster fake models, e.g. "phi3:mini=3" (see --env FINBOT_MODEL_*).')
+    parser.add_argument("--transactions", type=int, default=fintrack_defaults.transactions, help="Transactions per regular user.")
+    parser.add_argument("--large-transactions", type=int, default=SCENARIOS["large_transactions"].transactions)
+    parser.add_argument("--api-latency", type=float, default=fintrack_defaults.latency)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="Write the results as JSON (e.g. a new baseline).")
+    parser.add_argument("--baseline", default=None, help="Results JSON of an earlier run to compare against.")
+    parser.add_argument("--log", default=None, help="Append the output of the local FinBot to this file.")
+    args = parser.parse_args(argv)
+
+    SCENARIOS["large_transactions"].transactions = args.large_transactions
+    baseline = load_baseline(args.baseline)
+    processes: List[subprocess.Popen] = []
+    traces = None
+    finbot_pid = None
+    base_url = args.target
+    workdir = tempfile.TemporaryDirectory(prefix="finbot-load-")
+    try:
+        if base_url is None:
+            processes.append(start_fake_ollama(FakeOllamaConfig(args.ollama_latency, args.ollama_latency_distribution, args.ollama_latency_spread,
+                                                                args.token_rate, args.prompt_rate, args.script, args.seed,
+                                                                load_time=args.ollama_load_time, model_speeds=args.ollama_model_speeds)))
+            processes.append(start_fake_fintrack(FakeFinTrackConfig(args.transactions, fintrack_defaults.budgets, args.api_latency, args.seed)))
+            trace_file = os.path.join(workdir.name, "traces.jsonl")
+            finbot_env = dict(os.environ, OLLAMA_API_URL=f"http://127.0.0.1:{FAKE_OLLAMA_PORT}", FINTRACK_API_BASE_URL=f"http://127.0.0.1:{FAKE_FINTRACK_PORT}",
+                              FINBOT_RESPONSE_CACHE_ENABLED="false", FINBOT_TRACE_EXPORTER="jsonl", FINBOT_TRACE_SAMPLE_RATE="1",
+                              FINBOT_TRACE_FILE=trace_file, FINBOT_HISTORY_SQLITE_PATH=os.path.join(workdir.name, "sessions.db"))
+            finbot_env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+            finbot_env.update(parse_env(args.env))
+            base_url = f"http://127.0.0.1:{FINBOT_PORT}"
+            finbot = start_process([sys.executable, "-m", "uvicorn", "FinBotWebApi:app", "--port", str(FINBOT_PORT), "--log-level", "warning"],
+                                   finbot_env, f"{base_url}/metrics", args.log)
+            processes.append(finbot)
+            finbot_pid = finbot.pid
+            traces = TraceReader(trace_file)
+
+        for name in args.scenarios:
+            if args.warmup:
+                asyncio.run(run_sessions(base_url, SCENARIOS[name], args.warmup, args.warmup, "warmup"))
+
+        results = []
+        print(f"{'scenario':<20} {'conc.':>5} {'turns':>6} {'errors':>6} {'turns/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MiB':>8} {'peak MiB':>8}")
+        print(f"    {'stage':<40} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for concurrency in args.concurrency:
+            for name in args.scenarios:
+                result = run_level(base_url, SCENARIOS[name], concurrency, args.sessions, finbot_pid, traces)
+                print_result(result, baseline.get((name, concurrency)))
+                results.append(result)
+
+        if args.output:
+            settings = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "log")}
+            with open(args.output, "w", encoding="utf-8") as output:
+                json.dump({"createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "settings": settings, "results": results}, output, indent=2)
+            print(f"Results written to {args.output}")
+        return 1 if any(result["errors"] for result in results) else 0
+    finally:
+        for process in reversed(processes):
+            stop_process(process)
+        workdir.cleanup()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
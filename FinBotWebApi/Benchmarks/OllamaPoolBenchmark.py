@@ -0,0 +1,112 @@
+"""
+Ollama backend pool check against three local fake Ollama servers (Benchmarks/FakeOllama.py).
+
+Runs the same closed-loop workload (--clients callers, each sending --calls generations one
+after the other) through Services.OllamaPool in five situations and reports how the calls were
+spread over the backends, the caller-visible errors and the latency percentiles:
+
+- balanced: three equal backends; the calls should be spread about evenly;
+- one slow: one backend takes 10x longer; least-outstanding balancing sends it fewer calls;
+- one failing: one backend answers every generation with a 500; its calls are retried on the
+  others, it is ejected after FINBOT_OLLAMA_BREAKER_FAILURES failures and callers see no errors;
+- hedged: one backend is very slow to start streaming, with and without --hedge-after; hedging
+  caps the tail near the hedge delay plus a normal call;
+- one down: one server is stopped; calls that cannot connect are retried on the others.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.OllamaPoolBenchmark [--latency 0.1] [--clients 12] [--calls 10] [--hedge-after 0.3]
+"""
+import sys
+import time
+import asyncio
+import argparse
+from contextlib import aclosing
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from Benchmarks.FakeOllama import FakeOllamaConfig, build_fake_ollama
+from Benchmarks.LoadDriver import percentile, start_server
+from Services.HttpClients import close_http_clients
+from Services.OllamaPool import OllamaBackendPool
+
+FIRST_PORT = 11511
+PAYLOAD = {"model": "mistral:instruct", "prompt": "<|user|>\nHello FinBot!\n<|end|>\n<|assistant|>\n", "stream": False}
+
+async def one_call(pool: OllamaBackendPool, stream: bool) -> None:
+    if not stream:
+        await pool.post("/api/generate", PAYLOAD, read_timeout=30)
+        return
+    async with aclosing(pool.stream_lines("/api/generate", {**PAYLOAD, "stream": True}, read_timeout=30)) as lines:
+        async for _ in lines:
+            pass
+
+async def closed_loop(pool: OllamaBackendPool, clients: int, calls: int, stream: bool = False) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    errors = 0
+
+    async def client() -> None:
+        nonlocal errors
+        for _ in range(calls):
+            started = time.perf_counter()
+            try:
+                await one_call(pool, stream)
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    # The pooled client belongs to this event loop; the next case runs in a new one.
+    await close_http_clients()
+    return latencies, errors
+
+def run_case(label: str, fakes: List, urls: List[str], args: argparse.Namespace, hedge_after: float = 0.0, stream: bool = False) -> None:
+    before = [fake.generations for fake in fakes]
+    pool = OllamaBackendPool(urls, hedge_after=hedge_after)
+    latencies, errors = asyncio.run(closed_loop(pool, args.clients, args.calls, stream))
+    served = [fake.generations - previous for fake, previous in zip(fakes, before)]
+    states = "/".join(backend.state for backend in pool.backends)
+    print(f"{label:<24} {'/'.join(str(count) for count in served):>14} {errors:>7} {percentile(latencies, 50) * 1000:>9.0f}"
+          f" {percentile(latencies, 95) * 1000:>9.0f} {max(latencies, default=0) * 1000:>9.0f}   {states}")
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Ollama backend pool balancing, failover and hedging check")
+    parser.add_argument("--latency", type=float, default=0.1, help="Generation time of a normal fake backend in seconds.")
+    parser.add_argument("--clients", type=int, default=12)
+    parser.add_argument("--calls", type=int, default=10, help="Sequential calls per client.")
+    parser.add_argument("--hedge-after", type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    servers, fakes, urls = [], [], []
+    for index in range(3):
+        app = build_fake_ollama(FakeOllamaConfig(latency=args.latency, latency_distribution="fixed", token_rate=0, prompt_rate=0))
+        servers.append(start_server(app, FIRST_PORT + index))
+        fakes.append(app.state.fake)
+        urls.append(f"http://127.0.0.1:{FIRST_PORT + index}")
+
+    def configure(overrides: Optional[Dict[int, Dict[str, float]]] = None) -> None:
+        """Resets every fake backend to a normal one, then applies per-backend config changes."""
+        for fake in fakes:
+            fake.config.latency, fake.config.error_rate = args.latency, 0.0
+        for index, changes in (overrides or {}).items():
+            for key, value in changes.items():
+                setattr(fakes[index].config, key, value)
+
+    print(f"{'case':<24} {'calls served':>14} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}   breaker states")
+    configure()
+    run_case("balanced", fakes, urls, args)
+    configure({2: {"latency": args.latency * 10}})
+    run_case("one slow", fakes, urls, args)
+    configure({2: {"error_rate": 1.0}})
+    run_case("one failing", fakes, urls, args)
+    configure({0: {"latency": args.latency * 30}})
+    run_case("slow start, no hedging", fakes, urls, args, stream=True)
+    run_case(f"hedged after {args.hedge_after}s", fakes, urls, args, hedge_after=args.hedge_after, stream=True)
+    configure()
+    servers[2].should_exit = True
+    time.sleep(1)
+    run_case("one down", fakes, urls, args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,94 @@
+"""
+Serialization benchmark: Services/JsonCodec (orjson) against the standard library json calls it
+replaced, on synthetic FinTrack transaction lists of realistic sizes.
+
+For each size it times, as the median of --repeat runs:
+
+- decode: a GET /Transactions body, as _make_api_request and the API cache parse it
+  (response.json() before);
+- encode body: the same transactions with Decimal amounts, as a request body (json.dumps with
+  the old DecimalEncoder before, which could not encode datetimes at all);
+- prompt: a tool result embedded in a summarization or agent step prompt (json.dumps(default=str));
+- ndjson: one /chat/stream "token" event per transaction-sized chunk of text (json.dumps per event);
+- response: a FastAPI JSONResponse body of the same list.
+
+Decoded results are checked to be equal before anything is reported.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.SerializationBenchmark [--sizes 100 1000 10000 50000] [--repeat 5]
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+
+from Benchmarks.TransactionAnalyticsBenchmark import synthetic_transactions
+from Services.JsonCodec import FastJSONResponse, dumps, dumps_bytes, loads, orjson
+
+class StdlibDecimalEncoder(json.JSONEncoder):
+    """The encoder _make_api_request used for request bodies before the codec."""
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+def with_decimal_amounts(transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Request-body shaped copies with Decimal amounts, as the create tools build them."""
+    return [{**transaction, "amount": Decimal(str(transaction["amount"]))} for transaction in transactions]
+
+def median_seconds(function: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="JSON codec (orjson) vs standard library json")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000], help="Transactions per payload.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if orjson is None:
+        print("orjson is not installed; the codec falls back to the standard library and there is nothing to compare.")
+        return 1
+
+    print(f"{'transactions':>12} {'operation':<12} {'stdlib ms':>10} {'codec ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        transactions = synthetic_transactions(size, random.Random(args.seed))
+        body = json.dumps(transactions).encode()
+        typed = with_decimal_amounts(transactions)
+        chunks = [transaction["description"] for transaction in transactions]
+
+        if json.loads(body) != loads(body):
+            print(f"Decoded payloads differ at size {size}.")
+            return 1
+        if json.loads(json.dumps(typed, cls=StdlibDecimalEncoder)) != loads(dumps_bytes(typed)):
+            print(f"Encoded request bodies differ at size {size}.")
+            return 1
+
+        cases = [
+            ("decode", lambda: json.loads(body), lambda: loads(body)),
+            ("encode body", lambda: json.dumps(typed, cls=StdlibDecimalEncoder).encode(), lambda: dumps_bytes(typed)),
+            ("prompt", lambda: json.dumps(transactions, default=str), lambda: dumps(transactions)),
+            ("ndjson", lambda: [json.dumps({"type": "token", "content": chunk}) + "\n" for chunk in chunks],
+                       lambda: [dumps({"type": "token", "content": chunk}) + "\n" for chunk in chunks]),
+            ("response", lambda: JSONResponse(transactions).body, lambda: FastJSONResponse(transactions).body),
+        ]
+        for name, baseline, codec in cases:
+            stdlib_seconds = median_seconds(baseline, args.repeat)
+            codec_seconds = median_seconds(codec, args.repeat)
+            print(f"{size:>12} {name:<12} {stdlib_seconds * 1000:>10.2f} {codec_seconds * 1000:>10.2f} {stdlib_seconds / codec_seconds:>7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""
+Offline evaluation of the tool router.
+
+Replays labeled chat turns (Benchmarks/tool_routing_cases.json) through the same group selection
+used by /chat and reports routing recall (the expected tool's group was included in the prompt)
+together with how much of the tool catalog is sent compared to the full catalog.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.ToolRoutingEval [--cases path/to/cases.json] [--verbose]
+"""
+import os
+import sys
+import json
+import argparse
+from typing import List
+
+from FinBotWebApi import ALL_TOOL_GROUPS, ChatMessage, TOOL_ROUTER
+from Services.PromptBuilder import serialize_tool_catalog
+
+DEFAULT_CASES_PATH = os.path.join(os.path.dirname(__file__), "tool_routing_cases.json")
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="FinBot tool routing recall evaluation")
+    parser.add_argument("--cases", default=DEFAULT_CASES_PATH)
+    parser.add_argument("--verbose", action="store_true", help="Print every case, not only the misses.")
+    args = parser.parse_args(argv)
+
+    with open(args.cases, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    full_catalog_chars = len(serialize_tool_catalog(TOOL_ROUTER.tools_for(ALL_TOOL_GROUPS)))
+    hits = 0
+    selected_tool_counts = []
+    catalog_chars = []
+
+    for case in cases:
+        history = [ChatMessage(**turn) for turn in case.get("history", [])]
+        groups = TOOL_ROUTER.select(case["message"], history) or ALL_TOOL_GROUPS
+        tools = TOOL_ROUTER.tools_for(groups)
+        hit = case["expected_tool"] in {tool["name"] for tool in tools}
+        hits += hit
+        selected_tool_counts.append(len(tools))
+        catalog_chars.append(len(serialize_tool_catalog(tools)))
+        if args.verbose or not hit:
+            print(f"[{'HIT ' if hit else 'MISS'}] {case['message']!r} -> {sorted(groups)} (expected {case['expected_tool']})")
+
+    total = len(cases)
+    average_chars = sum(catalog_chars) / total
+    print()
+    print(f"cases:                 {total}")
+    print(f"routing recall:        {hits / total:.1%} ({hits}/{total})")
+    print(f"avg tools in prompt:   {sum(selected_tool_counts) / total:.1f} of {len(TOOL_ROUTER.tools_for(ALL_TOOL_GROUPS))}")
+    print(f"avg catalog size:      {average_chars:.0f} chars of {full_catalog_chars} ({1 - average_chars / full_catalog_chars:.0%} smaller)")
+    return 0 if hits == total else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""
+Transaction analytics benchmark: the columnar NumPy aggregation behind the analytics tools
+against a per-value Decimal loop (the way calculate_sum adds amounts up).
+
+Generates synthetic TransactionDto JSON (amounts as the floats httpx decodes, two decimals),
+then computes per-category-and-currency expense totals over a date range both ways, checks
+that the results are identical to the cent and reports the median time of each. Monthly trend
+and top-N are timed for the columnar path as well.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.TransactionAnalyticsBenchmark [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Tuple
+
+from Services.TransactionAnalytics import TransactionFrame
+
+CATEGORIES = [("Groceries", "Expense"), ("Rent", "Expense"), ("Transport", "Expense"), ("Dining", "Expense"), ("Utilities", "Expense"),
+              ("Health", "Expense"), ("Travel", "Expense"), ("Shopping", "Expense"), ("Salary", "Income"), ("Freelance", "Income")]
+ACCOUNTS = [{"id": 1, "name": "Main"}, {"id": 2, "name": "Savings"}, {"id": 3, "name": "Credit Card"}, {"id": 4, "name": "Cash"}]
+CURRENCIES = ["USD", "EUR", "TRY"]
+
+def synthetic_transactions(count: int, rng: random.Random, first_id: int = 0) -> List[Dict[str, Any]]:
+    first_day = date(2024, 1, 1)
+    transactions = []
+    for index in range(first_id, first_id + count):
+        name, kind = rng.choice(CATEGORIES)
+        day = first_day + timedelta(days=rng.randrange(730))
+        transactions.append({
+            "id": index,
+            "category": {"id": CATEGORIES.index((name, kind)), "name": name, "type": kind},
+            "account": rng.choice(ACCOUNTS),
+            "amount": rng.randrange(1, 5_000_000) / 100,
+            "currency": rng.choice(CURRENCIES),
+            "transactionDateUtc": f"{day.isoformat()}T{rng.randrange(24):02d}:00:00",
+            "description": f"Synthetic transaction {index}",
+        })
+    return transactions
+
+def decimal_breakdown(transactions: List[Dict[str, Any]], start: date, end: date) -> Dict[Tuple[str, str], Decimal]:
+    """Per-value Decimal loop: filter each transaction and add its amount to its group."""
+    start_text, end_text = start.isoformat(), end.isoformat()
+    totals: Dict[Tuple[str, str], Decimal] = {}
+    for transaction in transactions:
+        day = transaction["transactionDateUtc"][:10]
+        if transaction["category"]["type"] != "Expense" or not start_text <= day <= end_text:
+            continue
+        key = (transaction["category"]["name"], transaction["currency"])
+        totals[key] = totals.get(key, Decimal("0")) + Decimal(str(transaction["amount"]))
+    return totals
+
+def columnar_breakdown(frame: TransactionFrame, start: date, end: date) -> Dict[Tuple[str, str], Decimal]:
+    groups = frame.group_totals("category", frame.select(start, end, "Expense"))
+    return {(group.key, group.currency): group.to_dict()["total"] for group in groups}
+
+def median_ms(function: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="FinBot transaction analytics benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    start, end = date(2024, 3, 1), date(2025, 8, 31)
+
+    print(f"{'transactions':>12} | {'decimal loop ms':>15} | {'columnar ms':>11} {'(load':>7} {'+ group)':>8} | {'speedup':>7} | {'monthly ms':>10} {'top-10 ms':>9} | exact")
+    for size in args.sizes:
+        transactions = synthetic_transactions(size, random.Random(args.seed))
+        loop_ms, expected = median_ms(lambda: decimal_breakdown(transactions, start, end), args.repeat)
+        load_ms, frame = median_ms(lambda: TransactionFrame(transactions), args.repeat)
+        group_ms, actual = median_ms(lambda: columnar_breakdown(frame, start, end), args.repeat)
+        monthly_ms, _ = median_ms(lambda: frame.monthly_totals(frame.select(start, end, "Expense")), args.repeat)
+        top_ms, _ = median_ms(lambda: frame.largest(frame.select(start, end, "Expense"), 10), args.repeat)
+        columnar_ms = load_ms + group_ms
+        print(f"{size:>12} | {loop_ms:>15.2f} | {columnar_ms:>11.2f} {load_ms:>7.2f} {group_ms:>8.2f} | {loop_ms / columnar_ms:>6.1f}x | "
+              f"{monthly_ms:>10.2f} {top_ms:>9.2f} | {'yes' if actual == expected else 'NO'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,93 @@
+"""
+Transaction ingestion benchmark: peak memory of answering get_all_transactions for users with
+long histories, buffered (the whole body through response.json()) against streamed into a
+bounded-memory digest.
+
+FinTrack is replaced by an in-process httpx.MockTransport that generates the /Transactions
+body chunk by chunk, so neither path is charged for the server's copy of the data. For each
+size the benchmark reports the peak Python heap (tracemalloc, including NumPy buffers) above
+the starting point and the wall time of an untraced run:
+
+- buffered: _make_api_request + build_summary_payload, the previous path of the tool result
+  into the summarization prompt;
+- streamed: get_all_transactions (incremental parsing + TransactionAggregator) + build_summary_payload.
+
+Usage (from the FinBotWebApi directory):
+    python -m Benchmarks.TransactionIngestionBenchmark [--sizes 10000 50000 200000] [--batch-size 2000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Tuple
+
+# The buffered path must not be served from (or stored in) the API response cache between runs.
+os.environ.setdefault("FINBOT_API_CACHE_ENABLED", "false")
+
+import httpx
+
+from Benchmarks.TransactionAnalyticsBenchmark import synthetic_transactions
+from Services.HttpClients import FINTRACK_POOL, get_http_client
+from Services.ResultRenderer import build_summary_payload
+from Tools import TransactionTools, _api_helpers
+
+CHUNK_TRANSACTIONS = 1000
+
+def install_fake_fintrack(size: int, seed: int) -> None:
+    """Points the FinTrack pool at a MockTransport that streams `size` synthetic transactions."""
+
+    async def body() -> AsyncIterator[bytes]:
+        rng = random.Random(seed)
+        yield b"["
+        for first_id in range(0, size, CHUNK_TRANSACTIONS):
+            chunk = synthetic_transactions(min(CHUNK_TRANSACTIONS, size - first_id), rng, first_id)
+            yield (b"," if first_id else b"") + json.dumps(chunk)[1:-1].encode()
+        yield b"]"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"Content-Type": "application/json"}, content=body())
+
+    get_http_client(FINTRACK_POOL).client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+async def buffered() -> Any:
+    result = await _api_helpers._make_api_request("/Transactions", "benchmark-token")
+    return build_summary_payload(result)
+
+async def streamed() -> Any:
+    result = await TransactionTools.get_all_transactions("benchmark-token")
+    return build_summary_payload(result)
+
+def measure(path: Callable[[], Awaitable[Any]]) -> Tuple[float, float]:
+    """Wall seconds of an untraced run and the peak traced heap in MiB of a second run."""
+    started = time.perf_counter()
+    asyncio.run(path())
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    asyncio.run(path())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, (peak - baseline) / (1024 * 1024)
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="FinBot transaction ingestion memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--batch-size", type=int, default=_api_helpers.STREAM_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    _api_helpers.STREAM_BATCH_SIZE = args.batch_size
+
+    print(f"{'transactions':>12} | {'buffered MiB':>12} {'s':>6} | {'streamed MiB':>12} {'s':>6} | {'memory':>7}")
+    for size in args.sizes:
+        install_fake_fintrack(size, args.seed)
+        buffered_s, buffered_mib = measure(buffered)
+        streamed_s, streamed_mib = measure(streamed)
+        print(f"{size:>12} | {buffered_mib:>12.1f} {buffered_s:>6.2f} | {streamed_mib:>12.1f} {streamed_s:>6.2f} | {buffered_mib / streamed_mib:>6.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
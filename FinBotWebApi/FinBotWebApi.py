@@ -1,43 +1,96 @@
 ﻿import os
 import logging
-import json
 import inspect
-import re
-from typing import List, Dict, Any, Optional
+import uuid
+from contextlib import asynccontextmanager, aclosing
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, FrozenSet
 
-import requests
+import httpx
 from fastapi import FastAPI, HTTPException, Body, Request
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from prometheus_client import generate_latest, Counter, Histogram
+from prometheus_client import Counter, Histogram
 import time
 from datetime import datetime, timezone
 
-from Tools.TransactionTools import TRANSACTION_AVAILABLE_TOOLS, TRANSACTION_FUNCTION_MAPPING
-from Tools.MembershipTools import MEMBERSHIP_AVAILABLE_TOOLS, MEMBERSHIP_FUNCTION_MAPPING
-from Tools.BudgetTools import BUDGET_AVAILABLE_TOOLS, BUDGET_FUNCTION_MAPPING
-from Tools.AccountTools import ACCOUNT_AVAILABLE_TOOLS, ACCOUNT_FUNCTION_MAPPING
-from Tools.CalculatorTools import CALCULATOR_AVAILABLE_TOOLS, CALCULATOR_FUNCTION_MAPPING
-from Tools.FaqTools import FAQ_AVAILABLE_TOOLS, FAQ_FUNCTION_MAPPING
+load_dotenv()
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s')
+from Tools.TransactionTools import TRANSACTION_AVAILABLE_TOOLS, TRANSACTION_FUNCTION_MAPPING, TRANSACTION_ROUTING_KEYWORDS
+from Tools.MembershipTools import MEMBERSHIP_AVAILABLE_TOOLS, MEMBERSHIP_FUNCTION_MAPPING, MEMBERSHIP_ROUTING_KEYWORDS
+from Tools.BudgetTools import BUDGET_AVAILABLE_TOOLS, BUDGET_FUNCTION_MAPPING, BUDGET_ROUTING_KEYWORDS
+from Tools.AccountTools import ACCOUNT_AVAILABLE_TOOLS, ACCOUNT_FUNCTION_MAPPING, ACCOUNT_ROUTING_KEYWORDS
+from Tools.CalculatorTools import CALCULATOR_AVAILABLE_TOOLS, CALCULATOR_FUNCTION_MAPPING, CALCULATOR_ROUTING_KEYWORDS
+from Tools.FaqTools import FAQ_AVAILABLE_TOOLS, FAQ_FUNCTION_MAPPING, FAQ_ROUTING_KEYWORDS, FAQ_INDEX
+from Tools.AnalyticsTools import ANALYTICS_AVAILABLE_TOOLS, ANALYTICS_FUNCTION_MAPPING, ANALYTICS_ROUTING_KEYWORDS
+from Services.HttpClients import start_http_clients, close_http_clients
+from Services.OllamaClient import OllamaGeneration, generate, stream_ollama
+from Services.ModelRouter import STAGE_PLAN, STAGE_FORCED_TOOL, STAGE_AGENT_STEP, STAGE_SUMMARIZE, model_for, start_model_warmup, stop_model_warmup
+from Services.OllamaPool import OLLAMA_BACKENDS
+from Services.PromptBuilder import (
+    get_prompt_prefix, get_generation_prompt, get_continuation_prompt,
+    get_forced_tool_call_prompt, get_summarization_prompt, get_agent_step_prompt, render_turns, estimate_tokens,
+)
+from Services.AgentLoop import (
+    AGENT_LOOP_ENABLED, AGENT_LIMIT_HITS, AgentTurn, ToolOutcome, parse_tool_calls, outcome_payloads, render_outcomes,
+)
+from Services.ChatHistoryStore import create_history_store
+from Services.SessionContextStore import SessionContext, SessionContextStore
+from Services.ToolRouter import ToolRouter, TOOL_ROUTER_ENABLED
+from Services.IntentMatcher import IntentMatcher, FAST_PATH_ENABLED, FAST_PATH_REQUESTS
+from Services.ResultRenderer import render_tool_result, reply_from_result, build_summary_payload, is_error_result
+from Services.ResponseCache import ResponseCache, RESPONSE_CACHE_ENABLED, SOURCE_FAQ, SOURCE_CONVERSATION
+from Services.StreamParser import ToolCallStreamParser
+from Services.LlmScheduler import LLM_SCHEDULER, LlmOverloadedError, PRIORITY_SUMMARIZE, PRIORITY_FORCED_TOOL, PRIORITY_GENERATE
+from Services.ToolExecutor import execute_tool, shutdown_tool_executor
+from Services.Tracing import span, traced, start_tracing, shutdown_tracing
+from Services.Metrics import metrics_payload
+from Services.JsonCodec import FastJSONResponse, dumps
+from Services.BatchInsights import BATCH_FETCH_CONCURRENCY, BATCH_LLM_CONCURRENCY, BATCH_MAX_ITEMS, BatchCheckpoint, BatchItem, BatchJob, checkpoint_for_job
+from Services.StructuredLogging import configure_logging, flush_logging, bind_log_context, log_fields, request_id_var
+from Services.SpeculativePrefetch import SpeculativePrefetch, start_speculative_prefetch
+
+configure_logging()
 logger = logging.getLogger(__name__)
-load_dotenv()
 
-OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434")
-OLLAMA_MODEL_NAME = "mistral:instruct"
-app = FastAPI(title="FinTrack ChatBot Service - User-Centric Edition")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    await start_http_clients()
+    start_tracing()
+    OLLAMA_BACKENDS.start()
+    start_model_warmup()
+    FAQ_INDEX.preload()
+    yield
+    await stop_model_warmup()
+    await OLLAMA_BACKENDS.stop()
+    await close_http_clients()
+    shutdown_tool_executor()
+    shutdown_tracing()
+    flush_logging()
+
+app = FastAPI(title="FinTrack ChatBot Service - User-Centric Edition", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 REQUEST_COUNT = Counter('finbot_http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status_code'])
 REQUEST_LATENCY = Histogram('finbot_http_request_duration_seconds', 'HTTP request latency', ['endpoint'])
 MESSAGES_PROCESSED_TOTAL = Counter('finbot_messages_processed_total', 'Total messages processed')
 FINBOT_RESPONSE_TIME = Histogram('finbot_response_duration_seconds', 'FinBot response duration')
+FINBOT_TIME_TO_FIRST_TOKEN = Histogram('finbot_stream_time_to_first_token_seconds', 'Time until the first token is sent on /chat/stream')
+FINBOT_PROMPT_TOKENS = Histogram('finbot_prompt_tokens', 'Estimated prompt tokens per planning call (resumed context plus new prompt text)', buckets=(128, 256, 512, 1024, 2048, 3072, 4096, 6144, 8192))
+FINBOT_STREAM_EARLY_STOPS = Counter('finbot_stream_generation_early_stops_total', 'Streamed generations cancelled as soon as the tool-call JSON closed')
+
+CONFIRMATION_MESSAGES = ["yes", "yep", "ok", "okay", "proceed", "sure", "do it"]
+UNKNOWN_TOOL_REPLY = "I seem to have called a tool that doesn't exist. My apologies. Could you rephrase?"
+EMPTY_REPLY_FALLBACK = "I'm sorry, I'm having trouble formulating a response. Could you try again?"
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
+    # Correlates every log record of the request; a caller's X-Request-ID is kept.
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    request_id_var.set(request_id)
     response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
     process_time = time.time() - start_time
     endpoint = request.url.path
     method = request.method
@@ -61,6 +114,20 @@ class ChatResponse(BaseModel):
     reply: str
     responseTime: datetime
 
+class BatchItemRequest(BaseModel):
+    id: Optional[str] = None
+    userId: str
+    authToken: Optional[str] = None
+    prompt: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchItemRequest]
+    prompt: Optional[str] = None
+    tools: Optional[List[Dict[str, Any]]] = None
+    jobId: Optional[str] = None
+    fetchConcurrency: Optional[int] = None
+    llmConcurrency: Optional[int] = None
+
 def merge_tool_mappings(*mappings: Dict[str, callable]) -> Dict[str, callable]:
     merged = {}
     for mapping in mappings:
@@ -73,152 +140,549 @@ def merge_tool_mappings(*mappings: Dict[str, callable]) -> Dict[str, callable]:
 ALL_AVAILABLE_TOOLS = (
     TRANSACTION_AVAILABLE_TOOLS + MEMBERSHIP_AVAILABLE_TOOLS +
     BUDGET_AVAILABLE_TOOLS + ACCOUNT_AVAILABLE_TOOLS + CALCULATOR_AVAILABLE_TOOLS +
-    FAQ_AVAILABLE_TOOLS
+    FAQ_AVAILABLE_TOOLS + ANALYTICS_AVAILABLE_TOOLS
 )
 try:
     ALL_FUNCTION_MAPPING = merge_tool_mappings(
         TRANSACTION_FUNCTION_MAPPING, MEMBERSHIP_FUNCTION_MAPPING, BUDGET_FUNCTION_MAPPING,
         ACCOUNT_FUNCTION_MAPPING, CALCULATOR_FUNCTION_MAPPING,
-        FAQ_FUNCTION_MAPPING
+        FAQ_FUNCTION_MAPPING, ANALYTICS_FUNCTION_MAPPING
     )
 except NameError as e:
     logger.error(e)
     raise SystemExit(f"CRITICAL STARTUP ERROR: {e}")
 
-ALL_TOOLS_JSON_STRING = json.dumps(ALL_AVAILABLE_TOOLS, indent=2)
-
-SYSTEM_PROMPT = """You are FinBot, an expert, proactive, and transparent financial assistant. Your primary goal is to help the user while making them feel in control and informed.
-
-**Your Core Persona:**
-- **Friendly & Empathetic:** Always be polite and acknowledge the user's goal.
-- **Transparent:** Before you perform an action (use a tool), explain what you are about to do and why.
-- **Proactive:** If a user's request is ambiguous, ask clarifying questions instead of guessing.
-
-**Your Workflow (Reason, Confirm, Act):**
-1.  **Reason:** Analyze the user's request and conversation history to form a plan. This might involve one or more tool calls.
-2.  **Confirm & Act (The MOST IMPORTANT step):**
-    -   If a tool is needed, **DO NOT** output the tool's JSON immediately. Instead, first, respond with a clear, conversational message explaining your plan. For example: "To calculate your remaining balance, I first need to fetch your latest transactions. Is that okay?"
-    -   If the user's request requires a tool call to proceed, you **MUST** respond with the tool's JSON object **ONLY** in a ```json ... ``` block. This will be triggered by a specific directive in the prompt.
-    -   If no tool is needed, just have a normal, helpful conversation.
-
-**You will be given a specific TASK in the prompt. Follow it precisely.**"""
-
-def get_generation_prompt(tools_json_string: str, user_message: str, history: List[ChatMessage]) -> str:
-    history_str = "\n".join([f"<|{msg.role}|>\n{msg.content}<|end|>" for msg in history])
-
-    return f"""{SYSTEM_PROMPT}
-
-**Available Tools:**
-{tools_json_string}
-
-**Conversation History:**
-{history_str}
-<|user|>
-{user_message}
-<|end|>
-<|assistant|>
-"""
-
-def get_forced_tool_call_prompt(original_prompt_context: str) -> str:
-    return f"""{original_prompt_context}
-**TASK:** The user has confirmed. Your only task now is to generate the JSON for the next logical tool call based on the conversation. Respond with **ONLY** the JSON object in a ```json ... ``` block. Do not add any other text."""
-
-def get_summarization_prompt(tool_name: str, function_result: dict, user_request: str) -> str:
-    result_str = json.dumps(function_result)
-    return f"""The user's request was: "{user_request}".
-A tool named '{tool_name}' was just executed and returned this data: {result_str}.
-
-Your task is to present this result to the user in a helpful, clear, and conversational way.
-- **If successful:** Explain what the data means. Don't just list it. For example, instead of "Here is a list...", say "I found three accounts for you: your 'Main Checking' has $500, and...".
-- **If data is empty:** Reassure the user. For example: "It looks like you don't have any budgets set up yet. Would you like to create one?"
-- **If error:** Apologize and explain the error simply. Example: "I'm sorry, I couldn't find an account with that ID. Could you please double-check the number?"
-
-Now, generate a user-friendly response."""
-
-def _call_ollama(prompt: str, timeout: int = 120) -> str:
-    payload = {"model": OLLAMA_MODEL_NAME, "prompt": prompt, "stream": False, "options": {"temperature": 0.2, "stop": ["<|end|>"]}}
-    logger.info("Calling Ollama...")
-    response = requests.post(f"{OLLAMA_API_URL}/api/generate", json=payload, timeout=timeout)
-    response.raise_for_status()
-    response_text = response.json().get("response", "").strip()
-    logger.info(f"Ollama raw response: {response_text}")
-    return response_text
-
-def _extract_json_from_response(text: str) -> Optional[Dict[str, Any]]:
-    match = re.search(r"```json\s*(\{.*?\})\s*```", text, re.DOTALL)
-    if match:
-        json_str = match.group(1)
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            logger.error(f"Failed to decode extracted JSON: {json_str}")
-            return None
-    return None
+TOOL_GROUPS = {
+    "transactions": TRANSACTION_AVAILABLE_TOOLS,
+    "membership": MEMBERSHIP_AVAILABLE_TOOLS,
+    "budgets": BUDGET_AVAILABLE_TOOLS,
+    "accounts": ACCOUNT_AVAILABLE_TOOLS,
+    "calculator": CALCULATOR_AVAILABLE_TOOLS,
+    "faq": FAQ_AVAILABLE_TOOLS,
+    "analytics": ANALYTICS_AVAILABLE_TOOLS,
+}
+TOOL_ROUTING_KEYWORDS = {
+    "transactions": TRANSACTION_ROUTING_KEYWORDS,
+    "membership": MEMBERSHIP_ROUTING_KEYWORDS,
+    "budgets": BUDGET_ROUTING_KEYWORDS,
+    "accounts": ACCOUNT_ROUTING_KEYWORDS,
+    "calculator": CALCULATOR_ROUTING_KEYWORDS,
+    "faq": FAQ_ROUTING_KEYWORDS,
+    "analytics": ANALYTICS_ROUTING_KEYWORDS,
+}
+ALL_TOOL_GROUPS = frozenset(TOOL_GROUPS)
+TOOL_ROUTER = ToolRouter(TOOL_GROUPS, TOOL_ROUTING_KEYWORDS)
+CONTEXT_STORE = SessionContextStore()
+INTENT_MATCHER = IntentMatcher()
+RESPONSE_CACHE = ResponseCache()
+HISTORY_STORE = create_history_store()
+# The only tool whose results are the same for every user; replies built from any other tool are never cached.
+CACHEABLE_TOOLS = {"get_application_faq"}
+# Cached FAQ replies quote the FAQ file; an edited file must not keep serving the old answers.
+FAQ_INDEX.add_reload_listener(lambda: RESPONSE_CACHE.clear(SOURCE_FAQ))
+# Tools that only read data. Follow-up agent steps may only call these: the user confirmed the
+# plan, not whatever the model decides to do after seeing the results.
+READ_ONLY_TOOLS = frozenset(name for name in ALL_FUNCTION_MAPPING if name.startswith(("get_", "calculate_")))
+# Derived from the registries once per process instead of on every request.
+ALL_TOOL_NAMES = frozenset(ALL_FUNCTION_MAPPING)
+AUTHENTICATED_TOOLS = frozenset(name for name, function in ALL_FUNCTION_MAPPING.items() if "auth_token" in inspect.signature(function).parameters)
+READ_ONLY_GROUP_TOOLS = {group: [tool for tool in tools if tool["name"] in READ_ONLY_TOOLS] for group, tools in TOOL_GROUPS.items()}
+# Tools whose results are mostly input for further calls (account IDs), so a lone call to one of
+# them is always followed by a model step instead of being rendered as the reply.
+AGENT_FOLLOW_UP_TOOLS = {"get_user_accounts"}
+
+def is_confirmation(request: ChatRequest) -> bool:
+    return request.message.lower().strip() in CONFIRMATION_MESSAGES
+
+def attach_history(request: ChatRequest) -> None:
+    """Fills in the session's server-side history when the client sends only the new message."""
+    if not request.history:
+        request.history = [ChatMessage(role=turn.role, content=turn.content) for turn in HISTORY_STORE.history(request.userId, request.clientChatSessionId)]
+
+def record_turn(request: ChatRequest, reply: str) -> None:
+    if HISTORY_STORE.append(request.userId, request.clientChatSessionId, request.message, reply):
+        # Compaction moved the stored turns, so the session context's history_length no longer
+        # points at the first turn it has not seen; the next turn starts from the full prompt.
+        CONTEXT_STORE.discard(request.userId, request.clientChatSessionId)
+
+def select_tool_groups(request: ChatRequest) -> FrozenSet[str]:
+    """
+    Picks the tool groups whose schemas go into the prompt.
+
+    The selection only grows within a session: groups already in the session's stored context are
+    kept, so a follow-up turn that needs no new group can still resume from that context. When the
+    router finds nothing and the session has no groups yet, the full catalog is used.
+    """
+    if not TOOL_ROUTER_ENABLED:
+        return ALL_TOOL_GROUPS
+    tool_groups = TOOL_ROUTER.select(request.message, request.history) | CONTEXT_STORE.tool_groups(request.userId, request.clientChatSessionId)
+    return tool_groups or ALL_TOOL_GROUPS
+
+def build_model_prompt(request: ChatRequest) -> Tuple[str, Optional[List[int]], FrozenSet[str]]:
+    """
+    Builds the planning prompt and the Ollama context to resume from, if the session has one.
+
+    On a session's first turn the full prompt (stable prefix + history) is sent. Afterwards only
+    the new turn is sent together with the stored context, so the prefix is not prefilled again.
+    """
+    tool_groups = select_tool_groups(request)
+    session = CONTEXT_STORE.get(request.userId, request.clientChatSessionId, tool_groups, len(request.history), model_for(planning_stage(request)))
+
+    if session is not None:
+        model_prompt = get_continuation_prompt(session.carry_over, request.history[session.history_length:], request.message)
+        context = session.context
+    else:
+        prompt_prefix = get_prompt_prefix(TOOL_ROUTER.tools_for(tool_groups))
+        model_prompt = get_generation_prompt(prompt_prefix, request.message, request.history)
+        context = None
+
+    if is_confirmation(request) and (request.history or session is not None):
+        model_prompt = get_forced_tool_call_prompt(model_prompt)
+    FINBOT_PROMPT_TOKENS.observe(len(context or ()) + estimate_tokens(model_prompt))
+    return model_prompt, context, tool_groups
+
+def planning_priority(request: ChatRequest) -> int:
+    """Confirmations only have to emit the agreed tool call, so they are scheduled ahead of fresh generations."""
+    return PRIORITY_FORCED_TOOL if is_confirmation(request) else PRIORITY_GENERATE
+
+def planning_stage(request: ChatRequest) -> str:
+    """The stage (span name and model route) of the planning call; confirmations may go to a smaller model."""
+    return STAGE_FORCED_TOOL if is_confirmation(request) else STAGE_PLAN
+
+def remember_session_context(request: ChatRequest, tool_groups: FrozenSet[str], generation: OllamaGeneration, shown_reply: Optional[str] = None) -> None:
+    """
+    Stores the context of a finished planning generation for the session's next turn.
+
+    `shown_reply` is the reply the user actually saw when it was not produced by that
+    generation (e.g. a summarized tool result); it is carried over into the next prompt.
+    """
+    if planning_stage(request) == STAGE_FORCED_TOOL or generation.model != model_for(STAGE_PLAN):
+        # A confirmation's context ends in the one-off forced tool call directive, which would be
+        # replayed on every later turn, and may come from another model. The session keeps its
+        # earlier planning context and the turns in between are sent as text on the next turn.
+        return
+    if not generation.context:
+        CONTEXT_STORE.discard(request.userId, request.clientChatSessionId)
+        return
+    carry_over = render_turns([ChatMessage(role="assistant", content=shown_reply)]) if shown_reply else ""
+    CONTEXT_STORE.put(request.userId, request.clientChatSessionId, SessionContext(
+        context=generation.context,
+        tool_groups=tool_groups,
+        history_length=len(request.history) + 2,
+        carry_over=carry_over,
+        model=generation.model,
+    ))
+
+@traced("fast_path")
+async def try_fast_path(request: ChatRequest) -> Optional[str]:
+    """
+    Answers common read-only questions ("show my accounts") by calling the tool directly and
+    rendering a template, without any LLM round trip. Returns None when the LLM path is needed.
+    """
+    if not FAST_PATH_ENABLED or not request.authToken or is_confirmation(request):
+        return None
+    intent = INTENT_MATCHER.confident_match(request.message)
+    if intent is None:
+        return None
+
+    function_result = await run_tool_call(intent.tool_name, {}, request.authToken)
+    reply = render_tool_result(intent.tool_name, function_result)
+    if reply is None:
+        FAST_PATH_REQUESTS.labels(outcome="render_failed", intent=intent.tool_name).inc()
+        return None
+
+    FAST_PATH_REQUESTS.labels(outcome="hit", intent=intent.tool_name).inc()
+    logger.info(f"Fast path answered with '{intent.tool_name}' (confidence {intent.confidence}).")
+    return reply
+
+def is_standalone_turn(request: ChatRequest) -> bool:
+    """True when nothing said earlier in the session can influence the reply."""
+    return not request.history and not CONTEXT_STORE.has(request.userId, request.clientChatSessionId)
+
+def try_response_cache(request: ChatRequest, start_time: float) -> Optional[str]:
+    """Serves a cached reply to the same or a similar non-personal question, if there is one."""
+    if not RESPONSE_CACHE_ENABLED or is_confirmation(request):
+        return None
+    with span("response_cache"):
+        cached = RESPONSE_CACHE.get(request.message, allow_conversation=is_standalone_turn(request))
+    if cached is None:
+        return None
+    RESPONSE_CACHE.record_hit(cached, time.time() - start_time)
+    return cached.reply
+
+def is_cacheable_outcome(outcome: ToolOutcome) -> bool:
+    # Only answers found in the FAQ: an error or a "no answer" reply may change as soon as the FAQ does.
+    return outcome.name in CACHEABLE_TOOLS and isinstance(outcome.result, dict) and "question_found" in outcome.result
+
+def cache_reply(request: ChatRequest, standalone: bool, tool_outcomes: Optional[List[ToolOutcome]], reply: str, start_time: float) -> None:
+    """
+    Caches replies that used no per-user data: FAQ answers, and conversational replies to a
+    session's first message. `tool_outcomes` is None when the model did not ask for any tool.
+    """
+    if not RESPONSE_CACHE_ENABLED or not reply.strip() or is_confirmation(request):
+        return
+    if tool_outcomes is None:
+        if standalone:
+            RESPONSE_CACHE.put(request.message, reply, SOURCE_CONVERSATION, time.time() - start_time)
+    elif tool_outcomes and all(is_cacheable_outcome(outcome) for outcome in tool_outcomes):
+        RESPONSE_CACHE.put(request.message, reply, SOURCE_FAQ, time.time() - start_time)
+
+async def run_tool_call(tool_name: str, tool_args: Dict[str, Any], auth_token: Optional[str]) -> Any:
+    logger.info(f"Executing tool: '{tool_name}'", extra=log_fields(tool=tool_name, arguments=tool_args))
+    python_function = ALL_FUNCTION_MAPPING[tool_name]
+
+    if tool_name in AUTHENTICATED_TOOLS:
+        if not auth_token:
+            raise ValueError("Authentication token is required but was not provided.")
+        tool_args["auth_token"] = auth_token
+
+    with span("tool", tool=tool_name):
+        return await execute_tool(python_function, tool_args)
+
+def start_prefetch(request: ChatRequest, tool_groups: FrozenSet[str]) -> Optional[SpeculativePrefetch]:
+    """
+    On a confirmation turn, starts fetching the read-only tool the assistant's last message
+    proposed, so the FinTrack round trip overlaps the planning generation instead of following it.
+    """
+    if not is_confirmation(request) or not request.history or not request.authToken:
+        return None
+    allowed_tools = frozenset(tool["name"] for group, tools in READ_ONLY_GROUP_TOOLS.items() if group in tool_groups for tool in tools)
+    return start_speculative_prefetch(request.history, allowed_tools, lambda name, arguments: run_tool_call(name, arguments, request.authToken))
+
+def has_known_tool(tool_calls: List[Dict[str, Any]]) -> bool:
+    if any(call.get("name") in ALL_FUNCTION_MAPPING for call in tool_calls):
+        return True
+    logger.warning(f"Model returned JSON for unknown tools: {[call.get('name') for call in tool_calls]}.")
+    return False
+
+async def run_agent_turn(request: ChatRequest, tool_calls: List[Dict[str, Any]], tool_groups: FrozenSet[str], turn: AgentTurn,
+                         prefetch: Optional[SpeculativePrefetch] = None) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Executes the model's tool calls and, while the turn's limits allow, lets the model follow up
+    on the results with more read-only calls before it answers, so e.g. the transactions of every
+    account are fetched in one step instead of one confirmed round trip per account.
+
+    A lone result that needs no follow-up is rendered as before (template, or the summarizer).
+    Yields ("tool_call", name) before each tool runs, ("token", text) for reply text as it is
+    produced and finally ("reply", text). A call matching `prefetch` uses its result instead of
+    fetching again.
+    """
+    async def runner(name: str, arguments: Dict[str, Any]) -> Any:
+        if prefetch is not None and prefetch.matches(name, arguments):
+            return await prefetch.take()
+        return await run_tool_call(name, arguments, request.authToken)
+
+    allowed_tools = ALL_TOOL_NAMES
+    try:
+        while True:
+            step_calls = turn.accept(tool_calls, allowed_tools)
+            for outcome in step_calls:
+                yield "tool_call", outcome.name
+            await turn.run_step(step_calls, runner, READ_ONLY_TOOLS)
+
+            if len(turn.outcomes) == 1 and (not AGENT_LOOP_ENABLED or turn.outcomes[0].name not in AGENT_FOLLOW_UP_TOOLS):
+                outcome = turn.outcomes[0]
+                reply = reply_from_result(outcome.name, outcome.result)
+                if reply is not None:
+                    yield "token", reply
+                else:
+                    summarization_prompt = get_summarization_prompt(outcome.name, build_summary_payload(outcome.result), request.message)
+                    reply_parts = []
+                    with span("summarize", tool=outcome.name):
+                        async with aclosing(stream_ollama(summarization_prompt, timeout=60, user_id=request.userId, priority=PRIORITY_SUMMARIZE,
+                                                          model=model_for(STAGE_SUMMARIZE))) as tokens:
+                            async for token in tokens:
+                                reply_parts.append(token)
+                                yield "token", token
+                    reply = "".join(reply_parts)
+                yield "reply", reply
+                return
+
+            limit = turn.exhausted_limit()
+            if limit is not None:
+                AGENT_LIMIT_HITS.labels(limit=limit).inc()
+            if not AGENT_LOOP_ENABLED or limit == "wall_time" or all(is_error_result(outcome.result) for outcome in turn.outcomes):
+                reply = render_outcomes(turn.outcomes)
+                yield "token", reply
+                yield "reply", reply
+                return
+
+            follow_up_tools = None if limit else [tool for group, tools in READ_ONLY_GROUP_TOOLS.items() if group in tool_groups for tool in tools]
+            step_prompt = get_agent_step_prompt(request.message, outcome_payloads(turn.outcomes), follow_up_tools)
+            parser = ToolCallStreamParser()
+            with span("agent_step", step=turn.steps, results=len(turn.outcomes)):
+                async with aclosing(stream_ollama(step_prompt, timeout=min(60.0, turn.remaining_seconds()), user_id=request.userId, priority=PRIORITY_SUMMARIZE,
+                                                  model=model_for(STAGE_AGENT_STEP))) as tokens:
+                    async for token in tokens:
+                        visible_text = parser.feed(token)
+                        if visible_text:
+                            yield "token", visible_text
+                        if parser.tool_call_complete:
+                            break
+            trailing_text = parser.flush()
+            if trailing_text:
+                yield "token", trailing_text
+
+            if parser.tool_call_complete and follow_up_tools:
+                tool_calls = parser.tool_calls
+                allowed_tools = frozenset(tool["name"] for tool in follow_up_tools)
+                continue
+            reply = "".join(parser.visible_parts)
+            if not reply.strip():
+                reply = render_outcomes(turn.outcomes)
+                yield "token", reply
+            yield "reply", reply
+            return
+    finally:
+        turn.finish()
 
 @app.get("/metrics", response_class=PlainTextResponse)
 async def metrics():
-    return generate_latest()
+    return metrics_payload()
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest = Body(...)):
     start_time = time.time()
-    logger.info(f"Request received: UserId={request.userId}, Message='{request.message}'")
+    bind_log_context(session_id=request.clientChatSessionId, user_id=request.userId)
+    logger.info("Request received", extra=log_fields(message=request.message))
     MESSAGES_PROCESSED_TOTAL.inc()
     
     final_reply_text = "I'm sorry, I encountered an issue and can't respond right now."
+    prefetch = None
 
-    try:
-        is_confirmation = request.message.lower().strip() in ["yes", "yep", "ok", "okay", "proceed", "sure", "do it"]
+    with span("chat", endpoint="/chat", session_id=request.clientChatSessionId) as chat_span:
+        try:
+            attach_history(request)
+            fast_path_reply = await try_fast_path(request)
+            if fast_path_reply is not None:
+                chat_span.set(path="fast_path")
+                record_turn(request, fast_path_reply)
+                FINBOT_RESPONSE_TIME.observe(time.time() - start_time)
+                return ChatResponse(reply=fast_path_reply, responseTime=datetime.now(timezone.utc))
+
+            cached_reply = try_response_cache(request, start_time)
+            if cached_reply is not None:
+                chat_span.set(path="response_cache")
+                record_turn(request, cached_reply)
+                FINBOT_RESPONSE_TIME.observe(time.time() - start_time)
+                return ChatResponse(reply=cached_reply, responseTime=datetime.now(timezone.utc))
+
+            standalone = is_standalone_turn(request)
+            with span("prompt_build"):
+                model_prompt, context, tool_groups = build_model_prompt(request)
+            prefetch = start_prefetch(request, tool_groups)
+            stage = planning_stage(request)
+            with span(stage, resumed=context is not None):
+                generation = await generate(model_prompt, context=context, user_id=request.userId, priority=planning_priority(request), model=model_for(stage))
+            model_response_str = generation.text
+            shown_reply = None
+            tool_outcomes = None
+
+            with span("extract_json"):
+                tool_calls = parse_tool_calls(model_response_str)
+
+            chat_span.set(path="tools" if tool_calls else "conversation")
+            if tool_calls:
+                tool_outcomes = []
+                if has_known_tool(tool_calls):
+                    turn = AgentTurn(start_time)
+                    async with aclosing(run_agent_turn(request, tool_calls, tool_groups, turn, prefetch)) as events:
+                        async for kind, value in events:
+                            if kind == "reply":
+                                final_reply_text = value
+                    tool_outcomes = turn.outcomes
+                else:
+                    final_reply_text = UNKNOWN_TOOL_REPLY
+                shown_reply = final_reply_text
+            else:
+                final_reply_text = model_response_str
 
-        generation_prompt = get_generation_prompt(ALL_TOOLS_JSON_STRING, request.message, request.history)
-        
-        if is_confirmation and request.history:
-            forced_tool_prompt = get_forced_tool_call_prompt(generation_prompt)
-            model_response_str = _call_ollama(forced_tool_prompt)
-        else:
-            model_response_str = _call_ollama(generation_prompt)
+            remember_session_context(request, tool_groups, generation, shown_reply)
+            cache_reply(request, standalone, tool_outcomes, final_reply_text or "", start_time)
+
+            if not final_reply_text or not final_reply_text.strip():
+                logger.warning("Ollama returned an empty response. Using a fallback message.")
+                final_reply_text = EMPTY_REPLY_FALLBACK
+
+            record_turn(request, final_reply_text.strip())
+            current_utc_time = datetime.now(timezone.utc)
+            FINBOT_RESPONSE_TIME.observe(time.time() - start_time)
+            logger.info("Final reply", extra=log_fields(reply=final_reply_text.strip()))
         
-        tool_call_data = _extract_json_from_response(model_response_str)
-
-        if tool_call_data:
-            tool_name = tool_call_data.get("name")
-            tool_args = tool_call_data.get("arguments", {})
-            
-            if tool_name and tool_name in ALL_FUNCTION_MAPPING:
-                logger.info(f"Executing tool: '{tool_name}' with args: {tool_args}")
-                python_function = ALL_FUNCTION_MAPPING[tool_name]
-                
-                if "auth_token" in inspect.signature(python_function).parameters:
-                    if not request.authToken:
-                        raise ValueError("Authentication token is required but was not provided.")
-                    tool_args["auth_token"] = request.authToken
-                
-                function_result = python_function(**tool_args)
-                
-                summarization_prompt = get_summarization_prompt(tool_name, function_result, request.message)
-                final_reply_text = _call_ollama(summarization_prompt, timeout=60)
+            return ChatResponse(reply=final_reply_text.strip(), responseTime=current_utc_time)
+
+        except LlmOverloadedError as overloaded:
+            logger.warning(f"Shedding chat request for UserId={request.userId}: {overloaded}")
+            raise HTTPException(status_code=503, detail="The AI service is busy. Please try again shortly.", headers={"Retry-After": str(overloaded.retry_after)})
+        except httpx.HTTPError as req_err:
+            logger.error(f"Could not connect to Ollama API: {req_err}")
+            raise HTTPException(status_code=503, detail="The AI service is currently unavailable.")
+        except Exception as e:
+            logger.error(f"General error in chat endpoint: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail="An unexpected error occurred in the ChatBot service.")
+        finally:
+            if prefetch is not None:
+                prefetch.discard()
+
+def _ndjson_event(event_type: str, **fields: Any) -> str:
+    return dumps({"type": event_type, **fields}) + "\n"
+
+async def _chat_stream_events(request: ChatRequest) -> AsyncIterator[str]:
+    start_time = time.time()
+    # The body may be produced in another task than the endpoint; tag its records there as well.
+    bind_log_context(session_id=request.clientChatSessionId, user_id=request.userId)
+    first_token_sent = False
+
+    def token_event(content: str) -> str:
+        nonlocal first_token_sent
+        if not first_token_sent:
+            first_token_sent = True
+            FINBOT_TIME_TO_FIRST_TOKEN.observe(time.time() - start_time)
+        return _ndjson_event("token", content=content)
+
+    prefetch = None
+    with span("chat", endpoint="/chat/stream", session_id=request.clientChatSessionId) as chat_span:
+        try:
+            attach_history(request)
+            fast_path_reply = await try_fast_path(request)
+            if fast_path_reply is not None:
+                chat_span.set(path="fast_path")
+                record_turn(request, fast_path_reply)
+                yield token_event(fast_path_reply)
+                FINBOT_RESPONSE_TIME.observe(time.time() - start_time)
+                yield _ndjson_event("done", reply=fast_path_reply, responseTime=datetime.now(timezone.utc).isoformat())
+                return
+
+            cached_reply = try_response_cache(request, start_time)
+            if cached_reply is not None:
+                chat_span.set(path="response_cache")
+                record_turn(request, cached_reply)
+                yield token_event(cached_reply)
+                FINBOT_RESPONSE_TIME.observe(time.time() - start_time)
+                yield _ndjson_event("done", reply=cached_reply, responseTime=datetime.now(timezone.utc).isoformat())
+                return
+
+            standalone = is_standalone_turn(request)
+            tool_outcomes = None
+            parser = ToolCallStreamParser()
+            with span("prompt_build"):
+                model_prompt, context, tool_groups = build_model_prompt(request)
+            prefetch = start_prefetch(request, tool_groups)
+            generation = OllamaGeneration()
+            stage = planning_stage(request)
+            with span(stage, resumed=context is not None) as plan_span:
+                async with aclosing(stream_ollama(model_prompt, context=context, generation=generation, user_id=request.userId,
+                                                  priority=planning_priority(request), model=model_for(stage))) as tokens:
+                    async for token in tokens:
+                        visible_text = parser.feed(token)
+                        if visible_text:
+                            yield token_event(visible_text)
+                        if parser.tool_call_complete:
+                            FINBOT_STREAM_EARLY_STOPS.inc()
+                            plan_span.set(early_stop=True)
+                            break
+            trailing_text = parser.flush()
+            if trailing_text:
+                yield token_event(trailing_text)
+
+            chat_span.set(path="tools" if parser.tool_call_complete else "conversation")
+            if parser.tool_call_complete:
+                tool_outcomes = []
+                final_reply_text = ""
+                if has_known_tool(parser.tool_calls):
+                    turn = AgentTurn(start_time)
+                    async with aclosing(run_agent_turn(request, parser.tool_calls, tool_groups, turn, prefetch)) as events:
+                        async for kind, value in events:
+                            if kind == "tool_call":
+                                yield _ndjson_event("tool_call", name=value)
+                            elif kind == "token":
+                                yield token_event(value)
+                            else:
+                                final_reply_text = value
+                    tool_outcomes = turn.outcomes
+                else:
+                    final_reply_text = UNKNOWN_TOOL_REPLY
+                    yield token_event(final_reply_text)
+                # The planning stream was cut short, so Ollama never returned its context. A context
+                # kept across a confirmation stays, since a confirmation never replaces it.
+                if planning_stage(request) == STAGE_PLAN:
+                    CONTEXT_STORE.discard(request.userId, request.clientChatSessionId)
             else:
-                logger.warning(f"Model returned JSON for an unknown tool: '{tool_name}'.")
-                final_reply_text = "I seem to have called a tool that doesn't exist. My apologies. Could you rephrase?"
-        else:
-            final_reply_text = model_response_str
-
-        if not final_reply_text or not final_reply_text.strip():
-            logger.warning("Ollama returned an empty response. Using a fallback message.")
-            final_reply_text = "I'm sorry, I'm having trouble formulating a response. Could you try again?"
-
-        current_utc_time = datetime.now(timezone.utc)
-        FINBOT_RESPONSE_TIME.observe(time.time() - start_time)
-        logger.info(f"Final reply for SessionId={request.clientChatSessionId}: '{final_reply_text.strip()}'")
-        
-        return ChatResponse(reply=final_reply_text.strip(), responseTime=current_utc_time)
-
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Could not connect to Ollama API: {req_err}")
-        raise HTTPException(status_code=503, detail="The AI service is currently unavailable.")
-    except Exception as e:
-        logger.error(f"General error in chat endpoint: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="An unexpected error occurred in the ChatBot service.")
+                final_reply_text = "".join(parser.visible_parts)
+                remember_session_context(request, tool_groups, generation)
+            cache_reply(request, standalone, tool_outcomes, final_reply_text, start_time)
+
+            if not final_reply_text.strip():
+                logger.warning("Ollama returned an empty response. Using a fallback message.")
+                final_reply_text = EMPTY_REPLY_FALLBACK
+                yield token_event(final_reply_text)
+
+            record_turn(request, final_reply_text.strip())
+            FINBOT_RESPONSE_TIME.observe(time.time() - start_time)
+            logger.info("Final streamed reply", extra=log_fields(reply=final_reply_text.strip()))
+            yield _ndjson_event("done", reply=final_reply_text.strip(), responseTime=datetime.now(timezone.utc).isoformat())
+
+        except LlmOverloadedError as overloaded:
+            logger.warning(f"Shedding chat stream for UserId={request.userId}: {overloaded}")
+            yield _ndjson_event("error", statusCode=503, detail="The AI service is busy. Please try again shortly.", retryAfter=overloaded.retry_after)
+        except httpx.HTTPError as req_err:
+            logger.error(f"Could not connect to Ollama API: {req_err}")
+            yield _ndjson_event("error", statusCode=503, detail="The AI service is currently unavailable.")
+        except Exception as e:
+            logger.error(f"General error in chat stream endpoint: {e}", exc_info=True)
+            yield _ndjson_event("error", statusCode=500, detail="An unexpected error occurred in the ChatBot service.")
+        finally:
+            if prefetch is not None:
+                prefetch.discard()
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest = Body(...)):
+    """
+    Streams the reply as NDJSON events: "token" (conversational text as it is generated),
+    "tool_call" (a tool is being executed; one per call, several may run together), then a
+    final "done" or "error" event.
+    """
+    bind_log_context(session_id=request.clientChatSessionId, user_id=request.userId)
+    logger.info("Stream request received", extra=log_fields(message=request.message))
+    MESSAGES_PROCESSED_TOTAL.inc()
+    try:
+        # Shed before the 200 status line is sent, so clients still get a real 503 with Retry-After.
+        LLM_SCHEDULER.check_admission(planning_priority(request))
+    except LlmOverloadedError as overloaded:
+        logger.warning(f"Shedding chat stream for UserId={request.userId}: {overloaded}")
+        raise HTTPException(status_code=503, detail="The AI service is busy. Please try again shortly.", headers={"Retry-After": str(overloaded.retry_after)})
+    return StreamingResponse(_chat_stream_events(request), media_type="application/x-ndjson")
+
+async def _batch_events(job: BatchJob, checkpoint: Optional[BatchCheckpoint]) -> AsyncIterator[str]:
+    try:
+        async with aclosing(job.run()) as records:
+            async for record in records:
+                if checkpoint is not None and record["type"] == "result":
+                    checkpoint.append(record)
+                yield dumps(record) + "\n"
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: BatchChatRequest = Body(...)):
+    """
+    Generates one insight message per item (Services/BatchInsights.py) and streams NDJSON records:
+    a "result" per item as it finishes (status "ok" with the insight, or "error") and "progress"
+    records with throughput and ETA. With a jobId, results are checkpointed on the server and
+    the same request sent again after an interruption skips the items that already succeeded.
+    Concurrency can be lowered per request, but not raised above the configured limits.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch can hold at most {BATCH_MAX_ITEMS} items.")
+    items = [BatchItem.from_dict(item.model_dump(), request.prompt, request.tools) for item in request.items]
+    checkpoint = checkpoint_for_job(request.jobId) if request.jobId else None
+    completed_ids = checkpoint.completed_ids() if checkpoint is not None else set()
+    job = BatchJob(items, run_tool_call, READ_ONLY_TOOLS, completed_ids,
+                   min(request.fetchConcurrency or BATCH_FETCH_CONCURRENCY, BATCH_FETCH_CONCURRENCY),
+                   min(request.llmConcurrency or BATCH_LLM_CONCURRENCY, BATCH_LLM_CONCURRENCY))
+    logger.info(f"Batch job {request.jobId or '(unnamed)'}: {len(items)} items, {job.progress.skipped} already done.")
+    return StreamingResponse(_batch_events(job, checkpoint), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
     import uvicorn
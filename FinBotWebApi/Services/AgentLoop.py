@@ -0,0 +1,148 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+from Services.ResultRenderer import SUMMARY_MAX_CHARS, build_summary_payload, reply_from_result, render_generic_result
+from Services.StreamParser import as_tool_calls
+from Services.JsonCodec import loads
+
+logger = logging.getLogger(__name__)
+
+AGENT_LOOP_ENABLED = os.getenv("FINBOT_AGENT_LOOP_ENABLED", "true").lower() == "true"
+AGENT_MAX_STEPS = int(os.getenv("FINBOT_AGENT_MAX_STEPS", "3"))
+AGENT_MAX_TOOL_CALLS = int(os.getenv("FINBOT_AGENT_MAX_TOOL_CALLS", "12"))
+AGENT_MAX_SECONDS = float(os.getenv("FINBOT_AGENT_MAX_SECONDS", "90"))
+AGENT_MAX_CONCURRENT_CALLS = int(os.getenv("FINBOT_AGENT_MAX_CONCURRENT_CALLS", "4"))
+# With less turn time left than this, no further model step is started and the results are rendered directly.
+AGENT_MIN_STEP_SECONDS = float(os.getenv("FINBOT_AGENT_MIN_STEP_SECONDS", "5"))
+# Each tool result embedded in a step prompt gets an equal share of SUMMARY_MAX_CHARS, but at least this much.
+AGENT_MIN_RESULT_CHARS = 600
+
+AGENT_STEPS = Histogram('finbot_agent_steps', 'Tool-executing steps per agent turn', buckets=(1, 2, 3, 4, 5, 6, 8))
+AGENT_STEP_DURATION = Histogram('finbot_agent_step_duration_seconds', 'Wall time to execute the tool calls of one agent step')
+AGENT_TOOL_CALLS = Counter('finbot_agent_tool_calls_total', 'Tool calls requested by the model in agent turns', ['outcome'])
+AGENT_LIMIT_HITS = Counter('finbot_agent_limit_hits_total', 'Agent turns that reached one of their limits', ['limit'])
+
+TOOL_CALL_BLOCK = re.compile(r"```json\s*(\{.*?\}|\[.*?\])\s*```", re.DOTALL)
+
+ToolRunner = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+@dataclass
+class ToolOutcome:
+    name: str
+    arguments: Dict[str, Any]
+    result: Any
+
+def parse_tool_calls(text: str) -> Optional[List[Dict[str, Any]]]:
+    """The tool calls in the first ```json block of a model reply: one call object or an array of them."""
+    match = TOOL_CALL_BLOCK.search(text)
+    if not match:
+        return None
+    try:
+        return as_tool_calls(loads(match.group(1)))
+    except json.JSONDecodeError:
+        logger.error(f"Failed to decode extracted JSON: {match.group(1)}")
+        return None
+
+class AgentTurn:
+    """
+    The tool-calling budget of one chat turn: how many steps, tool calls and seconds it may use,
+    plus every tool result gathered so far.
+
+    A step executes all tool calls the model asked for at once. Read-only calls run concurrently
+    (at most AGENT_MAX_CONCURRENT_CALLS at a time); a step containing any other call runs its
+    calls one by one in the given order, since a write may depend on the one before it. Failed
+    or timed out calls become error results instead of failing the turn.
+    """
+
+    def __init__(self, started_at: float, max_steps: int = AGENT_MAX_STEPS, max_tool_calls: int = AGENT_MAX_TOOL_CALLS, max_seconds: float = AGENT_MAX_SECONDS):
+        self.max_steps = max_steps
+        self.max_tool_calls = max_tool_calls
+        self.deadline = started_at + max_seconds
+        self.steps = 0
+        self.calls = 0
+        self.outcomes: List[ToolOutcome] = []
+
+    def remaining_seconds(self) -> float:
+        return max(0.0, self.deadline - time.time())
+
+    def exhausted_limit(self) -> Optional[str]:
+        """Name of the limit that forbids another tool-executing step, or None if one is allowed."""
+        if self.steps >= self.max_steps:
+            return "steps"
+        if self.calls >= self.max_tool_calls:
+            return "tool_calls"
+        if self.remaining_seconds() < AGENT_MIN_STEP_SECONDS:
+            return "wall_time"
+        return None
+
+    def accept(self, tool_calls: List[Dict[str, Any]], allowed_tools: FrozenSet[str]) -> List[ToolOutcome]:
+        """The calls of the next step that may run: allowed tools only, within the remaining call budget."""
+        accepted = []
+        for call in tool_calls:
+            name, arguments = call.get("name"), call.get("arguments") or {}
+            if name not in allowed_tools or not isinstance(arguments, dict):
+                logger.warning(f"Agent step rejected the tool call '{name}' with arguments {arguments}.")
+                AGENT_TOOL_CALLS.labels(outcome="rejected").inc()
+                continue
+            if self.calls + len(accepted) >= self.max_tool_calls:
+                logger.warning(f"Agent turn reached its limit of {self.max_tool_calls} tool calls; dropping '{name}'.")
+                AGENT_TOOL_CALLS.labels(outcome="dropped").inc()
+                AGENT_LIMIT_HITS.labels(limit="tool_calls").inc()
+                continue
+            accepted.append(ToolOutcome(name, arguments, None))
+        return accepted
+
+    async def run_step(self, step_calls: List[ToolOutcome], runner: ToolRunner, read_only_tools: FrozenSet[str]) -> List[ToolOutcome]:
+        """Executes accepted calls, filling in their results, and adds them to the turn's outcomes."""
+        self.steps += 1
+        self.calls += len(step_calls)
+        started = time.time()
+        if all(outcome.name in read_only_tools for outcome in step_calls):
+            semaphore = asyncio.Semaphore(AGENT_MAX_CONCURRENT_CALLS)
+
+            async def bounded(outcome: ToolOutcome) -> None:
+                async with semaphore:
+                    await self._run_call(outcome, runner)
+            await asyncio.gather(*(bounded(outcome) for outcome in step_calls))
+        else:
+            for outcome in step_calls:
+                await self._run_call(outcome, runner)
+        AGENT_STEP_DURATION.observe(time.time() - started)
+        self.outcomes.extend(step_calls)
+        return step_calls
+
+    async def _run_call(self, outcome: ToolOutcome, runner: ToolRunner) -> None:
+        try:
+            # The runner gets its own copy, since it may add credentials to the arguments.
+            outcome.result = await asyncio.wait_for(runner(outcome.name, dict(outcome.arguments)), timeout=self.remaining_seconds())
+            AGENT_TOOL_CALLS.labels(outcome="executed").inc()
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool '{outcome.name}' did not finish within the agent turn's time limit.")
+            outcome.result = {"error": "The request took too long and was cancelled."}
+            AGENT_TOOL_CALLS.labels(outcome="timeout").inc()
+            AGENT_LIMIT_HITS.labels(limit="wall_time").inc()
+        except Exception as e:
+            logger.error(f"Tool '{outcome.name}' failed: {e}", exc_info=True)
+            outcome.result = {"error": str(e)}
+            AGENT_TOOL_CALLS.labels(outcome="failed").inc()
+
+    def finish(self) -> None:
+        if self.steps:
+            AGENT_STEPS.observe(self.steps)
+
+def outcome_payloads(outcomes: List[ToolOutcome]) -> List[Dict[str, Any]]:
+    """Compact results for a step prompt, sharing the summary size budget between all of them."""
+    max_chars = max(AGENT_MIN_RESULT_CHARS, SUMMARY_MAX_CHARS // max(1, len(outcomes)))
+    return [{"tool": outcome.name, "arguments": outcome.arguments, "result": build_summary_payload(outcome.result, max_chars)} for outcome in outcomes]
+
+def render_outcomes(outcomes: List[ToolOutcome]) -> str:
+    """A deterministic reply covering every outcome, used when no model step may summarize them."""
+    return "\n\n".join(reply_from_result(outcome.name, outcome.result) or render_generic_result(outcome.result) for outcome in outcomes)
@@ -0,0 +1,123 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from Services.JsonCodec import loads
+
+logger = logging.getLogger(__name__)
+
+API_CACHE_ENABLED = os.getenv("FINBOT_API_CACHE_ENABLED", "true").lower() == "true"
+API_CACHE_MAX_ENTRIES = int(os.getenv("FINBOT_API_CACHE_MAX_ENTRIES", "5000"))
+API_CACHE_MAX_BYTES = int(os.getenv("FINBOT_API_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+API_CACHE_LOOKUPS = Counter('finbot_api_cache_lookups_total', 'FinTrack API read-through cache lookups', ['endpoint', 'outcome'])
+API_CACHE_EVICTIONS = Counter('finbot_api_cache_evictions_total', 'FinTrack API cache entries removed', ['reason'])
+API_CACHE_ENTRIES = Gauge('finbot_api_cache_entries', 'FinTrack API responses held in the cache', multiprocess_mode='livesum')
+API_CACHE_BYTES = Gauge('finbot_api_cache_bytes', 'Size of the FinTrack API response bodies held in the cache', multiprocess_mode='livesum')
+
+CacheKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    expires_at: float
+    group: str
+
+def user_identity(auth_token: str) -> str:
+    """
+    Cache namespace for a bearer token. The token itself is hashed rather than decoded: its claims
+    are not verified here, so a forged token must never map onto another user's entries.
+    """
+    return hashlib.sha256(auth_token.encode("utf-8")).hexdigest()
+
+class ApiResponseCache:
+    """
+    Per-user, read-through cache of FinTrack API response bodies.
+
+    Entries are keyed by (user identity, endpoint, params) and expire after the TTL of their
+    endpoint group. The cache is bounded both by entry count and by the total size of the stored
+    bodies and evicts least-recently-used entries beyond either limit. Bodies are stored as bytes
+    and decoded on every hit, so callers can freely mutate what they get back.
+
+    Every invalidation bumps a generation counter; a read that started before it will not store
+    its (possibly stale) response afterwards. Writes are rare next to reads, so a single global
+    counter is enough and needs no per-user bookkeeping.
+    """
+
+    def __init__(self, max_entries: int = API_CACHE_MAX_ENTRIES, max_bytes: int = API_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, CachedResponse]" = OrderedDict()
+        self._generation = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(identity: str, endpoint: str, params: Optional[Dict[str, Any]]) -> CacheKey:
+        return identity, endpoint, tuple(sorted((str(name), str(value)) for name, value in (params or {}).items()))
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, key: CacheKey, group: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key, "ttl")
+                entry = None
+            if entry is None:
+                API_CACHE_LOOKUPS.labels(endpoint=group, outcome="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            body = entry.body
+        API_CACHE_LOOKUPS.labels(endpoint=group, outcome="hit").inc()
+        return loads(body)
+
+    def put(self, key: CacheKey, group: str, body: bytes, ttl_seconds: float, generation: int) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if self._generation != generation:
+                return
+            self._remove(key, None)
+            self._entries[key] = CachedResponse(body, time.monotonic() + ttl_seconds, group)
+            self._size += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)), "lru")
+            self._update_gauges()
+
+    def invalidate(self, identity: str, groups: Iterable[str]) -> None:
+        """Drops the user's entries of the given endpoint groups and fences off in-flight reads."""
+        groups = set(groups)
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, entry in self._entries.items() if key[0] == identity and entry.group in groups]:
+                self._remove(key, "invalidated")
+            self._update_gauges()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._size = 0
+            self._update_gauges()
+
+    def _remove(self, key: CacheKey, reason: Optional[str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry.body)
+        if reason is not None:
+            API_CACHE_EVICTIONS.labels(reason=reason).inc()
+
+    def _update_gauges(self) -> None:
+        API_CACHE_ENTRIES.set(len(self._entries))
+        API_CACHE_BYTES.set(self._size)
@@ -0,0 +1,277 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set
+
+import httpx
+from prometheus_client import Counter, Histogram
+
+from Services.AgentLoop import ToolOutcome, outcome_payloads
+from Services.JsonCodec import dumps, loads
+from Services.LlmScheduler import LlmOverloadedError, PRIORITY_BATCH
+from Services.ModelRouter import STAGE_INSIGHT, model_for
+from Services.OllamaClient import generate
+from Services.PromptBuilder import get_insight_prefix, get_insight_prompt
+from Services.ResultRenderer import is_error_result
+from Services.Tracing import span
+
+logger = logging.getLogger(__name__)
+
+BATCH_FETCH_CONCURRENCY = int(os.getenv("FINBOT_BATCH_FETCH_CONCURRENCY", "8"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("FINBOT_BATCH_LLM_CONCURRENCY", "2"))
+BATCH_MAX_ITEMS = int(os.getenv("FINBOT_BATCH_MAX_ITEMS", "10000"))
+BATCH_CHECKPOINT_DIR = os.getenv("FINBOT_BATCH_CHECKPOINT_DIR", "batch-jobs")
+BATCH_PROGRESS_SECONDS = float(os.getenv("FINBOT_BATCH_PROGRESS_SECONDS", "10"))
+BATCH_GENERATION_TIMEOUT = float(os.getenv("FINBOT_BATCH_GENERATION_TIMEOUT", "120"))
+# Attempts per generation when the LLM scheduler sheds it; each waits the suggested Retry-After.
+BATCH_OVERLOAD_RETRIES = 5
+# Finished insights remembered per job, so items with an identical prompt are generated once.
+BATCH_DEDUP_ENTRIES = 1024
+
+DEFAULT_INSIGHT_PROMPT = ("Write a short, friendly spending insight for last month: where most of the money went, "
+                          "how the budgets are doing and one practical tip. At most four sentences.")
+DEFAULT_INSIGHT_TOOLS: List[Dict[str, Any]] = [
+    {"name": "get_spending_breakdown", "arguments": {"period": "last_month", "categoryType": "Expense", "topN": 5}},
+    {"name": "get_budgets", "arguments": {}},
+]
+
+BATCH_ITEMS = Counter('finbot_batch_items_total', 'Batch insight items by outcome', ['outcome'])
+BATCH_ITEM_DURATION = Histogram('finbot_batch_item_duration_seconds', 'Time from fetching an item\'s data to its finished insight',
+                                buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300))
+
+ToolRunner = Callable[[str, Dict[str, Any], Optional[str]], Awaitable[Any]]
+
+@dataclass
+class BatchItem:
+    id: str
+    user_id: str
+    auth_token: Optional[str]
+    prompt: str = DEFAULT_INSIGHT_PROMPT
+    tools: List[Dict[str, Any]] = field(default_factory=lambda: list(DEFAULT_INSIGHT_TOOLS))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], prompt: Optional[str] = None, tools: Optional[List[Dict[str, Any]]] = None) -> "BatchItem":
+        """An item from its JSON form; `prompt` and `tools` are the job's defaults for items without their own."""
+        user_id = str(data["userId"])
+        return cls(
+            id=str(data.get("id") or user_id),
+            user_id=user_id,
+            auth_token=data.get("authToken"),
+            prompt=data.get("prompt") or prompt or DEFAULT_INSIGHT_PROMPT,
+            tools=data.get("tools") or tools or list(DEFAULT_INSIGHT_TOOLS),
+        )
+
+@dataclass
+class BatchProgress:
+    total: int
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.failed
+
+    def items_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.items_per_second()
+        return (self.total - self.skipped - self.done) / rate if rate > 0 else None
+
+    def to_record(self) -> Dict[str, Any]:
+        eta = self.eta_seconds()
+        return {"type": "progress", "total": self.total, "skipped": self.skipped, "succeeded": self.succeeded, "failed": self.failed,
+                "itemsPerSecond": round(self.items_per_second(), 3), "etaSeconds": round(eta, 1) if eta is not None else None,
+                "elapsedSeconds": round(time.monotonic() - self.started_at, 1)}
+
+    def describe(self) -> str:
+        eta = self.eta_seconds()
+        eta_text = f"{eta / 60:.1f} min" if eta is not None else "unknown"
+        return (f"{self.done}/{self.total - self.skipped} items ({self.failed} failed, {self.skipped} already done), "
+                f"{self.items_per_second():.2f} items/s, ETA {eta_text}")
+
+class BatchCheckpoint:
+    """
+    An append-only NDJSON file of finished items. Items recorded with status "ok" are skipped when
+    the job runs again; failed ones are retried. A line cut off by a crash is dropped on open.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = None
+
+    def completed_ids(self) -> Set[str]:
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            complete = data.rfind(b"\n") + 1
+            if complete < len(data):
+                logger.warning(f"Dropping an incomplete last line from the batch checkpoint {self.path}.")
+                f.truncate(complete)
+        completed = set()
+        for line in data[:complete].splitlines():
+            record = loads(line)
+            if record.get("type") == "result" and record.get("status") == "ok":
+                completed.add(record["id"])
+        return completed
+
+    def append(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def checkpoint_for_job(job_id: str) -> BatchCheckpoint:
+    safe_id = "".join(char if char.isalnum() or char in "-_." else "_" for char in job_id)
+    return BatchCheckpoint(os.path.join(BATCH_CHECKPOINT_DIR, f"{safe_id}.ndjson"))
+
+class BatchJob:
+    """
+    Offline insight generation for many users, e.g. nightly spending insights.
+
+    For every item not yet in `completed_ids` the item's tools run against FinTrack, their
+    compacted results go behind the shared instruction prefix (get_insight_prefix) and one Ollama
+    generation writes the message. Fetches and generations have separate limits, so the data of
+    the next items is read while the current ones generate; generations use PRIORITY_BATCH, so
+    waiting interactive chats always get Ollama first.
+
+    Only tools in `allowed_tools` (the read-only ones) run; other requested calls fail the item.
+    Items with the same instruction are started next to each other so their prompts share a
+    cached prefix in Ollama, and items whose whole prompt is identical (e.g. users without any
+    data) reuse one generation.
+
+    `run` yields a result record per item as it finishes, a progress record every
+    BATCH_PROGRESS_SECONDS and a final progress record.
+    """
+
+    def __init__(self, items: List[BatchItem], runner: ToolRunner, allowed_tools: FrozenSet[str], completed_ids: Optional[Set[str]] = None,
+                 fetch_concurrency: int = BATCH_FETCH_CONCURRENCY, llm_concurrency: int = BATCH_LLM_CONCURRENCY):
+        completed_ids = completed_ids or set()
+        self.pending = sorted((item for item in items if item.id not in completed_ids), key=lambda item: item.prompt)
+        self.progress = BatchProgress(total=len(items), skipped=len(items) - len(self.pending))
+        self.runner = runner
+        self.allowed_tools = allowed_tools
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.llm_concurrency = max(1, llm_concurrency)
+        self._fetch_slots = asyncio.Semaphore(self.fetch_concurrency)
+        self._llm_slots = asyncio.Semaphore(self.llm_concurrency)
+        self._generated: "OrderedDict[str, str]" = OrderedDict()
+        BATCH_ITEMS.labels(outcome="skipped").inc(self.progress.skipped)
+
+    async def run(self) -> AsyncIterator[Dict[str, Any]]:
+        results: asyncio.Queue = asyncio.Queue()
+        next_item = iter(self.pending)
+
+        async def worker() -> None:
+            for item in next_item:
+                await results.put(await self._process(item))
+
+        # Enough workers to keep both limits busy: some fetch while others wait for Ollama.
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(len(self.pending), self.fetch_concurrency + self.llm_concurrency))]
+        last_progress = time.monotonic()
+        try:
+            for _ in range(len(self.pending)):
+                record = await results.get()
+                if record["status"] == "ok":
+                    self.progress.succeeded += 1
+                else:
+                    self.progress.failed += 1
+                yield record
+                if time.monotonic() - last_progress >= BATCH_PROGRESS_SECONDS:
+                    last_progress = time.monotonic()
+                    yield self.progress.to_record()
+            yield self.progress.to_record()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _process(self, item: BatchItem) -> Dict[str, Any]:
+        started = time.monotonic()
+        record = {"type": "result", "id": item.id, "userId": item.user_id}
+        with span("batch_item", item_id=item.id):
+            try:
+                outcomes = await self._fetch(item)
+                if outcomes and all(is_error_result(outcome.result) for outcome in outcomes):
+                    raise ValueError(f"Every data fetch failed: {outcomes[0].result.get('error')}")
+                prompt = get_insight_prompt(get_insight_prefix(item.prompt), outcome_payloads(outcomes))
+                record.update(status="ok", insight=await self._generate(prompt, item.user_id), tools=[outcome.name for outcome in outcomes])
+                BATCH_ITEMS.labels(outcome="ok").inc()
+            except (httpx.HTTPError, LlmOverloadedError, ValueError) as e:
+                logger.warning(f"Batch item '{item.id}' failed: {e}")
+                record.update(status="error", error=str(e) or type(e).__name__)
+                BATCH_ITEMS.labels(outcome="error").inc()
+            except Exception as e:
+                logger.error(f"Unexpected error in batch item '{item.id}': {e}", exc_info=True)
+                record.update(status="error", error="Unexpected error.")
+                BATCH_ITEMS.labels(outcome="error").inc()
+        duration = time.monotonic() - started
+        BATCH_ITEM_DURATION.observe(duration)
+        record["seconds"] = round(duration, 3)
+        return record
+
+    async def _fetch(self, item: BatchItem) -> List[ToolOutcome]:
+        outcomes = []
+        for call in item.tools:
+            name, arguments = call.get("name"), call.get("arguments") or {}
+            if name not in self.allowed_tools or not isinstance(arguments, dict):
+                raise ValueError(f"Tool '{name}' cannot be used in batch jobs; only read-only tools can.")
+            outcomes.append(ToolOutcome(name, arguments, None))
+
+        async def fetch(outcome: ToolOutcome) -> None:
+            async with self._fetch_slots:
+                try:
+                    outcome.result = await self.runner(outcome.name, dict(outcome.arguments), item.auth_token)
+                except Exception as e:
+                    logger.warning(f"Batch fetch '{outcome.name}' for item '{item.id}' failed: {e}")
+                    outcome.result = {"error": str(e)}
+        await asyncio.gather(*(fetch(outcome) for outcome in outcomes))
+        return outcomes
+
+    async def _generate(self, prompt: str, user_id: str) -> str:
+        # Concurrent identical prompts are already collapsed by generate()'s single-flight.
+        key = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        text = self._generated.get(key)
+        if text is not None:
+            self._generated.move_to_end(key)
+            BATCH_ITEMS.labels(outcome="deduplicated").inc()
+            return text
+        text = await self._generate_with_retries(prompt, user_id)
+        self._generated[key] = text
+        if len(self._generated) > BATCH_DEDUP_ENTRIES:
+            self._generated.popitem(last=False)
+        return text
+
+    async def _generate_with_retries(self, prompt: str, user_id: str) -> str:
+        for attempt in range(BATCH_OVERLOAD_RETRIES):
+            try:
+                async with self._llm_slots:
+                    with span(STAGE_INSIGHT):
+                        generation = await generate(prompt, timeout=BATCH_GENERATION_TIMEOUT, user_id=user_id, priority=PRIORITY_BATCH,
+                                                    model=model_for(STAGE_INSIGHT))
+                return generation.text.strip()
+            except LlmOverloadedError as overloaded:
+                if attempt == BATCH_OVERLOAD_RETRIES - 1:
+                    raise
+                await asyncio.sleep(max(1.0, overloaded.retry_after))
+        raise LlmOverloadedError("retries", 0)
+
+def read_items(path: str, prompt: Optional[str] = None) -> List[BatchItem]:
+    with open(path, encoding="utf-8") as f:
+        return [BatchItem.from_dict(loads(line), prompt) for line in f if line.strip()]
@@ -0,0 +1,188 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional, Protocol
+
+from prometheus_client import Counter, Gauge
+
+from Services.PromptBuilder import estimate_tokens
+from Services.JsonCodec import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+HISTORY_BACKEND = os.getenv("FINBOT_HISTORY_BACKEND", "memory").lower()
+HISTORY_SQLITE_PATH = os.getenv("FINBOT_HISTORY_SQLITE_PATH", "finbot_sessions.db")
+HISTORY_MAX_SESSIONS = int(os.getenv("FINBOT_HISTORY_MAX_SESSIONS", "5000"))
+HISTORY_TTL_SECONDS = float(os.getenv("FINBOT_HISTORY_TTL_SECONDS", "86400"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("FINBOT_HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("FINBOT_HISTORY_SUMMARY_MAX_CHARS", "1200"))
+# Each compacted turn leaves one line of at most this many characters in the rolling summary.
+SUMMARY_LINE_CHARS = 160
+
+# Worker processes share one SQLite store (every worker reports the same count) but each has its own memory store.
+HISTORY_SESSIONS = Gauge('finbot_history_sessions', 'Chat sessions held in the server-side history store',
+                         multiprocess_mode='livemax' if HISTORY_BACKEND == "sqlite" else 'livesum')
+HISTORY_COMPACTED_TURNS = Counter('finbot_history_compacted_turns_total', 'Turns folded into a rolling summary', ['outcome'])
+HISTORY_EVICTIONS = Counter('finbot_history_evictions_total', 'Chat sessions removed from the history store', ['reason'])
+
+@dataclass
+class HistoryTurn:
+    role: str
+    content: str
+
+@dataclass
+class ChatSession:
+    turns: List[HistoryTurn] = field(default_factory=list)
+    summary_lines: List[str] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_json(self) -> str:
+        return dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "ChatSession":
+        data = loads(payload)
+        return cls(turns=[HistoryTurn(**turn) for turn in data["turns"]], summary_lines=data["summary_lines"], updated_at=data["updated_at"])
+
+class HistoryBackend(Protocol):
+    def load(self, session_id: str) -> Optional[ChatSession]: ...
+    def save(self, session_id: str, session: ChatSession) -> None: ...
+
+class MemoryHistoryBackend:
+    """Process-local sessions with TTL expiry and LRU eviction beyond `max_sessions`."""
+
+    def __init__(self, max_sessions: int = HISTORY_MAX_SESSIONS, ttl_seconds: float = HISTORY_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and time.time() - session.updated_at > self.ttl_seconds:
+                del self._sessions[session_id]
+                HISTORY_EVICTIONS.labels(reason="ttl").inc()
+                HISTORY_SESSIONS.set(len(self._sessions))
+                return None
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session_id: str, session: ChatSession) -> None:
+        with self._lock:
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                HISTORY_EVICTIONS.labels(reason="lru").inc()
+            HISTORY_SESSIONS.set(len(self._sessions))
+
+class SqliteHistoryBackend:
+    """
+    Sessions in a local SQLite file, so conversations survive restarts and are shared by the
+    workers of one host. Expired rows are purged and the least recently updated sessions are
+    trimmed to `max_sessions` on write.
+    """
+
+    def __init__(self, path: str = HISTORY_SQLITE_PATH, max_sessions: int = HISTORY_MAX_SESSIONS, ttl_seconds: float = HISTORY_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS chat_sessions (session_id TEXT PRIMARY KEY, payload TEXT NOT NULL, updated_at REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_chat_sessions_updated_at ON chat_sessions (updated_at)")
+        logger.info(f"Chat history is stored in SQLite at {path}.")
+
+    def load(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            row = self._connection.execute("SELECT payload, updated_at FROM chat_sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return ChatSession.from_json(row[0])
+
+    def save(self, session_id: str, session: ChatSession) -> None:
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO chat_sessions (session_id, payload, updated_at) VALUES (?, ?, ?)",
+                                     (session_id, session.to_json(), session.updated_at))
+            expired = self._connection.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,)).rowcount
+            trimmed = self._connection.execute(
+                "DELETE FROM chat_sessions WHERE session_id IN (SELECT session_id FROM chat_sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)).rowcount
+            count = self._connection.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+        if expired:
+            HISTORY_EVICTIONS.labels(reason="ttl").inc(expired)
+        if trimmed:
+            HISTORY_EVICTIONS.labels(reason="lru").inc(trimmed)
+        HISTORY_SESSIONS.set(count)
+
+def _summary_line(turn: HistoryTurn) -> str:
+    text = " ".join(turn.content.split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 3] + "..."
+    return f"- {turn.role}: {text}"
+
+def session_key(user_id: str, session_id: str) -> str:
+    """
+    The storage key of a session. It includes the owning user, so another user sending the same
+    clientChatSessionId gets a new, empty session instead of the owner's turns.
+    """
+    return dumps([user_id, session_id])
+
+class ChatHistoryStore:
+    """
+    Server-side conversation history keyed by user and clientChatSessionId, so clients only send
+    the new message.
+
+    Once the stored turns exceed `token_budget`, the oldest ones are folded into a rolling
+    summary (one shortened line per turn) until the rest fits; the last exchange is always kept
+    verbatim. The summary itself is capped at `summary_max_chars`, dropping its oldest lines.
+    """
+
+    def __init__(self, backend: HistoryBackend, token_budget: int = HISTORY_TOKEN_BUDGET, summary_max_chars: int = HISTORY_SUMMARY_MAX_CHARS):
+        self.backend = backend
+        self.token_budget = token_budget
+        self.summary_max_chars = summary_max_chars
+
+    def history(self, user_id: str, session_id: str) -> List[HistoryTurn]:
+        """The session's turns for the prompt, led by the rolling summary when there is one."""
+        session = self.backend.load(session_key(user_id, session_id))
+        if session is None:
+            return []
+        if not session.summary_lines:
+            return list(session.turns)
+        summary = HistoryTurn(role="system", content="Summary of the earlier conversation:\n" + "\n".join(session.summary_lines))
+        return [summary, *session.turns]
+
+    def append(self, user_id: str, session_id: str, user_message: str, assistant_reply: str) -> bool:
+        """
+        Stores an exchange. Returns True when the session was compacted: the turns then sit at new
+        positions, so anything that remembers a position in the history (e.g. a stored Ollama
+        context's history_length) no longer lines up with it.
+        """
+        key = session_key(user_id, session_id)
+        session = self.backend.load(key) or ChatSession()
+        session.turns.extend([HistoryTurn("user", user_message), HistoryTurn("assistant", assistant_reply)])
+        compacted = self._compact(session)
+        session.updated_at = time.time()
+        self.backend.save(key, session)
+        return compacted
+
+    def _compact(self, session: ChatSession) -> bool:
+        turns, summary_lines = len(session.turns), list(session.summary_lines)
+        while len(session.turns) > 2 and sum(estimate_tokens(turn.content) for turn in session.turns) > self.token_budget:
+            session.summary_lines.append(_summary_line(session.turns.pop(0)))
+            HISTORY_COMPACTED_TURNS.labels(outcome="summarized").inc()
+        while session.summary_lines and sum(len(line) + 1 for line in session.summary_lines) > self.summary_max_chars:
+            session.summary_lines.pop(0)
+            HISTORY_COMPACTED_TURNS.labels(outcome="dropped").inc()
+        return len(session.turns) != turns or session.summary_lines != summary_lines
+
+def create_history_store() -> ChatHistoryStore:
+    backend = SqliteHistoryBackend() if HISTORY_BACKEND == "sqlite" else MemoryHistoryBackend()
+    return ChatHistoryStore(backend)
@@ -0,0 +1,149 @@
+import os
+import re
+import math
+import time
+import logging
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Services.ToolRouter import tokenize
+from Services.JsonCodec import loads
+
+logger = logging.getLogger(__name__)
+
+FAQ_MIN_SCORE = float(os.getenv("FINBOT_FAQ_MIN_SCORE", "3.0"))
+FAQ_RELOAD_CHECK_SECONDS = float(os.getenv("FINBOT_FAQ_RELOAD_CHECK_SECONDS", "5"))
+
+# Weight of one occurrence of a term in each field (BM25F-style weighted term frequency).
+FIELD_WEIGHTS = {"question": 2.0, "keywords": 3.0, "answer": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Added per word when a multi-word keyword ("credit card", "what can i do") appears verbatim in the query.
+PHRASE_WORD_BONUS = 1.0
+
+@dataclass(frozen=True)
+class FaqHit:
+    entry: Dict[str, Any]
+    score: float
+
+def _normalize(text: str) -> str:
+    return " " + " ".join(re.findall(r"[a-z0-9]+", text.lower())) + " "
+
+def _terms(text: str) -> List[str]:
+    """Unigrams plus adjacent bigrams, so word order inside a question still counts."""
+    tokens = tokenize(text)
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+class FaqIndex:
+    """
+    In-memory inverted index over the FAQ knowledge base with BM25 ranking.
+
+    Question, keywords and answer are indexed with different weights. Multi-word keywords also
+    match as phrases against the normalized query. The file is loaded on first use and reloaded
+    when its modification time changes (checked at most every FAQ_RELOAD_CHECK_SECONDS); a
+    reload builds a new index and swaps it in, so concurrent searches never see a partial one.
+    Reload listeners are called after a reload (not the first load), e.g. to drop cached answers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._reload_listeners: List[Callable[[], None]] = []
+        # (entries, postings, phrases by first word), replaced as a whole on reload. Each posting
+        # holds the ids of the entries containing the term and their idf-weighted BM25 scores.
+        self._state: Tuple[List[Dict[str, Any]], Dict[str, Tuple[np.ndarray, np.ndarray]], Dict[str, List[Tuple[str, int]]]] = ([], {}, {})
+
+    def add_reload_listener(self, listener: Callable[[], None]) -> None:
+        self._reload_listeners.append(listener)
+
+    def preload(self) -> None:
+        """Builds the index ahead of the first search (e.g. at startup)."""
+        self._ensure_fresh()
+
+    def search(self, query: str, top_k: int = 3, min_score: float = FAQ_MIN_SCORE) -> List[FaqHit]:
+        """The best `top_k` entries scoring at least `min_score`, best first. Raises OSError/ValueError if the file is unusable."""
+        self._ensure_fresh()
+        entries, postings, phrases = self._state
+        if not entries:
+            return []
+
+        matched = [postings[term] for term in set(_terms(query)) if term in postings]
+        normalized_query = _normalize(query)
+        phrase_hits = [(doc_id, PHRASE_WORD_BONUS * len(phrase.split()))
+                       for word in set(normalized_query.split()) for phrase, doc_id in phrases.get(word, ()) if phrase in normalized_query]
+        if phrase_hits:
+            matched.append((np.array([doc_id for doc_id, _ in phrase_hits]), np.array([bonus for _, bonus in phrase_hits])))
+        if not matched:
+            return []
+
+        # Term-at-a-time accumulation in one vectorized pass over all matched postings.
+        scores = np.bincount(np.concatenate([doc_ids for doc_ids, _ in matched]),
+                             weights=np.concatenate([weights for _, weights in matched]), minlength=len(entries))
+        candidates = np.flatnonzero(scores >= min_score)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        ranked = sorted(candidates.tolist(), key=lambda doc_id: -scores[doc_id])
+        return [FaqHit(entries[doc_id], round(float(scores[doc_id]), 4)) for doc_id in ranked]
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < FAQ_RELOAD_CHECK_SECONDS:
+            return
+        reloaded = False
+        with self._lock:
+            if self._mtime is not None and now - self._checked_at < FAQ_RELOAD_CHECK_SECONDS:
+                return
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if mtime != self._mtime:
+                    reloaded = self._mtime is not None
+                    self._build(mtime)
+            except (OSError, ValueError) as e:
+                if self._mtime is None:
+                    raise
+                logger.error(f"Could not reload the FAQ from {self.path}, keeping the previous index: {e}")
+            self._checked_at = now
+        if reloaded:
+            for listener in self._reload_listeners:
+                listener()
+
+    def _build(self, mtime: float) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            entries: List[Dict[str, Any]] = loads(f.read())
+
+        document_terms: List[Counter] = []
+        phrases: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        for doc_id, entry in enumerate(entries):
+            weighted = Counter()
+            fields = {"question": [entry.get("question", "")], "answer": [entry.get("answer", "")], "keywords": entry.get("keywords", [])}
+            for field, texts in fields.items():
+                for text in texts:
+                    for term in _terms(text):
+                        weighted[term] += FIELD_WEIGHTS[field]
+            document_terms.append(weighted)
+            for keyword in entry.get("keywords", []):
+                phrase = _normalize(keyword)
+                if len(phrase.split()) > 1:
+                    phrases[phrase.split()[0]].append((phrase, doc_id))
+
+        document_count = len(entries) or 1
+        average_length = sum(sum(terms.values()) for terms in document_terms) / document_count or 1.0
+        document_frequency = Counter(term for terms in document_terms for term in terms)
+        idf = {term: math.log(1 + (document_count - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for doc_id, terms in enumerate(document_terms):
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(terms.values()) / average_length)
+            for term, frequency in terms.items():
+                postings[term].append((doc_id, idf[term] * frequency * (BM25_K1 + 1) / (frequency + length_norm)))
+
+        arrays = {term: (np.array([doc_id for doc_id, _ in items], dtype=np.int64), np.array([score for _, score in items]))
+                  for term, items in postings.items()}
+        self._state = (entries, arrays, dict(phrases))
+        self._mtime = mtime
+        logger.info(f"Indexed {len(entries)} FAQ entries ({len(postings)} terms) from {self.path}.")
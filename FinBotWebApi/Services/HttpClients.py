@@ -0,0 +1,109 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_POOL = "ollama"
+FINTRACK_POOL = "fintrack"
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("FINBOT_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("FINBOT_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP2_REQUESTED = os.getenv("FINBOT_HTTP2_ENABLED", "true").lower() == "true"
+
+# (pool size, read timeout in seconds) per upstream.
+POOL_CONFIG: Dict[str, Tuple[int, float]] = {
+    OLLAMA_POOL: (int(os.getenv("FINBOT_OLLAMA_POOL_SIZE", "16")), float(os.getenv("FINBOT_OLLAMA_READ_TIMEOUT", "120"))),
+    FINTRACK_POOL: (int(os.getenv("FINBOT_FINTRACK_POOL_SIZE", "32")), float(os.getenv("FINBOT_FINTRACK_READ_TIMEOUT", "15"))),
+}
+
+try:
+    import h2  # noqa: F401  (only needed so httpx can negotiate HTTP/2 over TLS)
+    HTTP2_ENABLED = HTTP2_REQUESTED
+except ImportError:
+    HTTP2_ENABLED = False
+
+HTTP_POOL_SIZE = Gauge('finbot_http_pool_size', 'Configured connection pool size', ['pool'], multiprocess_mode='livesum')
+HTTP_POOL_IN_USE = Gauge('finbot_http_pool_in_use', 'Connections currently checked out of the pool', ['pool'], multiprocess_mode='livesum')
+HTTP_POOL_WAITING = Gauge('finbot_http_pool_waiting', 'Requests waiting for a free pool connection', ['pool'], multiprocess_mode='livesum')
+HTTP_POOL_WAIT_SECONDS = Histogram('finbot_http_pool_wait_seconds', 'Time spent waiting for a free pool connection', ['pool'])
+
+class PooledHttpClient:
+    """A keep-alive httpx.AsyncClient whose connection usage is bounded and exported to Prometheus."""
+
+    def __init__(self, name: str, pool_size: int, read_timeout: float):
+        self.name = name
+        self.pool_size = pool_size
+        self.read_timeout = read_timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+            timeout=self.timeout(read_timeout),
+        )
+        HTTP_POOL_SIZE.labels(pool=name).set(pool_size)
+
+    @staticmethod
+    def timeout(read_timeout: float) -> httpx.Timeout:
+        return httpx.Timeout(read_timeout, connect=HTTP_CONNECT_TIMEOUT)
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        wait_start = time.perf_counter()
+        HTTP_POOL_WAITING.labels(pool=self.name).inc()
+        try:
+            await self._slots.acquire()
+        finally:
+            HTTP_POOL_WAITING.labels(pool=self.name).dec()
+        HTTP_POOL_WAIT_SECONDS.labels(pool=self.name).observe(time.perf_counter() - wait_start)
+        HTTP_POOL_IN_USE.labels(pool=self.name).inc()
+        try:
+            yield
+        finally:
+            HTTP_POOL_IN_USE.labels(pool=self.name).dec()
+            self._slots.release()
+
+    async def request(self, method: str, url: str, read_timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        if read_timeout is not None:
+            kwargs["timeout"] = self.timeout(read_timeout)
+        async with self._slot():
+            return await self.client.request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, read_timeout: Optional[float] = None, **kwargs) -> AsyncIterator[httpx.Response]:
+        if read_timeout is not None:
+            kwargs["timeout"] = self.timeout(read_timeout)
+        async with self._slot():
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+_clients: Dict[str, PooledHttpClient] = {}
+
+async def start_http_clients() -> None:
+    """Creates one pooled client per upstream. Called from the FastAPI lifespan."""
+    for name, (pool_size, read_timeout) in POOL_CONFIG.items():
+        if name not in _clients:
+            _clients[name] = PooledHttpClient(name, pool_size, read_timeout)
+    logger.info(f"HTTP client pools started: {list(_clients)} (HTTP/2 enabled: {HTTP2_ENABLED})")
+
+async def close_http_clients() -> None:
+    for name in list(_clients):
+        await _clients.pop(name).aclose()
+    logger.info("HTTP client pools closed.")
+
+def get_http_client(name: str) -> PooledHttpClient:
+    """Returns the pooled client for an upstream, creating it lazily when used outside the app lifespan (scripts, benchmarks)."""
+    client = _clients.get(name)
+    if client is None:
+        pool_size, read_timeout = POOL_CONFIG[name]
+        client = _clients[name] = PooledHttpClient(name, pool_size, read_timeout)
+    return client
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional
+
+from prometheus_client import Counter
+
+from Services.ToolRouter import stem
+
+logger = logging.getLogger(__name__)
+
+FAST_PATH_ENABLED = os.getenv("FINBOT_FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_THRESHOLD = float(os.getenv("FINBOT_FAST_PATH_THRESHOLD", "0.8"))
+# Optional per-intent overrides, e.g. '{"get_budgets": 0.9}'.
+FAST_PATH_THRESHOLDS: Dict[str, float] = json.loads(os.getenv("FINBOT_FAST_PATH_THRESHOLDS", "{}"))
+
+FAST_PATH_REQUESTS = Counter('finbot_fast_path_requests_total', 'Deterministic intent fast path outcomes', ['outcome', 'intent'])
+
+READ_CUES = frozenset({"show", "list", "what", "which", "see", "view", "display", "tell", "my", "current", "have", "get", "check"})
+# Words that signal a write, a computation or an explanation request; those always go to the LLM.
+BLOCKERS = frozenset({
+    "create", "add", "new", "make", "open", "cancel", "delete", "remove", "close", "subscribe", "upgrade", "downgrade",
+    "change", "update", "set", "record", "transfer", "how", "why", "total", "sum", "spend", "spent", "compare",
+    "last", "month", "week", "year", "between", "and", "detail", "history", "past", "previous",
+})
+# Negations, advice and complaints ("don't show my accounts", "is my balance enough to...",
+# "my balance is wrong") need an answer, not a listing.
+NON_LISTING_WORDS = frozenset({
+    "not", "no", "never", "without", "cannot", "dont", "should", "enough", "wrong", "fix", "worth", "afford",
+    "recommend", "advice", "better", "best", "mean", "incorrect", "error", "missing",
+})
+# "what is a budget?" asks for an explanation (the FAQ), not the user's data.
+DEFINITION_QUESTION = re.compile(r"\bwhat(s| is| are|'s) (a|an)\b")
+SHORT_MESSAGE_WORDS = 6
+# Keyword matches score at most KEYWORD_SCORE + 0.3 (read cue, short message), below the default
+# threshold: only exact phrases take the fast path unless an intent's threshold is lowered.
+KEYWORD_SCORE = 0.4
+
+@dataclass(frozen=True)
+class IntentRule:
+    tool_name: str
+    any_of: FrozenSet[str]
+    all_of: FrozenSet[str] = frozenset()
+    requires_one_of: FrozenSet[str] = frozenset()
+    excluded: FrozenSet[str] = frozenset()
+    phrases: tuple = ()
+    # Patterns found anywhere in the message that rule the intent out, even for a keyword match.
+    excluded_phrases: tuple = ()
+
+@dataclass(frozen=True)
+class IntentMatch:
+    tool_name: str
+    confidence: float
+
+INTENT_RULES: List[IntentRule] = [
+    IntentRule(
+        tool_name="get_user_accounts",
+        any_of=frozenset({"account", "wallet", "balance"}),
+        excluded=frozenset({"transaction", "budget", "membership", "category"}),
+        phrases=(r"(show|list|display)( me)?( all)? my (accounts?|balances?)", r"what are my (accounts|balances)", r"my accounts"),
+    ),
+    IntentRule(
+        tool_name="get_budgets",
+        any_of=frozenset({"budget"}),
+        excluded=frozenset({"category", "account", "transaction"}),
+        phrases=(r"(show|list|display)( me)?( all)? my budgets", r"what are my budgets", r"my budgets"),
+    ),
+    IntentRule(
+        tool_name="get_current_user_membership",
+        any_of=frozenset({"membership", "subscription", "plan"}),
+        requires_one_of=frozenset({"my", "current", "active"}),
+        excluded=frozenset({"available", "option", "offer", "price", "pricing", "cost", "budget"}),
+        phrases=(r"what('s| is) my (current )?(membership|subscription|plan)", r"(show|display)( me)? my (current )?(membership|subscription|plan)",
+                 r"(what|which) (membership |subscription )?(plan|tier) am i on", r"my (current )?(membership |subscription )?plan"),
+    ),
+    IntentRule(
+        tool_name="get_available_membership_plans",
+        any_of=frozenset({"plan", "tier"}),
+        excluded=frozenset({"my", "current", "active", "budget"}),
+        phrases=(r"(what|which) (membership )?plans (are there|are available|do you (have|offer))", r"(show|list)( me)?( the)?( available)? (membership )?plans"),
+        excluded_phrases=(r"\bam i on\b", r"\bmy plan"),
+    ),
+    IntentRule(
+        tool_name="get_transaction_categories",
+        any_of=frozenset({"category"}),
+        all_of=frozenset({"transaction"}),
+        phrases=(r"(show|list)( me)? my transaction categories", r"what are my transaction categories"),
+    ),
+]
+
+def _normalize(message: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9' ]", " ", message.lower())).strip()
+
+class IntentMatcher:
+    """
+    Rule-based matcher for the zero-argument read tools.
+
+    A confident match lets the caller run the tool directly and render the reply from a template,
+    skipping both LLM round trips. Anything that looks like a write, a computation, a detail lookup
+    (digits), a negation, advice or a complaint, a definition question or that matches more than
+    one intent is left to the LLM. Keyword matches stay below the default threshold.
+    """
+
+    def __init__(self, rules: List[IntentRule] = INTENT_RULES):
+        self.rules = rules
+        self._phrases = {rule.tool_name: [re.compile(f"^(please )?{phrase}( please)?$") for phrase in rule.phrases] for rule in rules}
+        self._excluded_phrases = {rule.tool_name: [re.compile(phrase) for phrase in rule.excluded_phrases] for rule in rules}
+
+    def match(self, message: str) -> Optional[IntentMatch]:
+        normalized = _normalize(message)
+        words = normalized.split()
+        if not words or any(char.isdigit() for char in normalized):
+            return None
+        terms = {stem(word) for word in words}
+        if terms & BLOCKERS or {word.replace("'", "") for word in words} & NON_LISTING_WORDS or any(word.endswith("n't") for word in words):
+            return None
+        if DEFINITION_QUESTION.search(normalized):
+            return None
+
+        candidates = []
+        for rule in self.rules:
+            if any(pattern.search(normalized) for pattern in self._excluded_phrases[rule.tool_name]):
+                continue
+            if any(pattern.match(normalized) for pattern in self._phrases[rule.tool_name]):
+                candidates.append(IntentMatch(rule.tool_name, 1.0))
+                continue
+            if not terms & rule.any_of or not rule.all_of <= terms or terms & rule.excluded:
+                continue
+            if rule.requires_one_of and not terms & rule.requires_one_of:
+                continue
+            confidence = KEYWORD_SCORE
+            if terms & READ_CUES:
+                confidence += 0.2
+            if len(words) <= SHORT_MESSAGE_WORDS:
+                confidence += 0.1
+            candidates.append(IntentMatch(rule.tool_name, round(confidence, 2)))
+
+        if len(candidates) != 1:
+            return None
+        return candidates[0]
+
+    def threshold_for(self, tool_name: str) -> float:
+        return FAST_PATH_THRESHOLDS.get(tool_name, FAST_PATH_THRESHOLD)
+
+    def confident_match(self, message: str) -> Optional[IntentMatch]:
+        """Returns a match only when it clears the configured threshold, and records the outcome."""
+        intent = self.match(message)
+        if intent is None:
+            FAST_PATH_REQUESTS.labels(outcome="miss", intent="none").inc()
+            return None
+        if intent.confidence < self.threshold_for(intent.tool_name):
+            FAST_PATH_REQUESTS.labels(outcome="below_threshold", intent=intent.tool_name).inc()
+            return None
+        return intent
@@ -0,0 +1,68 @@
+import os
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+FAST_JSON_ENABLED = os.getenv("FINBOT_FAST_JSON_ENABLED", "true").lower() == "true"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson writes datetimes, dates, UUIDs, dataclasses and numpy arrays itself; everything else
+# goes through _default.
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+def _default(value: Any) -> Any:
+    """Decimals keep their exact digits as strings; numpy values become lists/numbers, dates ISO text, anything else str()."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+def _stdlib_dumps(value: Any) -> str:
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False)
+
+def dumps_bytes(value: Any) -> bytes:
+    """
+    Compact UTF-8 JSON, the single encoder of FinBot's request bodies, prompts, caches and responses.
+
+    Uses orjson when it is installed (FINBOT_FAST_JSON_ENABLED=false forces the standard library);
+    values orjson refuses, such as integers beyond 64 bits, fall back to the standard library,
+    which produces the same text.
+    """
+    if orjson is not None and FAST_JSON_ENABLED:
+        try:
+            return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(value).encode()
+
+def dumps(value: Any) -> str:
+    if orjson is not None and FAST_JSON_ENABLED:
+        return dumps_bytes(value).decode()
+    return _stdlib_dumps(value)
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Parses JSON text or UTF-8 bytes. Errors are json.JSONDecodeError in both modes (orjson's is a subclass)."""
+    if orjson is not None and FAST_JSON_ENABLED:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by the codec, so endpoint responses take the same fast path as everything else."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+if FAST_JSON_ENABLED and orjson is None:
+    logger.warning("orjson is not installed; JSON is encoded and decoded with the standard library.")
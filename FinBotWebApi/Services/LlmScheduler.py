@@ -0,0 +1,151 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("FINBOT_LLM_MAX_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.getenv("FINBOT_LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_DEADLINE_SECONDS = float(os.getenv("FINBOT_LLM_QUEUE_DEADLINE_SECONDS", "30"))
+# Initial guess for how long a call holds a slot, refined from observed calls.
+LLM_INITIAL_CALL_SECONDS = float(os.getenv("FINBOT_LLM_INITIAL_CALL_SECONDS", "5"))
+
+# Lower values are served first.
+PRIORITY_SUMMARIZE = 0
+PRIORITY_FORCED_TOOL = 1
+PRIORITY_GENERATE = 2
+# Offline batch jobs (Services/BatchInsights.py) only get slots no interactive call is waiting for.
+PRIORITY_BATCH = 3
+PRIORITY_NAMES = {PRIORITY_SUMMARIZE: "summarize", PRIORITY_FORCED_TOOL: "forced_tool", PRIORITY_GENERATE: "generate", PRIORITY_BATCH: "batch"}
+
+LLM_ACTIVE_CALLS = Gauge('finbot_llm_active_calls', 'LLM calls currently holding a scheduler slot', multiprocess_mode='livesum')
+LLM_QUEUE_DEPTH = Gauge('finbot_llm_queue_depth', 'LLM calls waiting for a scheduler slot', ['priority'], multiprocess_mode='livesum')
+LLM_QUEUE_WAIT = Histogram('finbot_llm_queue_wait_seconds', 'Time LLM calls waited for a scheduler slot', ['priority'], buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 20, 30, 60))
+LLM_SHED = Counter('finbot_llm_shed_total', 'LLM calls rejected by admission control', ['priority', 'reason'])
+
+EWMA_ALPHA = 0.2
+
+class LlmOverloadedError(Exception):
+    """Raised when an LLM call cannot be started within the queue deadline."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"LLM queue overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+class LlmScheduler:
+    """
+    Admission control and fair queueing for LLM calls.
+
+    At most `max_concurrency` calls run at once. Waiting calls are ordered by priority first
+    (summarization, then forced tool calls, then fresh generations) and, within a priority,
+    round-robin across users, so one user's burst cannot starve the others. A call is rejected
+    up front when the queue is full or the estimated wait already exceeds the deadline, and
+    gives up when it has waited for the deadline.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE, queue_deadline: float = LLM_QUEUE_DEADLINE_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_deadline = queue_deadline
+        self._active = 0
+        self._average_call_seconds = LLM_INITIAL_CALL_SECONDS
+        # priority -> user -> that user's waiters in arrival order
+        self._queues: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self._queued = 0
+
+    def estimated_wait(self, priority: int = PRIORITY_GENERATE) -> float:
+        if self._active < self.max_concurrency:
+            return 0.0
+        ahead = sum(len(waiters) for level, users in self._queues.items() if level <= priority for waiters in users.values())
+        return (ahead + 1) * self._average_call_seconds / self.max_concurrency
+
+    def check_admission(self, priority: int = PRIORITY_GENERATE) -> None:
+        """Raises LlmOverloadedError if a call of this priority would be shed right now."""
+        if self._active < self.max_concurrency:
+            return
+        if self._queued >= self.max_queue:
+            LLM_SHED.labels(priority=PRIORITY_NAMES[priority], reason="queue_full").inc()
+            raise LlmOverloadedError("queue_full", self.estimated_wait(priority))
+        estimated_wait = self.estimated_wait(priority)
+        if estimated_wait > self.queue_deadline:
+            LLM_SHED.labels(priority=PRIORITY_NAMES[priority], reason="deadline").inc()
+            raise LlmOverloadedError("deadline", estimated_wait)
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, priority: int = PRIORITY_GENERATE) -> AsyncIterator[None]:
+        await self._acquire(user_id or "anonymous", priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._average_call_seconds += EWMA_ALPHA * (time.monotonic() - started - self._average_call_seconds)
+            self._release()
+
+    async def _acquire(self, user_id: str, priority: int) -> None:
+        label = PRIORITY_NAMES[priority]
+        if self._active < self.max_concurrency:
+            self._active += 1
+            LLM_ACTIVE_CALLS.set(self._active)
+            LLM_QUEUE_WAIT.labels(priority=label).observe(0)
+            return
+
+        self.check_admission(priority)
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(user_id, deque()).append(waiter)
+        self._set_queued(self._queued + 1)
+        enqueued = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_deadline)
+        except asyncio.TimeoutError:
+            self._abandon(user_id, priority, waiter)
+            LLM_SHED.labels(priority=label, reason="timeout").inc()
+            raise LlmOverloadedError("timeout", self.estimated_wait(priority))
+        except asyncio.CancelledError:
+            self._abandon(user_id, priority, waiter)
+            raise
+        finally:
+            LLM_QUEUE_WAIT.labels(priority=label).observe(time.monotonic() - enqueued)
+
+    def _abandon(self, user_id: str, priority: int, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as the caller gave up; pass it on.
+            self._release()
+            return
+        waiter.cancel()
+        waiters = self._queues[priority].get(user_id)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self._set_queued(self._queued - 1)
+            if not waiters:
+                del self._queues[priority][user_id]
+
+    def _release(self) -> None:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            if not users:
+                continue
+            user_id, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+            del users[user_id]
+            if waiters:
+                # Round-robin: the user goes to the back of this priority's line.
+                users[user_id] = waiters
+            self._set_queued(self._queued - 1)
+            waiter.set_result(None)
+            return
+        self._active -= 1
+        LLM_ACTIVE_CALLS.set(self._active)
+
+    def _set_queued(self, queued: int) -> None:
+        self._queued = queued
+        for priority, users in self._queues.items():
+            LLM_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES[priority]).set(sum(len(waiters) for waiters in users.values()))
+
+LLM_SCHEDULER = LlmScheduler()
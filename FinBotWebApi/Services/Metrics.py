@@ -0,0 +1,37 @@
+import os
+import logging
+
+from prometheus_client import CollectorRegistry, generate_latest, multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Set (before prometheus_client is first imported) when several worker processes serve the app;
+# each worker then writes its samples to files in this directory. See gunicorn.conf.py.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+def metrics_payload() -> bytes:
+    """
+    The Prometheus exposition for /metrics. In multiprocess mode the samples of every worker are
+    merged (counters and histograms summed, gauges per their multiprocess_mode), so the result does
+    not depend on which worker answers the scrape.
+    """
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+def reset_multiprocess_dir() -> None:
+    """Empties the metrics directory before the first worker starts, so samples of a previous run are not merged in."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+        if name.endswith(".db"):
+            os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+
+def mark_worker_dead(pid: int) -> None:
+    """Drops the live gauges of an exited worker; its counters and histograms stay in the totals."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+        logger.info(f"Removed the live gauges of exited worker {pid} from the metrics.")
@@ -0,0 +1,109 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Union
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+from Services.OllamaPool import OLLAMA_BACKENDS
+from Services.JsonCodec import loads
+
+logger = logging.getLogger(__name__)
+
+STAGE_PLAN = "plan"
+STAGE_FORCED_TOOL = "forced_tool"
+STAGE_AGENT_STEP = "agent_step"
+STAGE_SUMMARIZE = "summarize"
+STAGE_INSIGHT = "insight"
+
+DEFAULT_MODEL = os.getenv("FINBOT_OLLAMA_MODEL", "mistral:instruct")
+MODEL_WARMUP_ENABLED = os.getenv("FINBOT_MODEL_WARMUP_ENABLED", "true").lower() == "true"
+MODEL_WARMUP_TIMEOUT = float(os.getenv("FINBOT_MODEL_WARMUP_TIMEOUT", "120"))
+
+def _keep_alive(value: str) -> Union[int, str]:
+    """Ollama takes a duration ("30m") or a number of seconds, where a negative number keeps the model loaded indefinitely."""
+    return int(value) if value.lstrip("-").isdigit() else value
+
+OLLAMA_KEEP_ALIVE = _keep_alive(os.getenv("FINBOT_OLLAMA_KEEP_ALIVE", "30m"))
+
+def _stage_model(stage: str, fallback: str) -> str:
+    return os.getenv(f"FINBOT_MODEL_{stage.upper()}", "").strip() or fallback
+
+# Planning picks tools and arguments from the whole conversation and needs the strongest model.
+# A confirmed tool call only repeats the agreed call as JSON, and summaries and insights only
+# describe data they are given, so these can go to a smaller, faster model. Agent steps may plan
+# further tool calls and follow the planning model unless set.
+_PLAN_MODEL = _stage_model(STAGE_PLAN, DEFAULT_MODEL)
+_SUMMARIZE_MODEL = _stage_model(STAGE_SUMMARIZE, DEFAULT_MODEL)
+STAGE_MODELS: Dict[str, str] = {
+    STAGE_PLAN: _PLAN_MODEL,
+    STAGE_FORCED_TOOL: _stage_model(STAGE_FORCED_TOOL, _PLAN_MODEL),
+    STAGE_AGENT_STEP: _stage_model(STAGE_AGENT_STEP, _PLAN_MODEL),
+    STAGE_SUMMARIZE: _SUMMARIZE_MODEL,
+    STAGE_INSIGHT: _stage_model(STAGE_INSIGHT, _SUMMARIZE_MODEL),
+}
+
+MODEL_ROUTES = Gauge('finbot_model_route', '1 for the Ollama model each pipeline stage is routed to', ['stage', 'model'], multiprocess_mode='max')
+MODEL_WARMUPS = Counter('finbot_ollama_model_warmups_total', 'Model preloads at startup per backend', ['model', 'outcome'])
+MODEL_WARMUP_DURATION = Histogram('finbot_ollama_model_warmup_seconds', 'Time to preload a model on one backend (mostly its load time when it was not resident)',
+                                  ['model'], buckets=(0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120))
+
+_warmup_task: Optional[asyncio.Task] = None
+
+def model_for(stage: str) -> str:
+    """The Ollama model configured for a pipeline stage (FINBOT_MODEL_<STAGE>, else FINBOT_OLLAMA_MODEL)."""
+    return STAGE_MODELS.get(stage, DEFAULT_MODEL)
+
+def configured_models() -> List[str]:
+    return list(dict.fromkeys(STAGE_MODELS.values()))
+
+def start_model_warmup() -> None:
+    """
+    Exports the model routes and preloads the configured models in the background. Called from
+    the FastAPI lifespan, which does not wait for it: a slow or unreachable Ollama must not hold
+    up startup, and until a model is loaded its first call simply pays the load.
+    """
+    global _warmup_task
+    for stage, model in STAGE_MODELS.items():
+        MODEL_ROUTES.labels(stage=stage, model=model).set(1)
+    logger.info(f"Model routes: {STAGE_MODELS} (keep_alive {OLLAMA_KEEP_ALIVE})")
+    if MODEL_WARMUP_ENABLED and (_warmup_task is None or _warmup_task.done()):
+        _warmup_task = asyncio.create_task(warm_models())
+
+async def stop_model_warmup() -> None:
+    """Cancels a preload still running at shutdown."""
+    global _warmup_task
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
+        _warmup_task = None
+
+async def warm_models() -> None:
+    """
+    Loads every configured model on every available Ollama backend and has Ollama keep it resident
+    for OLLAMA_KEEP_ALIVE, so the first chat after a deploy does not wait for model loads. A failed
+    preload is only logged and does not count toward the backend's circuit breaker.
+    """
+    async def warm(model: str) -> None:
+        started = time.perf_counter()
+        # A generate request without a prompt only loads the model.
+        results = await OLLAMA_BACKENDS.post_to_each("/api/generate", {"model": model, "keep_alive": OLLAMA_KEEP_ALIVE}, read_timeout=MODEL_WARMUP_TIMEOUT)
+        for backend, result in results.items():
+            if isinstance(result, httpx.HTTPError):
+                MODEL_WARMUPS.labels(model=model, outcome="failed").inc()
+                logger.warning(f"Could not preload model '{model}' on {backend}: {result}")
+                continue
+            MODEL_WARMUPS.labels(model=model, outcome="ok").inc()
+            MODEL_WARMUP_DURATION.labels(model=model).observe(time.perf_counter() - started)
+            load_seconds = (loads(result.content).get("load_duration") or 0) / 1e9
+            logger.info(f"Preloaded model '{model}' on {backend} (load {load_seconds:.2f}s)")
+
+    try:
+        await asyncio.gather(*(warm(model) for model in configured_models()))
+    except Exception as e:
+        logger.error(f"Model preload failed unexpectedly: {e}", exc_info=True)
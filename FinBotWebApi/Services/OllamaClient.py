@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+from Services.OllamaPool import OLLAMA_BACKENDS
+from Services.ModelRouter import DEFAULT_MODEL, OLLAMA_KEEP_ALIVE
+from Services.SingleFlight import SingleFlight, hash_key
+from Services.LlmScheduler import LLM_SCHEDULER, PRIORITY_GENERATE
+from Services.Tracing import current_span
+from Services.StructuredLogging import log_fields
+from Services.JsonCodec import loads
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_OPTIONS = {"temperature": 0.2, "stop": ["<|end|>"]}
+SINGLE_FLIGHT_ENABLED = os.getenv("FINBOT_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+_generations_in_flight = SingleFlight("ollama_generate")
+
+OLLAMA_PREFILL_TOKENS = Counter('finbot_ollama_prompt_eval_tokens_total', 'Prompt tokens Ollama had to prefill (prompt_eval_count)')
+# Per-generation statistics from Ollama's final chunk, labeled by the model and the pipeline stage (span) that asked for it.
+_TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+OLLAMA_PROMPT_EVAL_COUNT = Histogram('finbot_ollama_prompt_eval_count', 'Prompt tokens prefilled per generation', ['model', 'stage'], buckets=_TOKEN_BUCKETS)
+OLLAMA_EVAL_COUNT = Histogram('finbot_ollama_eval_count', 'Tokens generated per generation', ['model', 'stage'], buckets=_TOKEN_BUCKETS)
+OLLAMA_PROMPT_EVAL_DURATION = Histogram('finbot_ollama_prompt_eval_duration_seconds', 'Prefill time per generation (prompt_eval_duration)', ['model', 'stage'])
+OLLAMA_EVAL_DURATION = Histogram('finbot_ollama_eval_duration_seconds', 'Decode time per generation (eval_duration)', ['model', 'stage'])
+OLLAMA_LOAD_DURATION = Histogram('finbot_ollama_load_duration_seconds', 'Model load time per generation (load_duration)', ['model', 'stage'])
+OLLAMA_TOKENS = Counter('finbot_ollama_tokens_total', 'Tokens prefilled and generated per model and stage (finished generations)', ['model', 'stage', 'kind'])
+# Also recorded for streams closed early (e.g. once a tool call is complete), which never get a final chunk.
+OLLAMA_GENERATION_DURATION = Histogram('finbot_ollama_generation_duration_seconds', 'Wall time of a generation from request to last chunk read, per model and stage',
+                                       ['model', 'stage'], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120))
+
+def _current_stage() -> str:
+    span = current_span()
+    return span.name if span is not None else "none"
+
+@dataclass
+class OllamaGeneration:
+    """The text of a generation plus the metadata Ollama returns with its final chunk."""
+    text: str = ""
+    model: str = DEFAULT_MODEL
+    context: Optional[List[int]] = None
+    prompt_eval_count: int = 0
+    eval_count: int = 0
+    done: bool = False
+    metadata: dict = field(default_factory=dict)
+
+    def complete(self, final_chunk: dict) -> None:
+        self.done = True
+        self.context = final_chunk.get("context")
+        self.prompt_eval_count = final_chunk.get("prompt_eval_count", 0) or 0
+        self.eval_count = final_chunk.get("eval_count", 0) or 0
+        self.metadata = {key: value for key, value in final_chunk.items() if key not in ("response", "context")}
+        OLLAMA_PREFILL_TOKENS.inc(self.prompt_eval_count)
+        self._record_stats()
+
+    def _record_stats(self) -> None:
+        # Ollama reports durations in nanoseconds.
+        durations = {key: (self.metadata.get(key) or 0) / 1e9 for key in ("prompt_eval_duration", "eval_duration", "load_duration", "total_duration")}
+        span = current_span()
+        labels = {"model": self.model, "stage": _current_stage()}
+        OLLAMA_PROMPT_EVAL_COUNT.labels(**labels).observe(self.prompt_eval_count)
+        OLLAMA_EVAL_COUNT.labels(**labels).observe(self.eval_count)
+        OLLAMA_PROMPT_EVAL_DURATION.labels(**labels).observe(durations["prompt_eval_duration"])
+        OLLAMA_EVAL_DURATION.labels(**labels).observe(durations["eval_duration"])
+        OLLAMA_LOAD_DURATION.labels(**labels).observe(durations["load_duration"])
+        OLLAMA_TOKENS.labels(kind="prompt", **labels).inc(self.prompt_eval_count)
+        OLLAMA_TOKENS.labels(kind="generated", **labels).inc(self.eval_count)
+        if span is not None:
+            span.set(model=self.model, prompt_eval_count=self.prompt_eval_count, eval_count=self.eval_count,
+                     prompt_eval_seconds=durations["prompt_eval_duration"], eval_seconds=durations["eval_duration"],
+                     load_seconds=durations["load_duration"], ollama_total_seconds=durations["total_duration"],
+                     tokens_per_second=round(self.eval_count / durations["eval_duration"], 2) if durations["eval_duration"] else None)
+
+def _build_payload(prompt: str, stream: bool, context: Optional[List[int]], model: str) -> dict:
+    payload = {"model": model, "prompt": prompt, "stream": stream, "keep_alive": OLLAMA_KEEP_ALIVE, "options": OLLAMA_OPTIONS}
+    if context:
+        payload["context"] = context
+    return payload
+
+async def generate(prompt: str, timeout: float = 120, context: Optional[List[int]] = None, user_id: str = "", priority: int = PRIORITY_GENERATE,
+                   model: str = DEFAULT_MODEL) -> OllamaGeneration:
+    """
+    Sends a single non-streaming generation request to Ollama (the least busy healthy backend of
+    OLLAMA_BACKENDS) without blocking the event loop. `model` is the stage's model from
+    ModelRouter.model_for.
+
+    When `context` (the token state returned by a previous generation of the same model) is given, Ollama resumes
+    from it and only the new prompt text has to be prefilled. Identical requests already in
+    flight (retries, double submits) share a single generation. The call waits for an LLM
+    scheduler slot of the given priority and may raise LlmOverloadedError.
+    """
+    payload = _build_payload(prompt, False, context, model)
+    if not SINGLE_FLIGHT_ENABLED:
+        return await _generate(payload, timeout, user_id, priority)
+    return await _generations_in_flight.do(hash_key(OLLAMA_BACKENDS.key, payload), lambda: _generate(payload, timeout, user_id, priority))
+
+async def _generate(payload: dict, timeout: float, user_id: str, priority: int) -> OllamaGeneration:
+    async with LLM_SCHEDULER.slot(user_id, priority):
+        logger.info(f"Calling Ollama ({payload['model']})...")
+        started = time.perf_counter()
+        response = await OLLAMA_BACKENDS.post("/api/generate", payload, read_timeout=timeout)
+        OLLAMA_GENERATION_DURATION.labels(model=payload["model"], stage=_current_stage()).observe(time.perf_counter() - started)
+    body = loads(response.content)
+    generation = OllamaGeneration(text=body.get("response", "").strip(), model=payload["model"])
+    generation.complete(body)
+    logger.info("Ollama raw response", extra=log_fields(response=generation.text))
+    return generation
+
+async def call_ollama(prompt: str, timeout: float = 120, user_id: str = "", priority: int = PRIORITY_GENERATE, model: str = DEFAULT_MODEL) -> str:
+    return (await generate(prompt, timeout=timeout, user_id=user_id, priority=priority, model=model)).text
+
+async def stream_ollama(prompt: str, timeout: float = 120, context: Optional[List[int]] = None, generation: Optional[OllamaGeneration] = None,
+                        user_id: str = "", priority: int = PRIORITY_GENERATE, model: str = DEFAULT_MODEL) -> AsyncIterator[str]:
+    """
+    Yields response tokens from Ollama as they are generated.
+
+    Closing the generator early (e.g. with contextlib.aclosing) closes the HTTP stream,
+    which makes Ollama abort the rest of the generation. If `generation` is given it is
+    filled with the accumulated text and, when the stream finishes, the final metadata.
+    The scheduler slot is held until the stream ends or is closed.
+    """
+    async with LLM_SCHEDULER.slot(user_id, priority):
+        async with aclosing(_stream(prompt, timeout, context, generation, model)) as tokens:
+            async for token in tokens:
+                yield token
+
+async def _stream(prompt: str, timeout: float, context: Optional[List[int]], generation: Optional[OllamaGeneration], model: str) -> AsyncIterator[str]:
+    logger.info(f"Calling Ollama ({model}, streaming)...")
+    # Collected even when the caller does not ask for it, so the final chunk's statistics are recorded.
+    generation = generation if generation is not None else OllamaGeneration()
+    generation.model = model
+    started = time.perf_counter()
+    try:
+        async with aclosing(OLLAMA_BACKENDS.stream_lines("/api/generate", _build_payload(prompt, True, context, model), read_timeout=timeout)) as lines:
+            async for line in lines:
+                chunk = loads(line)
+                token = chunk.get("response", "")
+                if token:
+                    generation.text += token
+                    yield token
+                if chunk.get("done"):
+                    generation.complete(chunk)
+                    break
+    finally:
+        OLLAMA_GENERATION_DURATION.labels(model=model, stage=_current_stage()).observe(time.perf_counter() - started)
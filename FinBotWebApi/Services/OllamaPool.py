@@ -0,0 +1,363 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+from Services.HttpClients import get_http_client, OLLAMA_POOL
+from Services.JsonCodec import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated Ollama base URLs; a single OLLAMA_API_URL keeps working as a pool of one. All
+# backends must serve the same model, since a session's stored context may resume on any of them.
+OLLAMA_URLS = [url.strip().rstrip("/") for url in os.getenv("FINBOT_OLLAMA_URLS", os.getenv("OLLAMA_API_URL", "http://localhost:11434")).split(",") if url.strip()]
+# Consecutive failures (transport errors, timeouts, 5xx) after which a backend is ejected, and for how long.
+BREAKER_FAILURES = int(os.getenv("FINBOT_OLLAMA_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("FINBOT_OLLAMA_BREAKER_COOLDOWN_SECONDS", "15"))
+HEALTH_PATH = os.getenv("FINBOT_OLLAMA_HEALTH_PATH", "/api/tags")
+HEALTH_INTERVAL_SECONDS = float(os.getenv("FINBOT_OLLAMA_HEALTH_INTERVAL_SECONDS", "10"))
+HEALTH_TIMEOUT_SECONDS = float(os.getenv("FINBOT_OLLAMA_HEALTH_TIMEOUT_SECONDS", "2"))
+# Start the same generation on a second backend when the first has not answered (non-streaming)
+# or sent its first chunk (streaming) within this many seconds; 0 disables hedging.
+HEDGE_AFTER_SECONDS = float(os.getenv("FINBOT_OLLAMA_HEDGE_AFTER_SECONDS", "0"))
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+BACKEND_REQUESTS = Counter('finbot_ollama_backend_requests_total', 'Ollama requests per backend', ['backend', 'outcome'])
+BACKEND_LATENCY = Histogram('finbot_ollama_backend_latency_seconds', 'Time until a backend returned its response (non-streaming) or first chunk (streaming)',
+                            ['backend', 'mode'], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120))
+BACKEND_OUTSTANDING = Gauge('finbot_ollama_backend_outstanding', 'Requests in flight per Ollama backend', ['backend'], multiprocess_mode='livesum')
+BACKEND_AVAILABLE = Gauge('finbot_ollama_backend_available', '1 while the backend takes requests (circuit closed or half-open), 0 while ejected',
+                          ['backend'], multiprocess_mode='livemin')
+BREAKER_TRANSITIONS = Counter('finbot_ollama_breaker_transitions_total', 'Circuit breaker state changes per backend', ['backend', 'state'])
+HEALTH_CHECKS = Counter('finbot_ollama_health_checks_total', 'Ollama backend health checks', ['backend', 'outcome'])
+HEDGED_REQUESTS = Counter('finbot_ollama_hedged_requests_total', 'Generations also started on a second backend, by which one finished first', ['winner'])
+
+class NoHealthyBackendError(httpx.HTTPError):
+    """Raised when every Ollama backend is ejected, so callers fail in milliseconds instead of waiting for a timeout."""
+
+class OllamaBackend:
+    """One Ollama endpoint with its in-flight count and circuit breaker state."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        BACKEND_AVAILABLE.labels(backend=url).set(1)
+
+    def available(self, now: float) -> bool:
+        if self.state == STATE_OPEN and now - self.opened_at >= BREAKER_COOLDOWN_SECONDS:
+            self._transition(STATE_HALF_OPEN)
+        if self.state == STATE_HALF_OPEN:
+            # One trial request decides whether the backend is back.
+            return not self.trial_in_flight
+        return self.state == STATE_CLOSED
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != STATE_CLOSED:
+            self._transition(STATE_CLOSED)
+
+    def record_failure(self, reason: str) -> None:
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or (self.state == STATE_CLOSED and self.failures >= BREAKER_FAILURES):
+            logger.warning(f"Ejecting Ollama backend {self.url} for {BREAKER_COOLDOWN_SECONDS:.0f}s after {self.failures} failure(s), last: {reason}")
+            self.opened_at = time.monotonic()
+            self._transition(STATE_OPEN)
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        BREAKER_TRANSITIONS.labels(backend=self.url, state=state).inc()
+        BACKEND_AVAILABLE.labels(backend=self.url).set(0 if state == STATE_OPEN else 1)
+
+def _is_backend_failure(error: BaseException) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+def _describe(error: BaseException) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}"
+    return f"{type(error).__name__}: {error}"
+
+def _is_retryable(error: httpx.HTTPError) -> bool:
+    """Failures before the backend generated anything, so another backend can take the call without repeating work."""
+    return isinstance(error, httpx.ConnectError) or (isinstance(error, httpx.HTTPStatusError) and error.response.status_code >= 500)
+
+class OllamaBackendPool:
+    """
+    Spreads Ollama calls over several backends.
+
+    Each call goes to the available backend with the fewest requests in flight. A backend that
+    fails BREAKER_FAILURES times in a row, or fails its health check, is ejected for
+    BREAKER_COOLDOWN_SECONDS; then a single trial request (or a passing health check) decides
+    whether it comes back. Calls that cannot connect or get a 5xx are retried on another backend
+    right away; timeouts are not, as their time is already spent. With HEDGE_AFTER_SECONDS set, a
+    slow call is raced against the same call on a second backend and the one that answers first
+    is used; the other is cancelled.
+    """
+
+    def __init__(self, urls: List[str], hedge_after: float = HEDGE_AFTER_SECONDS):
+        self.backends = [OllamaBackend(url) for url in urls]
+        self.hedge_after = hedge_after
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def key(self) -> str:
+        return ",".join(backend.url for backend in self.backends)
+
+    def _candidates(self, exclude: List[OllamaBackend]) -> List[OllamaBackend]:
+        now = time.monotonic()
+        return [backend for backend in self.backends if backend not in exclude and backend.available(now)]
+
+    def pick(self, exclude: List[OllamaBackend]) -> OllamaBackend:
+        candidates = self._candidates(exclude)
+        if not candidates:
+            raise NoHealthyBackendError("No healthy Ollama backend is available.")
+        fewest = min(backend.outstanding for backend in candidates)
+        backend = random.choice([candidate for candidate in candidates if candidate.outstanding == fewest])
+        if backend.state == STATE_HALF_OPEN:
+            backend.trial_in_flight = True
+        return backend
+
+    def _begin(self, backend: OllamaBackend) -> None:
+        backend.outstanding += 1
+        BACKEND_OUTSTANDING.labels(backend=backend.url).inc()
+
+    def _end(self, backend: OllamaBackend, outcome: str, error: Optional[BaseException] = None) -> None:
+        backend.outstanding -= 1
+        backend.trial_in_flight = False
+        BACKEND_OUTSTANDING.labels(backend=backend.url).dec()
+        BACKEND_REQUESTS.labels(backend=backend.url, outcome=outcome).inc()
+        if error is not None and _is_backend_failure(error):
+            backend.record_failure(_describe(error))
+        elif outcome == "ok":
+            backend.record_success()
+
+    async def _post(self, backend: OllamaBackend, path: str, payload: Dict[str, Any], read_timeout: float) -> httpx.Response:
+        self._begin(backend)
+        started = time.perf_counter()
+        try:
+            response = await get_http_client(OLLAMA_POOL).request("POST", f"{backend.url}{path}", read_timeout=read_timeout, content=dumps_bytes(payload), headers=JSON_HEADERS)
+            response.raise_for_status()
+        except asyncio.CancelledError:
+            self._end(backend, "cancelled")
+            raise
+        except httpx.HTTPError as e:
+            self._end(backend, "error", e)
+            raise
+        BACKEND_LATENCY.labels(backend=backend.url, mode="response").observe(time.perf_counter() - started)
+        self._end(backend, "ok")
+        return response
+
+    def _next_backend(self, tried: List[OllamaBackend], retry_error: Optional[httpx.HTTPError]) -> OllamaBackend:
+        """The backend for the next attempt; after a retryable error with nowhere else to go, that error is raised."""
+        if retry_error is not None:
+            if not self._candidates(tried):
+                raise retry_error
+            logger.warning(f"Ollama backend {tried[-1].url} failed before answering ({_describe(retry_error)}); trying another one.")
+        backend = self.pick(tried)
+        tried.append(backend)
+        return backend
+
+    def _should_hedge(self) -> bool:
+        return bool(self.hedge_after) and len(self.backends) > 1
+
+    async def _post_with_failover(self, path: str, payload: Dict[str, Any], read_timeout: float, tried: List[OllamaBackend]) -> httpx.Response:
+        retry_error = None
+        while True:
+            backend = self._next_backend(tried, retry_error)
+            try:
+                return await self._post(backend, path, payload, read_timeout)
+            except httpx.HTTPError as e:
+                if not _is_retryable(e):
+                    raise
+                retry_error = e
+
+    async def post(self, path: str, payload: Dict[str, Any], read_timeout: float) -> httpx.Response:
+        """POSTs to one backend and returns its successful (2xx) response; raises httpx.HTTPError otherwise."""
+        tried: List[OllamaBackend] = []
+        if not self._should_hedge():
+            return await self._post_with_failover(path, payload, read_timeout, tried)
+        primary = asyncio.ensure_future(self._post_with_failover(path, payload, read_timeout, tried))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done or not self._candidates(tried):
+            return await primary
+        hedge = asyncio.ensure_future(self._post_with_failover(path, payload, read_timeout, tried))
+        return await self._first_success(primary, hedge)
+
+    @staticmethod
+    async def _first_success(primary: asyncio.Future, hedge: asyncio.Future) -> Any:
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.exception() is None:
+                        HEDGED_REQUESTS.labels(winner="primary" if finished is primary else "hedge").inc()
+                        return finished.result()
+                    error = error or finished.exception()
+            raise error
+        finally:
+            for unfinished in pending:
+                unfinished.cancel()
+
+    async def _stream_from(self, backend: OllamaBackend, path: str, payload: Dict[str, Any], read_timeout: float) -> AsyncIterator[str]:
+        """Lines of one backend's streamed response; the first yielded line marks the call as answered."""
+        self._begin(backend)
+        started = time.perf_counter()
+        outcome, error = "cancelled", None
+        try:
+            async with get_http_client(OLLAMA_POOL).stream("POST", f"{backend.url}{path}", read_timeout=read_timeout, content=dumps_bytes(payload), headers=JSON_HEADERS) as response:
+                response.raise_for_status()
+                first = True
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    if first:
+                        first = False
+                        BACKEND_LATENCY.labels(backend=backend.url, mode="first_chunk").observe(time.perf_counter() - started)
+                        # Answering at all is what the breaker cares about; a caller stopping early is fine.
+                        outcome = "ok"
+                    yield line
+        except httpx.HTTPError as e:
+            outcome, error = "error", e
+            raise
+        finally:
+            self._end(backend, outcome, error)
+
+    async def _open_stream(self, path: str, payload: Dict[str, Any], read_timeout: float, tried: List[OllamaBackend]) -> Tuple[AsyncIterator[str], Optional[str]]:
+        """Starts a streamed call (failing over on connect errors) and returns its lines and the first line."""
+        retry_error = None
+        while True:
+            backend = self._next_backend(tried, retry_error)
+            lines = self._stream_from(backend, path, payload, read_timeout)
+            try:
+                return lines, await lines.__anext__()
+            except StopAsyncIteration:
+                return lines, None
+            except httpx.HTTPError as e:
+                await lines.aclose()
+                if not _is_retryable(e):
+                    raise
+                retry_error = e
+            except BaseException:
+                await lines.aclose()
+                raise
+
+    async def stream_lines(self, path: str, payload: Dict[str, Any], read_timeout: float) -> AsyncIterator[str]:
+        """
+        Yields the non-empty lines of a streamed POST. Closing the generator closes the HTTP
+        stream, which makes Ollama stop generating.
+        """
+        tried: List[OllamaBackend] = []
+        if not self._should_hedge():
+            lines, first_line = await self._open_stream(path, payload, read_timeout, tried)
+        else:
+            opened = [asyncio.ensure_future(self._open_stream(path, payload, read_timeout, tried))]
+            winner = None
+            try:
+                done, _ = await asyncio.wait(set(opened), timeout=self.hedge_after)
+                if not done and self._candidates(tried):
+                    opened.append(asyncio.ensure_future(self._open_stream(path, payload, read_timeout, tried)))
+                winner = await (self._first_success(*opened) if len(opened) > 1 else opened[0])
+            finally:
+                await self._close_losers(opened, winner)
+            lines, first_line = winner
+        async with aclosing(lines):
+            if first_line is None:
+                return
+            yield first_line
+            async for line in lines:
+                yield line
+
+    @staticmethod
+    async def _close_losers(opened: List[asyncio.Future], winner: Optional[tuple]) -> None:
+        """Cancels the streams still opening and closes every opened one except the winner."""
+        for future in opened:
+            if not future.done():
+                future.cancel()
+                try:
+                    await future
+                except BaseException:
+                    pass
+            elif not future.cancelled() and future.exception() is None and future.result() is not winner:
+                await future.result()[0].aclose()
+
+    async def post_to_each(self, path: str, payload: Dict[str, Any], read_timeout: float) -> Dict[str, Union[httpx.Response, httpx.HTTPError]]:
+        """
+        Sends the same request to every available backend at once (e.g. a model preload); returns
+        each backend's response or error. These requests bypass the circuit breaker and request
+        metrics: a preload of a missing model (404) or a slow load must not eject a healthy backend.
+        """
+        async def send(backend: OllamaBackend) -> Union[httpx.Response, httpx.HTTPError]:
+            try:
+                response = await get_http_client(OLLAMA_POOL).request("POST", f"{backend.url}{path}", read_timeout=read_timeout,
+                                                                      content=dumps_bytes(payload), headers=JSON_HEADERS)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                return e
+
+        backends = self._candidates([])
+        results = await asyncio.gather(*(send(backend) for backend in backends))
+        return {backend.url: result for backend, result in zip(backends, results)}
+
+    async def check_health(self) -> None:
+        """Probes every backend once; a failing probe ejects the backend, a passing one ends its cooldown early."""
+        async def probe(backend: OllamaBackend) -> None:
+            try:
+                response = await get_http_client(OLLAMA_POOL).request("GET", f"{backend.url}{HEALTH_PATH}", read_timeout=HEALTH_TIMEOUT_SECONDS)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                HEALTH_CHECKS.labels(backend=backend.url, outcome="failed").inc()
+                if backend.state != STATE_OPEN:
+                    backend.failures = max(backend.failures, BREAKER_FAILURES - 1)
+                    backend.record_failure(f"health check: {_describe(e)}")
+                return
+            HEALTH_CHECKS.labels(backend=backend.url, outcome="ok").inc()
+            if backend.state == STATE_OPEN:
+                logger.info(f"Ollama backend {backend.url} passed its health check; taking requests again.")
+                backend.record_success()
+
+        await asyncio.gather(*(probe(backend) for backend in self.backends))
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(HEALTH_INTERVAL_SECONDS)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"Ollama health check failed unexpectedly: {e}", exc_info=True)
+
+    def start(self) -> None:
+        """Starts the periodic health checks. Called from the FastAPI lifespan."""
+        if self._health_task is None and HEALTH_INTERVAL_SECONDS > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+            logger.info(f"Ollama backends: {[backend.url for backend in self.backends]} (hedging after {self.hedge_after}s)" if self.hedge_after
+                        else f"Ollama backends: {[backend.url for backend in self.backends]}")
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+OLLAMA_BACKENDS = OllamaBackendPool(OLLAMA_URLS)
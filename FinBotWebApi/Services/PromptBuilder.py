@@ -0,0 +1,150 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol, Sequence
+
+from Services.JsonCodec import dumps
+
+SYSTEM_PROMPT = """You are FinBot, an expert, proactive, and transparent financial assistant. Your primary goal is to help the user while making them feel in control and informed.
+
+**Your Core Persona:**
+- **Friendly & Empathetic:** Always be polite and acknowledge the user's goal.
+- **Transparent:** Before you perform an action (use a tool), explain what you are about to do and why.
+- **Proactive:** If a user's request is ambiguous, ask clarifying questions instead of guessing.
+
+**Your Workflow (Reason, Confirm, Act):**
+1.  **Reason:** Analyze the user's request and conversation history to form a plan. This might involve one or more tool calls.
+2.  **Confirm & Act (The MOST IMPORTANT step):**
+    -   If a tool is needed, **DO NOT** output the tool's JSON immediately. Instead, first, respond with a clear, conversational message explaining your plan. For example: "To calculate your remaining balance, I first need to fetch your latest transactions. Is that okay?"
+    -   If the user's request requires a tool call to proceed, you **MUST** respond with the tool's JSON object **ONLY** in a ```json ... ``` block. This will be triggered by a specific directive in the prompt.
+    -   If several independent tool calls are needed (for example the transactions of each account), put them all in one JSON array in that block; they are executed together.
+    -   If no tool is needed, just have a normal, helpful conversation.
+
+**You will be given a specific TASK in the prompt. Follow it precisely.**"""
+
+# Rough characters-per-token ratio of the model's tokenizer on English text.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class ChatTurn(Protocol):
+    role: str
+    content: str
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """The byte-stable head of every generation prompt: system prompt plus tool catalog."""
+    key: str
+    text: str
+
+_prefix_cache: Dict[tuple, PromptPrefix] = {}
+
+def serialize_tool_catalog(tools: List[Dict[str, Any]]) -> str:
+    """Compact JSON for the tool catalog; the tool definitions are static, so the output is byte-stable."""
+    return dumps(tools)
+
+def get_prompt_prefix(tools: List[Dict[str, Any]]) -> PromptPrefix:
+    """
+    Returns the prompt prefix for a tool catalog, building it only once per distinct catalog.
+
+    Keeping the prefix byte-identical across requests lets Ollama reuse its cached KV state for it.
+    """
+    cache_key = tuple(tool["name"] for tool in tools)
+    prefix = _prefix_cache.get(cache_key)
+    if prefix is None:
+        text = f"""{SYSTEM_PROMPT}
+
+**Available Tools:**
+{serialize_tool_catalog(tools)}
+"""
+        prefix = PromptPrefix(key=hashlib.sha1(text.encode("utf-8")).hexdigest()[:16], text=text)
+        _prefix_cache[cache_key] = prefix
+    return prefix
+
+_insight_prefix_cache: Dict[str, PromptPrefix] = {}
+
+def get_insight_prefix(instruction: str) -> PromptPrefix:
+    """
+    The leading part of a batch insight prompt, built once per distinct instruction.
+
+    Every user's data comes after it, so consecutive prompts of a job share this byte-identical
+    prefix and Ollama only prefills it once per cached slot.
+    """
+    prefix = _insight_prefix_cache.get(instruction)
+    if prefix is None:
+        text = f"""You are FinBot, a friendly and transparent financial assistant. You are writing one message for a user, based only on their data below.
+**TASK:** {instruction}
+Nobody will reply to this message: do not ask questions or offer to run tools, and do not invent numbers that are not in the data.
+
+**The user's data:**
+"""
+        prefix = PromptPrefix(key=hashlib.sha1(text.encode("utf-8")).hexdigest()[:16], text=text)
+        _insight_prefix_cache[instruction] = prefix
+    return prefix
+
+def get_insight_prompt(prefix: PromptPrefix, tool_results: List[Dict[str, Any]]) -> str:
+    return f"""{prefix.text}{dumps(tool_results)}
+
+**Message:**
+"""
+
+def render_turns(turns: Sequence[ChatTurn]) -> str:
+    return "\n".join([f"<|{turn.role}|>\n{turn.content}<|end|>" for turn in turns])
+
+def get_user_turn(user_message: str) -> str:
+    return f"""<|user|>
+{user_message}
+<|end|>
+<|assistant|>
+"""
+
+def get_generation_prompt(prefix: PromptPrefix, user_message: str, history: Sequence[ChatTurn]) -> str:
+    return f"""{prefix.text}
+**Conversation History:**
+{render_turns(history)}
+{get_user_turn(user_message)}"""
+
+def get_continuation_prompt(carry_over: str, new_history: Sequence[ChatTurn], user_message: str) -> str:
+    """
+    Prompt for a turn that resumes from a stored Ollama context.
+
+    Only what the context does not already contain is sent: turns the user saw but the model
+    did not generate in that context (carry_over), any history the client added since, and the
+    new user message.
+    """
+    parts = [part for part in (carry_over, render_turns(new_history)) if part]
+    parts.append(get_user_turn(user_message))
+    return "\n".join(parts)
+
+def get_forced_tool_call_prompt(original_prompt_context: str) -> str:
+    return f"""{original_prompt_context}
+**TASK:** The user has confirmed. Your only task now is to generate the JSON for the next logical tool call based on the conversation. Respond with **ONLY** the JSON object in a ```json ... ``` block, or a JSON array of objects if several independent calls are needed. Do not add any other text."""
+
+def get_summarization_prompt(tool_name: str, function_result: dict, user_request: str) -> str:
+    result_str = dumps(function_result)
+    return f"""The user's request was: "{user_request}".
+A tool named '{tool_name}' was just executed and returned this data: {result_str}.
+
+Your task is to present this result to the user in a helpful, clear, and conversational way.
+- **If successful:** Explain what the data means. Don't just list it. For example, instead of "Here is a list...", say "I found three accounts for you: your 'Main Checking' has $500, and...".
+- **If data is empty:** Reassure the user. For example: "It looks like you don't have any budgets set up yet. Would you like to create one?"
+- **If error:** Apologize and explain the error simply. Example: "I'm sorry, I couldn't find an account with that ID. Could you please double-check the number?"
+
+Now, generate a user-friendly response."""
+
+def get_agent_step_prompt(user_request: str, tool_results: List[Dict[str, Any]], follow_up_tools: Optional[List[Dict[str, Any]]]) -> str:
+    """
+    Prompt for the step after tool calls were executed in an agent turn: the model either asks
+    for more (read-only) tool calls, or answers. Without `follow_up_tools` it can only answer.
+    """
+    results_str = dumps(tool_results)
+    if follow_up_tools:
+        task = f"""If you need more data to answer, respond with **ONLY** a ```json ... ``` block holding a JSON array of the tool calls you need, e.g. [{{"name": "...", "arguments": {{...}}}}]. Put every independent call in the same array; they run together. You can only use these tools: {serialize_tool_catalog(follow_up_tools)}
+Otherwise, answer the user directly."""
+    else:
+        task = "Answer the user directly from these results; no more tools can be called."
+    return f"""The user's request was: "{user_request}".
+These tools were just executed and returned this data: {results_str}.
+
+{task}
+When you answer, be helpful, clear and conversational: explain what the data means (combine the results, e.g. add up totals across accounts per currency) instead of listing it. If a result is an error, apologize and explain it simply."""
@@ -0,0 +1,158 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional, Set
+
+from prometheus_client import Counter, Gauge
+
+from Services.ToolRouter import tokenize
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("FINBOT_RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("FINBOT_RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("FINBOT_RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("FINBOT_RESPONSE_CACHE_SIMILARITY", "0.75"))
+
+RESPONSE_CACHE_LOOKUPS = Counter('finbot_response_cache_lookups_total', 'Response cache lookups', ['outcome'])
+RESPONSE_CACHE_LATENCY_SAVED = Counter('finbot_response_cache_latency_saved_seconds_total', 'Generation time avoided by serving cached replies')
+RESPONSE_CACHE_EVICTIONS = Counter('finbot_response_cache_evictions_total', 'Cached replies removed', ['reason'])
+RESPONSE_CACHE_ENTRIES = Gauge('finbot_response_cache_entries', 'Replies held in the response cache', multiprocess_mode='livesum')
+
+# Where a cached reply came from. FAQ answers depend only on the question; plain conversational
+# replies are only cached and served without any conversation around them.
+SOURCE_FAQ = "faq"
+SOURCE_CONVERSATION = "conversation"
+
+NGRAM_SIZE = 3
+# Similarity blends the overlap of stemmed content words (robust to "do I"/"can I" rewording)
+# with character trigram overlap (robust to small spelling differences).
+TERM_WEIGHT = 0.7
+# Similar questions must agree on these words and on any numbers ("my budget" is not "a budget").
+GUARD_WORDS = frozenset({"my", "mine", "me", "i", "not", "no", "don't", "can't", "without"})
+
+@dataclass
+class CachedReply:
+    reply: str
+    source: str
+    terms: FrozenSet[str]
+    ngrams: FrozenSet[str]
+    guard: FrozenSet[str]
+    generation_seconds: float
+    created_at: float = field(default_factory=time.monotonic)
+
+def normalize_message(message: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", message.lower()))
+
+def _guard(text: str) -> FrozenSet[str]:
+    return frozenset(word for word in text.split() if word in GUARD_WORDS or any(char.isdigit() for char in word))
+
+def _jaccard(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    return len(first & second) / len(first | second) if first or second else 0.0
+
+def _ngrams(text: str) -> FrozenSet[str]:
+    padded = f" {text} "
+    return frozenset(padded[i:i + NGRAM_SIZE] for i in range(max(1, len(padded) - NGRAM_SIZE + 1)))
+
+class ResponseCache:
+    """
+    Cache of replies to non-personal questions, looked up by exact normalized text first and
+    then by similarity, so "How do I create a budget?" also answers "how can i create a budget".
+    Callers must only store replies that did not use any per-user data; the cache itself cannot
+    tell.
+
+    Candidates for the similarity lookup come from an inverted index of content words, entries
+    expire after a TTL and the least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS, similarity: float = RESPONSE_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._entries: "OrderedDict[str, CachedReply]" = OrderedDict()
+        self._term_index: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, message: str, allow_conversation: bool = True) -> Optional[CachedReply]:
+        """
+        Returns the cached reply for the message or a similar enough one. Conversational replies
+        are skipped unless `allow_conversation`, i.e. the request has no conversation around it.
+        """
+        key = normalize_message(message)
+        if not key:
+            return None
+        with self._lock:
+            outcome, entry = "exact", self._live_entry(key)
+            if entry is None:
+                outcome, key, entry = "similar", *self._most_similar(key)
+            if entry is not None and (allow_conversation or entry.source == SOURCE_FAQ):
+                self._entries.move_to_end(key)
+                RESPONSE_CACHE_LOOKUPS.labels(outcome=outcome).inc()
+                return entry
+        RESPONSE_CACHE_LOOKUPS.labels(outcome="miss").inc()
+        return None
+
+    def put(self, message: str, reply: str, source: str, generation_seconds: float) -> None:
+        key = normalize_message(message)
+        if not key or not reply.strip():
+            return
+        with self._lock:
+            self._remove(key, None)
+            entry = CachedReply(reply, source, frozenset(tokenize(key)), _ngrams(key), _guard(key), generation_seconds)
+            self._entries[key] = entry
+            for term in entry.terms:
+                self._term_index[term].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)), "lru")
+            RESPONSE_CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self, source: Optional[str] = None) -> None:
+        """Drops every entry, or only those of one source (e.g. SOURCE_FAQ after the FAQ changed)."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if source is None or entry.source == source]:
+                self._remove(key, "cleared")
+            RESPONSE_CACHE_ENTRIES.set(len(self._entries))
+
+    def record_hit(self, entry: CachedReply, served_seconds: float) -> None:
+        RESPONSE_CACHE_LATENCY_SAVED.inc(max(0.0, entry.generation_seconds - served_seconds))
+
+    def _live_entry(self, key: str) -> Optional[CachedReply]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created_at > self.ttl_seconds:
+            self._remove(key, "ttl")
+            return None
+        return entry
+
+    def _most_similar(self, key: str):
+        terms, ngrams, guard = frozenset(tokenize(key)), _ngrams(key), _guard(key)
+        candidates = set().union(*(self._term_index.get(term, ()) for term in terms))
+        best_key, best_score = None, 0.0
+        for candidate in candidates:
+            entry = self._entries[candidate]
+            if entry.guard != guard:
+                continue
+            score = TERM_WEIGHT * _jaccard(terms, entry.terms) + (1 - TERM_WEIGHT) * _jaccard(ngrams, entry.ngrams)
+            if score > best_score:
+                best_key, best_score = candidate, score
+        if best_key is None or best_score < self.similarity:
+            return None, None
+        entry = self._live_entry(best_key)
+        return (best_key, entry) if entry is not None else (None, None)
+
+    def _remove(self, key: str, reason: Optional[str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for term in entry.terms:
+            keys = self._term_index.get(term)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._term_index[term]
+        if reason is not None:
+            RESPONSE_CACHE_EVICTIONS.labels(reason=reason).inc()
+        RESPONSE_CACHE_ENTRIES.set(len(self._entries))
@@ -0,0 +1,407 @@
+import os
+import re
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import Counter
+
+from Services.JsonCodec import dumps
+
+logger = logging.getLogger(__name__)
+
+RENDER_MAX_ROWS = int(os.getenv("FINBOT_RENDER_MAX_ROWS", "10"))
+SUMMARY_MAX_ITEMS = int(os.getenv("FINBOT_SUMMARY_MAX_ITEMS", "20"))
+SUMMARY_MAX_CHARS = int(os.getenv("FINBOT_SUMMARY_MAX_CHARS", "4000"))
+SUMMARY_MAX_FIELD_CHARS = 120
+# The LLM summarizer is only used when explicitly enabled and no formatter fits the result.
+SUMMARIZER_FALLBACK_ENABLED = os.getenv("FINBOT_SUMMARIZER_FALLBACK_ENABLED", "false").lower() == "true"
+# Numeric fields that are totalled per currency when a list result is pre-aggregated for the LLM.
+SUMMABLE_FIELDS = ("amount", "balance", "allocatedAmount", "reachedAmount")
+
+# API errors whose message tells the user what to change (validation, conflicts), so it is shown to them.
+API_MESSAGE_STATUSES = {400, 409, 422}
+API_MESSAGE_MAX_CHARS = 300
+_API_ERROR_STATUS = re.compile(r"API Error: (\d{3})")
+
+RESULT_RENDERS = Counter('finbot_result_renders_total', 'How tool results were turned into replies', ['tool', 'strategy'])
+
+def is_error_result(result: Any) -> bool:
+    """True for the error shapes returned by _make_api_request, including the single-item lists some tools wrap them in."""
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, list) and len(result) == 1 and isinstance(result[0], dict):
+        return "error" in result[0] and len(result[0]) <= 2
+    return False
+
+def _unwrap_error(result: Any) -> Dict[str, Any]:
+    return result[0] if isinstance(result, list) else result
+
+def format_amount(amount: Any, currency: Optional[str] = None) -> str:
+    try:
+        text = f"{Decimal(str(amount)):,.2f}"
+    except (InvalidOperation, ValueError):
+        text = str(amount)
+    return f"{text} {currency}" if currency else text
+
+def format_date(value: Any) -> str:
+    return str(value)[:10] if value else "-"
+
+def is_write_tool(tool_name: Optional[str]) -> bool:
+    return bool(tool_name) and not tool_name.startswith(("get_", "calculate_"))
+
+def _api_error_message(details: Any) -> Optional[str]:
+    """The readable part of an API error body: a plain string, or the message/title and field errors of a problem details object."""
+    if isinstance(details, str):
+        message = details.strip().strip('"')
+    elif isinstance(details, dict):
+        parts = [str(details[key]) for key in ("message", "detail", "title") if details.get(key)][:1]
+        errors = details.get("errors")
+        if isinstance(errors, dict):
+            parts += [f"{field}: {' '.join(map(str, problems)) if isinstance(problems, list) else problems}" for field, problems in errors.items()]
+        elif isinstance(errors, list):
+            parts += [str(problem) for problem in errors]
+        message = " ".join(part.rstrip(".") + "." for part in parts)
+    else:
+        message = ""
+    return _truncate(message, API_MESSAGE_MAX_CHARS) if message else None
+
+def render_error(result: Any, tool_name: Optional[str] = None) -> str:
+    """
+    Turns an error result into a reply. Validation and conflict errors, and any failed write, carry
+    the API's own message so the user can see what to change instead of a generic apology.
+    """
+    error_result = _unwrap_error(result)
+    error = str(error_result.get("error", ""))
+    status_match = _API_ERROR_STATUS.search(error)
+    status = int(status_match.group(1)) if status_match else None
+    if status in (401, 403) or "token" in error.lower():
+        return "I'm sorry, I couldn't verify your session. Please sign in again and retry."
+    message = _api_error_message(error_result.get("details"))
+    if message and (status in API_MESSAGE_STATUSES or (status is not None and is_write_tool(tool_name))):
+        return f"I couldn't complete that request. The server said: {message}"
+    if status == 404:
+        return "I couldn't find what you were looking for. Could you please double-check the details?"
+    if is_write_tool(tool_name):
+        return "I'm sorry, I couldn't complete that request right now, and it may not have been applied. Please check and try again in a moment."
+    return "I'm sorry, I couldn't retrieve that information right now. Please try again in a moment."
+
+def render_accounts(accounts: List[Dict[str, Any]]) -> str:
+    if not accounts:
+        return "You don't have any accounts yet. Would you like me to create one for you?"
+    lines = [f"- **{account.get('name')}** ({account.get('type')}): {format_amount(account.get('balance'), account.get('currency'))}"
+             + ("" if account.get("isActive", True) else " - inactive") for account in accounts]
+    return f"You have {len(accounts)} account{'s' if len(accounts) != 1 else ''}:\n" + "\n".join(lines)
+
+def render_budgets(budgets: List[Dict[str, Any]]) -> str:
+    if not budgets:
+        return "It looks like you don't have any budgets set up yet. Would you like to create one?"
+    lines = []
+    for budget in budgets:
+        reached = budget.get("reachedAmount") or 0
+        lines.append(f"- **{budget.get('name')}** ({budget.get('category')}): {format_amount(reached, budget.get('currency'))} of "
+                     f"{format_amount(budget.get('allocatedAmount'), budget.get('currency'))}, "
+                     f"{format_date(budget.get('startDate'))} to {format_date(budget.get('endDate'))}"
+                     + ("" if budget.get("isActive", True) else " - inactive"))
+    return f"You have {len(budgets)} budget{'s' if len(budgets) != 1 else ''}:\n" + "\n".join(lines)
+
+def render_current_membership(membership: Dict[str, Any]) -> str:
+    renewal = "It renews automatically." if membership.get("autoRenew") else "It will not renew automatically."
+    return (f"You are on the **{membership.get('planName')}** plan ({membership.get('status')}), "
+            f"valid from {format_date(membership.get('startDate'))} until {format_date(membership.get('endDate'))}. {renewal}")
+
+def render_membership_plans(plans: List[Dict[str, Any]]) -> str:
+    if not plans:
+        return "There are no membership plans available at the moment."
+    lines = [f"- **{plan.get('name')}**: {format_amount(plan.get('price'), plan.get('currency'))} / {str(plan.get('billingCycle', 'Monthly')).lower()}"
+             + (f" - {plan.get('description')}" if plan.get("description") else "") for plan in plans]
+    return "These membership plans are available:\n" + "\n".join(lines)
+
+def render_account_details(account: Dict[str, Any]) -> str:
+    status = "active" if account.get("isActive", True) else "inactive"
+    return (f"Your **{account.get('name')}** account ({account.get('type')}, {status}) has a balance of "
+            f"{format_amount(account.get('balance'), account.get('currency'))}.")
+
+def render_created_account(account: Dict[str, Any]) -> str:
+    return f"Done! I created the **{account.get('name')}** account ({account.get('type')}, {account.get('currency')}) with a zero balance."
+
+def render_budget_details(budget: Dict[str, Any]) -> str:
+    currency = budget.get("currency")
+    allocated = budget.get("allocatedAmount") or 0
+    reached = budget.get("reachedAmount") or 0
+    try:
+        remaining = f" You have {format_amount(Decimal(str(allocated)) - Decimal(str(reached)), currency)} left."
+    except InvalidOperation:
+        remaining = ""
+    description = f" {budget.get('description')}." if budget.get("description") else ""
+    return (f"Your **{budget.get('name')}** budget ({budget.get('category')}) runs from {format_date(budget.get('startDate'))} "
+            f"to {format_date(budget.get('endDate'))}. So far {format_amount(reached, currency)} of "
+            f"{format_amount(allocated, currency)} has been used.{remaining}{description}")
+
+def render_created_budget(budget: Dict[str, Any]) -> str:
+    return (f"Done! Your **{budget.get('name')}** budget for {budget.get('category')} is set to "
+            f"{format_amount(budget.get('allocatedAmount'), budget.get('currency'))} from {format_date(budget.get('startDate'))} "
+            f"to {format_date(budget.get('endDate'))}.")
+
+def render_categories(categories: List[Dict[str, Any]]) -> str:
+    if not categories:
+        return "You don't have any categories yet."
+    return "Your categories are: " + ", ".join(str(category.get("name")) for category in categories) + "."
+
+def render_created_transaction_category(category: Dict[str, Any]) -> str:
+    return f"Done! I created the **{category.get('name')}** category ({category.get('type')}). Its ID is {category.get('id')}."
+
+def render_created_transaction(transaction: Dict[str, Any]) -> str:
+    description = f" for \"{transaction.get('description')}\"" if transaction.get("description") else ""
+    return (f"Done! I recorded a transaction of {format_amount(transaction.get('amount'), transaction.get('currency'))}{description} "
+            f"on {format_date(transaction.get('transactionDateUtc'))}.")
+
+def render_transactions(digest: Dict[str, Any]) -> str:
+    if not digest["count"]:
+        return "I couldn't find any transactions. Would you like to record one?"
+    by_kind: Dict[str, List[str]] = {}
+    for total in digest["totals"]:
+        by_kind.setdefault(str(total["key"]), []).append(format_amount(total["total"], total["currency"]))
+    summary = "; ".join(f"{kind.lower()}: " + ", ".join(amounts) for kind, amounts in sorted(by_kind.items()))
+    recent = digest["recent"][:RENDER_MAX_ROWS]
+    rows = ["| Date | Description | Category | Account | Amount |", "|---|---|---|---|---|"]
+    for transaction in recent:
+        description = _truncate(transaction.get("description") or "-", 40).replace("|", "/")
+        rows.append(f"| {format_date(transaction.get('transactionDateUtc'))} | {description} | "
+                    f"{(transaction.get('category') or {}).get('name', '-')} | {(transaction.get('account') or {}).get('name', '-')} | "
+                    f"{format_amount(transaction.get('amount'), transaction.get('currency'))} |")
+    heading = f"I found {digest['count']} transaction{'s' if digest['count'] != 1 else ''} (total {summary})."
+    if digest["count"] > len(recent):
+        heading += f" Here are the {len(recent)} most recent:"
+    return heading + "\n\n" + "\n".join(rows)
+
+def render_membership_history(memberships: List[Dict[str, Any]]) -> str:
+    if not memberships:
+        return "You don't have any past memberships."
+    lines = [f"- **{membership.get('planName')}** ({membership.get('status')}): {format_date(membership.get('startDate'))} to {format_date(membership.get('endDate'))}"
+             for membership in memberships]
+    return "Here is your membership history:\n" + "\n".join(lines)
+
+def render_subscription_checkout(checkout: Dict[str, Any]) -> str:
+    if not checkout.get("checkoutUrl"):
+        raise TypeError("checkout response without a checkoutUrl")
+    return f"Great! To complete your subscription, please finish the payment here: {checkout.get('checkoutUrl')}"
+
+def render_cancelled_subscription(result: Dict[str, Any]) -> str:
+    return "Your subscription has been cancelled. Your membership stays active until its end date."
+
+def render_calculation(result: Dict[str, Any]) -> str:
+    # Not format_amount: a calculator result is shown exactly, without rounding to cents.
+    try:
+        total = f"{Decimal(str(result['total'])):,f}"
+    except InvalidOperation:
+        total = str(result["total"])
+    return f"The total is **{total}**."
+
+def render_faq_answer(result: Dict[str, Any]) -> str:
+    return str(result["answer"])
+
+def render_transaction_categories(categories: List[Dict[str, Any]]) -> str:
+    if not categories:
+        return "You don't have any transaction categories yet. Would you like to create one?"
+    by_type: Dict[str, List[str]] = {}
+    for category in categories:
+        by_type.setdefault(str(category.get("type", "Other")), []).append(str(category.get("name")))
+    lines = [f"- **{category_type}**: {', '.join(names)}" for category_type, names in sorted(by_type.items())]
+    return "Your transaction categories are:\n" + "\n".join(lines)
+
+def _period_label(result: Dict[str, Any]) -> str:
+    if result.get("from") and result.get("to"):
+        return f" from {result['from']} to {result['to']}"
+    if result.get("from"):
+        return f" since {result['from']}"
+    if result.get("to"):
+        return f" until {result['to']}"
+    return ""
+
+def _kind_label(result: Dict[str, Any]) -> str:
+    return {"Expense": "spending", "Income": "income"}.get(result.get("categoryType"), "transactions")
+
+def render_spending_breakdown(result: Dict[str, Any]) -> str:
+    if not result["transactionCount"]:
+        return f"I couldn't find any {_kind_label(result)}{_period_label(result)}."
+    totals = ", ".join(format_amount(total["total"], total["currency"]) for total in result["totals"])
+    rows = [f"| {str(result['groupBy']).capitalize()} | Total | Count | Average |", "|---|---|---|---|"]
+    rows += [f"| {str(group['key']).replace('|', '/')} | {format_amount(group['total'], group['currency'])} | {group['count']} | "
+             f"{format_amount(group['average'], group['currency'])} |" for group in result["groups"]]
+    more = f"\n\n...and {result['omittedGroups']} smaller groups." if result.get("omittedGroups") else ""
+    return (f"Your {_kind_label(result)}{_period_label(result)}: {totals} in total across {result['transactionCount']} "
+            f"transaction{'s' if result['transactionCount'] != 1 else ''}.\n\n" + "\n".join(rows) + more)
+
+def render_monthly_trend(result: Dict[str, Any]) -> str:
+    if not result["months"]:
+        return f"I couldn't find any {_kind_label(result)}{_period_label(result)}."
+    subject = f"{_kind_label(result)} on {result['category']}" if result.get("category") else _kind_label(result)
+    rows = ["| Month | Total | Count |", "|---|---|---|"]
+    rows += [f"| {month['month']} | {format_amount(month['total'], month['currency'])} | {month['count']} |" for month in result["months"]]
+    averages = ", ".join(f"{format_amount(item['average'], item['currency'])} over {item['months']} month{'s' if item['months'] != 1 else ''}"
+                         for item in result["averagePerMonth"])
+    return f"Here is your monthly {subject}{_period_label(result)}:\n\n" + "\n".join(rows) + f"\n\nOn average: {averages}."
+
+def render_largest_transactions(result: Dict[str, Any]) -> str:
+    if not result["transactions"]:
+        return f"I couldn't find any {_kind_label(result)}{_period_label(result)}."
+    rows = ["| Date | Description | Category | Account | Amount |", "|---|---|---|---|---|"]
+    rows += [f"| {item['date']} | {_truncate(item.get('description') or '-', 40).replace('|', '/')} | {item.get('category') or '-'} | "
+             f"{item.get('account') or '-'} | {format_amount(item['amount'], item.get('currency'))} |" for item in result["transactions"]]
+    return f"Your largest {_kind_label(result)}{_period_label(result)}:\n\n" + "\n".join(rows)
+
+RESULT_RENDERERS: Dict[str, Callable[[Any], str]] = {
+    "get_user_accounts": render_accounts,
+    "get_budgets": render_budgets,
+    "get_current_user_membership": render_current_membership,
+    "get_available_membership_plans": render_membership_plans,
+    "get_transaction_categories": render_transaction_categories,
+    "get_account_details": render_account_details,
+    "create_account": render_created_account,
+    "get_budget_details": render_budget_details,
+    "create_budget": render_created_budget,
+    "get_categories": render_categories,
+    "create_transaction_category": render_created_transaction_category,
+    "create_transaction": render_created_transaction,
+    "get_all_transactions": render_transactions,
+    "get_transactions_by_account_id": render_transactions,
+    "get_user_membership_history": render_membership_history,
+    "subscribe_to_plan": render_subscription_checkout,
+    "cancel_subscription": render_cancelled_subscription,
+    "calculate_sum": render_calculation,
+    "get_application_faq": render_faq_answer,
+    "get_spending_breakdown": render_spending_breakdown,
+    "get_monthly_trend": render_monthly_trend,
+    "get_largest_transactions": render_largest_transactions,
+}
+
+# Endpoints that answer 404 when the user simply has nothing yet.
+EMPTY_ON_NOT_FOUND = {
+    "get_current_user_membership": "You don't have an active membership right now. Would you like to see the available plans?",
+    "get_available_membership_plans": "There are no membership plans available at the moment.",
+}
+
+def render_tool_result(tool_name: str, result: Any) -> Optional[str]:
+    """
+    Renders a tool result into the user-facing reply without an LLM call.
+
+    Returns None when there is no formatter for the tool or the result does not have the
+    expected shape, so the caller can fall back to another strategy.
+    """
+    if is_error_result(result):
+        if "404" in str(_unwrap_error(result).get("error", "")) and tool_name in EMPTY_ON_NOT_FOUND:
+            return EMPTY_ON_NOT_FOUND[tool_name]
+        return render_error(result, tool_name)
+    renderer = RESULT_RENDERERS.get(tool_name)
+    if renderer is None:
+        return None
+    try:
+        return renderer(result)
+    except (AttributeError, TypeError, KeyError) as e:
+        logger.warning(f"Could not render result of '{tool_name}' with a template: {e}")
+        return None
+
+def render_generic_result(result: Any) -> str:
+    """Last-resort deterministic rendering for results no formatter understands."""
+    if result in (None, {}, []):
+        return "Done! There was nothing more to show for that request."
+    if isinstance(result, list):
+        lines = [f"- {_describe_item(item)}" for item in result[:RENDER_MAX_ROWS]]
+        more = f"\n...and {len(result) - RENDER_MAX_ROWS} more." if len(result) > RENDER_MAX_ROWS else ""
+        return f"I found {len(result)} item{'s' if len(result) != 1 else ''}:\n" + "\n".join(lines) + more
+    if isinstance(result, dict):
+        return "Here is what I found:\n" + "\n".join(f"- **{key}**: {_truncate(value)}" for key, value in list(result.items())[:RENDER_MAX_ROWS])
+    return f"Here is what I found: {_truncate(result)}"
+
+def _describe_item(item: Any) -> str:
+    if isinstance(item, dict):
+        name = item.get("name") or item.get("description") or item.get("id")
+        details = ", ".join(f"{key}: {_truncate(value)}" for key, value in item.items() if not isinstance(value, (dict, list)) and key != "name")
+        return f"**{name}** ({details})" if details else f"**{name}**"
+    return _truncate(item)
+
+def _truncate(value: Any, limit: int = SUMMARY_MAX_FIELD_CHARS) -> str:
+    text = str(value)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def _compact(value: Any, depth: int = 0) -> Any:
+    if isinstance(value, dict):
+        if depth >= 2:
+            return value.get("name", value.get("id"))
+        # The lists of a top-level object hold its items (e.g. a digest's "recent" transactions)
+        # and are compacted like a top-level list.
+        return {key: _compact(item, depth if depth == 0 and isinstance(item, list) else depth + 1) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [_compact(item, depth + 1) for item in value[:SUMMARY_MAX_ITEMS]]
+    if isinstance(value, str):
+        return _truncate(value)
+    return value
+
+def _currency_totals(items: List[Any]) -> Dict[str, Dict[str, str]]:
+    totals: Dict[str, Dict[str, str]] = {}
+    for field in SUMMABLE_FIELDS:
+        by_currency: Dict[str, Decimal] = {}
+        for item in items:
+            if isinstance(item, dict) and item.get(field) is not None:
+                currency = str(item.get("currency", ""))
+                try:
+                    by_currency[currency] = by_currency.get(currency, Decimal("0")) + Decimal(str(item[field]))
+                except InvalidOperation:
+                    continue
+        if by_currency:
+            totals[field] = {currency: str(amount) for currency, amount in by_currency.items()}
+    return totals
+
+def build_summary_payload(result: Any, max_chars: int = SUMMARY_MAX_CHARS) -> Any:
+    """
+    Shrinks a tool result before it is embedded in an LLM summarization prompt.
+
+    Lists are reduced to their count, per-currency totals of the usual money fields and as many
+    of the first items as fit in `max_chars`; objects shorten their longest item lists first.
+    Nested objects are reduced to their names and long strings are cut.
+    """
+    if not isinstance(result, list):
+        payload = _compact(result)
+        while isinstance(payload, dict) and len(dumps(payload)) > max_chars:
+            lists = [key for key, value in payload.items() if isinstance(value, list) and len(value) > 1]
+            if not lists:
+                break
+            longest = max(lists, key=lambda key: len(payload[key]))
+            payload[longest] = payload[longest][:len(payload[longest]) // 2]
+        serialized = dumps(payload)
+        return payload if len(serialized) <= max_chars else {"truncated_json": serialized[:max_chars]}
+
+    payload: Dict[str, Any] = {"count": len(result)}
+    totals = _currency_totals(result)
+    if totals:
+        payload["totals"] = totals
+    items = _compact(result)
+    while items:
+        payload["items"] = items
+        if len(dumps(payload)) <= max_chars:
+            break
+        items = items[:len(items) // 2]
+    else:
+        payload.pop("items", None)
+    if len(items) < len(result):
+        payload["omitted_items"] = len(result) - len(items)
+    return payload
+
+def record_render(tool_name: str, strategy: str) -> None:
+    RESULT_RENDERS.labels(tool=tool_name, strategy=strategy).inc()
+
+def reply_from_result(tool_name: str, result: Any) -> Optional[str]:
+    """
+    Builds the reply for a tool result: the tool's formatter when one fits, otherwise the generic
+    rendering. Returns None only when the LLM summarizer fallback is enabled and should be used.
+    """
+    reply = render_tool_result(tool_name, result)
+    if reply is not None:
+        record_render(tool_name, "template")
+        return reply
+    if SUMMARIZER_FALLBACK_ENABLED:
+        record_render(tool_name, "llm")
+        return None
+    record_render(tool_name, "generic")
+    return render_generic_result(result)
@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_MAX_SESSIONS = int(os.getenv("FINBOT_CONTEXT_MAX_SESSIONS", "1000"))
+CONTEXT_TTL_SECONDS = float(os.getenv("FINBOT_CONTEXT_TTL_SECONDS", "1800"))
+CONTEXT_MAX_TOKENS = int(os.getenv("FINBOT_CONTEXT_MAX_TOKENS", "6000"))
+
+CONTEXT_SESSIONS = Gauge('finbot_context_sessions', 'Sessions with a stored Ollama context', multiprocess_mode='livesum')
+CONTEXT_LOOKUPS = Counter('finbot_context_lookups_total', 'Ollama context lookups per session', ['outcome'])
+CONTEXT_EVICTIONS = Counter('finbot_context_evictions_total', 'Stored Ollama contexts evicted', ['reason'])
+PREFILL_TOKENS_SAVED = Counter('finbot_prompt_prefill_tokens_saved_total', 'Prompt tokens not re-sent for prefill thanks to context reuse')
+
+@dataclass
+class SessionContext:
+    context: List[int]
+    tool_groups: FrozenSet[str]
+    history_length: int
+    carry_over: str = ""
+    # Token ids only mean something to the model that produced them.
+    model: str = ""
+    updated_at: float = field(default_factory=time.monotonic)
+
+class SessionContextStore:
+    """
+    Bounded per-session store of the token context Ollama returns after each generation.
+
+    Entries are keyed by user and session ID: a context holds the user's tool results and
+    replies, so a request from another user with the same clientChatSessionId never sees it.
+
+    Entries expire after a TTL, are evicted least-recently-used beyond `max_sessions`, and are
+    dropped once they grow past `max_tokens` (the model's window would truncate them anyway).
+    """
+
+    def __init__(self, max_sessions: int = CONTEXT_MAX_SESSIONS, ttl_seconds: float = CONTEXT_TTL_SECONDS, max_tokens: int = CONTEXT_MAX_TOKENS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_tokens = max_tokens
+        self._entries: "OrderedDict[Tuple[str, str], SessionContext]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def has(self, user_id: str, session_id: str) -> bool:
+        with self._lock:
+            return (user_id, session_id) in self._entries
+
+    def tool_groups(self, user_id: str, session_id: str) -> FrozenSet[str]:
+        """The tool groups whose schemas are already part of the session's stored context."""
+        with self._lock:
+            entry = self._entries.get((user_id, session_id))
+            return entry.tool_groups if entry is not None else frozenset()
+
+    def get(self, user_id: str, session_id: str, tool_groups: FrozenSet[str], history_length: int, model: str = "") -> Optional[SessionContext]:
+        """
+        Returns a reusable context, or None when the session has none, it expired, its prompt
+        prefix lacks some of the requested tool groups, or the client's history no longer matches
+        what it covers. A context of another model is not returned but kept for that model's
+        next turn.
+        """
+        key = (user_id, session_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.updated_at > self.ttl_seconds:
+                self._evict(key, "ttl")
+                entry = None
+            if entry is not None and (not tool_groups <= entry.tool_groups or 0 < history_length < entry.history_length):
+                self._evict(key, "stale")
+                entry = None
+            if entry is None:
+                CONTEXT_LOOKUPS.labels(outcome="miss").inc()
+                return None
+            if model and entry.model and entry.model != model:
+                CONTEXT_LOOKUPS.labels(outcome="other_model").inc()
+                return None
+            self._entries.move_to_end(key)
+            CONTEXT_LOOKUPS.labels(outcome="hit").inc()
+            PREFILL_TOKENS_SAVED.inc(len(entry.context))
+            return entry
+
+    def put(self, user_id: str, session_id: str, entry: SessionContext) -> None:
+        key = (user_id, session_id)
+        with self._lock:
+            if len(entry.context) > self.max_tokens:
+                self._evict(key, "size")
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_sessions:
+                self._evict(next(iter(self._entries)), "lru")
+            CONTEXT_SESSIONS.set(len(self._entries))
+
+    def discard(self, user_id: str, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop((user_id, session_id), None)
+            CONTEXT_SESSIONS.set(len(self._entries))
+
+    def _evict(self, key: Tuple[str, str], reason: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            CONTEXT_EVICTIONS.labels(reason=reason).inc()
+            CONTEXT_SESSIONS.set(len(self._entries))
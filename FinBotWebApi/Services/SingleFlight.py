@@ -0,0 +1,59 @@
+import copy
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_CALLS = Counter('finbot_single_flight_calls_total', 'Calls through a single-flight group', ['group', 'outcome'])
+SINGLE_FLIGHT_IN_FLIGHT = Gauge('finbot_single_flight_in_flight', 'Distinct upstream calls currently in flight', ['group'], multiprocess_mode='livesum')
+
+def hash_key(*parts: Any) -> str:
+    """Stable digest for large keys such as full prompts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one upstream call.
+
+    The first caller for a key starts the call as a task; callers arriving while it is in flight
+    await the same task instead of issuing their own. With `copy_results` every caller gets a
+    deep copy of the result so nobody can mutate what another one sees; turn it off for results
+    that are only read (e.g. an httpx.Response whose body is parsed per caller). The task is
+    shielded, so a caller that disconnects does not cancel the call for the others. Nothing is
+    kept once the call finishes; this is not a cache.
+    """
+
+    def __init__(self, name: str, copy_results: bool = True):
+        self.name = name
+        self.copy_results = copy_results
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            SINGLE_FLIGHT_CALLS.labels(group=self.name, outcome="leader").inc()
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            SINGLE_FLIGHT_IN_FLIGHT.labels(group=self.name).set(len(self._in_flight))
+            task.add_done_callback(lambda finished, key=key: self._forget(key, finished))
+        else:
+            SINGLE_FLIGHT_CALLS.labels(group=self.name, outcome="collapsed").inc()
+            logger.info(f"Joined an in-flight '{self.name}' call instead of starting a new one.")
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result) if self.copy_results else result
+
+    def _forget(self, key: Hashable, finished: asyncio.Task) -> None:
+        if self._in_flight.get(key) is finished:
+            del self._in_flight[key]
+        SINGLE_FLIGHT_IN_FLIGHT.labels(group=self.name).set(len(self._in_flight))
+        if not finished.cancelled() and finished.exception() is not None:
+            # Consumed here too, so a failure nobody awaited any more is not reported as unretrieved.
+            logger.debug(f"Single-flight '{self.name}' call failed: {finished.exception()}")
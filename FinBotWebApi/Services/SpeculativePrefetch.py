@@ -0,0 +1,166 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Sequence
+
+from prometheus_client import Counter, Histogram
+
+from Services.AgentLoop import parse_tool_calls
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_PREFETCH_ENABLED = os.getenv("FINBOT_SPECULATIVE_PREFETCH_ENABLED", "true").lower() == "true"
+
+SPECULATIVE_PREFETCHES = Counter('finbot_speculative_prefetches_total', 'Tool fetches started while the model planned a confirmation turn', ['outcome', 'tool'])
+SPECULATIVE_PREFETCH_SAVED = Histogram('finbot_speculative_prefetch_saved_seconds', 'Tool time hidden behind the planning call by a used prefetch',
+                                       buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+ToolRunner = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+# A proposal that mentions a write is followed by the write, never by a read worth fetching early.
+WRITE_CUES = re.compile(r"\b(create|add|new|make|open|cancel|delete|remove|close|update|change|set up|record|transfer|subscribe|upgrade|downgrade|checkout)\b")
+
+@dataclass(frozen=True)
+class PrefetchRule:
+    tool_name: str
+    pattern: str
+    excluded: Optional[str] = None
+    # Tools taking an ID are only predicted when the proposal names exactly one.
+    id_argument: Optional[str] = None
+    id_pattern: Optional[str] = None
+
+# Most specific first: when two rules match at the same position, the earlier one wins.
+PREFETCH_RULES: List[PrefetchRule] = [
+    PrefetchRule("get_transactions_by_account_id", r"\btransactions?\b", id_argument="accountId", id_pattern=r"\baccount(?: id)?\s*#?\s*(\d+)\b"),
+    PrefetchRule("get_account_details", r"\baccount(?: id)?\s*#?\s*\d+", excluded=r"\btransactions?\b", id_argument="account_id", id_pattern=r"\baccount(?: id)?\s*#?\s*(\d+)\b"),
+    PrefetchRule("get_budget_details", r"\bbudget(?: id)?\s*#?\s*\d+", id_argument="budgetId", id_pattern=r"\bbudget(?: id)?\s*#?\s*(\d+)\b"),
+    PrefetchRule("get_transaction_categories", r"\btransaction categor(y|ies)\b"),
+    PrefetchRule("get_categories", r"\b(budget|expense|spending) categor(y|ies)\b|\bcategories\b", excluded=r"\btransaction categor"),
+    PrefetchRule("get_all_transactions", r"\btransactions\b", excluded=r"\btransaction categor"),
+    PrefetchRule("get_user_accounts", r"\baccounts\b|\bbalances\b"),
+    PrefetchRule("get_budgets", r"\bbudgets\b"),
+    PrefetchRule("get_user_membership_history", r"\bmembership history\b|\bpast (memberships|subscriptions)\b"),
+    PrefetchRule("get_current_user_membership", r"\b(current|your|active) (membership|subscription|plan)\b"),
+    PrefetchRule("get_available_membership_plans", r"\b(available|membership) plans\b|\bplans (available|we offer)\b"),
+]
+
+@dataclass(frozen=True)
+class PredictedCall:
+    tool_name: str
+    arguments: Dict[str, Any]
+
+def _last_assistant_message(history: Sequence[Any]) -> Optional[str]:
+    for turn in reversed(history or ()):
+        if turn.role == "assistant":
+            return turn.content
+    return None
+
+def _normalized_arguments(arguments: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Arguments as compared between a prediction and the model's call: IDs may come back as "3" or 3."""
+    return {key: str(value) for key, value in (arguments or {}).items() if value not in (None, "")}
+
+def predict_tool_call(history: Sequence[Any], allowed_tools: FrozenSet[str], rules: List[PrefetchRule] = PREFETCH_RULES) -> Optional[PredictedCall]:
+    """
+    Guesses the read-only call a confirmation will produce from the assistant's last proposal.
+
+    A tool call already written out in the proposal is taken as is when it is allowed. Otherwise
+    the rule matching earliest in the proposal wins ("I'll look up your accounts first and then
+    their transactions" → get_user_accounts). Returns None for proposals that mention a write or
+    that no allowed rule matches.
+    """
+    proposal = _last_assistant_message(history)
+    if not proposal:
+        return None
+    written_calls = parse_tool_calls(proposal)
+    if written_calls:
+        call = written_calls[0]
+        if len(written_calls) == 1 and call.get("name") in allowed_tools and isinstance(call.get("arguments") or {}, dict):
+            return PredictedCall(call["name"], dict(call.get("arguments") or {}))
+        return None
+
+    text = proposal.lower()
+    if WRITE_CUES.search(text):
+        return None
+    best: Optional[PredictedCall] = None
+    best_position = len(text)
+    for rule in rules:
+        if rule.tool_name not in allowed_tools or (rule.excluded and re.search(rule.excluded, text)):
+            continue
+        match = re.search(rule.pattern, text)
+        if match is None or match.start() >= best_position:
+            continue
+        arguments: Dict[str, Any] = {}
+        if rule.id_argument:
+            ids = set(re.findall(rule.id_pattern, text))
+            if len(ids) != 1:
+                continue
+            arguments[rule.id_argument] = int(ids.pop())
+        best, best_position = PredictedCall(rule.tool_name, arguments), match.start()
+    return best
+
+class SpeculativePrefetch:
+    """
+    A predicted read-only tool call started next to the planning generation of a confirmation turn.
+
+    The first call of the turn with the same tool and arguments takes the fetch over (`take`)
+    instead of starting its own; anything else leaves it unused and `discard` cancels it. Only
+    read-only tools may be predicted, so an unused fetch has no effect besides the load it caused.
+    """
+
+    def __init__(self, prediction: PredictedCall, runner: ToolRunner):
+        self.prediction = prediction
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.used = False
+        self.task = asyncio.ensure_future(self._fetch(runner))
+        logger.info(f"Speculatively fetching '{prediction.tool_name}' with {prediction.arguments} while planning.")
+
+    async def _fetch(self, runner: ToolRunner) -> Any:
+        try:
+            return await runner(self.prediction.tool_name, dict(self.prediction.arguments))
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def matches(self, tool_name: str, arguments: Optional[Dict[str, Any]]) -> bool:
+        return (not self.used and tool_name == self.prediction.tool_name
+                and _normalized_arguments(arguments) == _normalized_arguments(self.prediction.arguments))
+
+    async def take(self) -> Any:
+        """The prefetched result (or its error), awaited if the fetch is still running."""
+        self.used = True
+        taken_at = time.perf_counter()
+        try:
+            return await asyncio.shield(self.task)
+        finally:
+            if self.finished_at is not None:
+                # Without the prefetch the fetch would have started now; it ran this much earlier.
+                saved = min(self.finished_at - self.started_at, taken_at - self.started_at)
+                SPECULATIVE_PREFETCHES.labels(outcome="hit", tool=self.prediction.tool_name).inc()
+                SPECULATIVE_PREFETCH_SAVED.observe(max(0.0, saved))
+
+    def discard(self) -> None:
+        """Cancels an unused fetch and counts it as a miss. Safe to call more than once."""
+        if self.used:
+            if not self.task.done():
+                self.task.cancel()
+            return
+        self.used = True
+        SPECULATIVE_PREFETCHES.labels(outcome="miss", tool=self.prediction.tool_name).inc()
+        if self.task.done():
+            if not self.task.cancelled() and self.task.exception() is not None:
+                logger.info(f"Unused speculative fetch of '{self.prediction.tool_name}' had failed: {self.task.exception()}")
+        else:
+            self.task.cancel()
+
+def start_speculative_prefetch(history: Sequence[Any], allowed_tools: FrozenSet[str], runner: ToolRunner) -> Optional[SpeculativePrefetch]:
+    """Starts the fetch predicted for a confirmation turn; `allowed_tools` must hold read-only tools only."""
+    if not SPECULATIVE_PREFETCH_ENABLED:
+        return None
+    prediction = predict_tool_call(history, allowed_tools)
+    if prediction is None:
+        SPECULATIVE_PREFETCHES.labels(outcome="no_prediction", tool="none").inc()
+        return None
+    return SpeculativePrefetch(prediction, runner)
@@ -0,0 +1,204 @@
+import re
+import json
+import codecs
+import logging
+from typing import Any, Dict, List, Optional
+
+from Services.JsonCodec import loads
+
+logger = logging.getLogger(__name__)
+
+JSON_FENCE_OPEN = "```json"
+OPENING_BRACKETS = "{["
+CLOSING_BRACKETS = "}]"
+_WHITESPACE = re.compile(r"\s*")
+_ITEM_SEPARATOR = re.compile(r"\s*,?\s*")
+_NUMBER_TERMINATORS = frozenset(",] \t\r\n")
+
+def as_tool_calls(parsed: Any) -> Optional[List[Dict[str, Any]]]:
+    """Normalizes a decoded tool-call block (one call object or a list of them) to a list of calls."""
+    if isinstance(parsed, dict):
+        return [parsed]
+    if isinstance(parsed, list) and parsed and all(isinstance(call, dict) for call in parsed):
+        return parsed
+    return None
+
+class ToolCallStreamParser:
+    """
+    Incrementally scans streamed model tokens for a ```json tool-call block.
+
+    Conversational text is returned from feed() as soon as it is known not to be part of a
+    fence. Once a ```json fence opens, output is suppressed and the block's object (or array
+    of call objects) is tracked bracket by bracket (string aware), so the caller can stop the
+    generation the moment the top-level value closes instead of waiting for the model to finish.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._in_block = False
+        self._block_chars: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.visible_parts: List[str] = []
+        self.raw_parts: List[str] = []
+        self.tool_calls: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def tool_call_complete(self) -> bool:
+        return self.tool_calls is not None
+
+    @property
+    def raw_text(self) -> str:
+        return "".join(self.raw_parts)
+
+    def feed(self, chunk: str) -> str:
+        """Consumes a token chunk and returns the part of it that is safe to forward to the user."""
+        if self.tool_call_complete:
+            return ""
+        self.raw_parts.append(chunk)
+        visible = self._consume(self._pending + chunk)
+        if visible:
+            self.visible_parts.append(visible)
+        return visible
+
+    def flush(self) -> str:
+        """Returns any held-back text once the stream has ended without a complete tool call."""
+        leftover = self._pending if not self._in_block else JSON_FENCE_OPEN + "".join(self._block_chars)
+        self._pending = ""
+        self._in_block = False
+        self._block_chars = []
+        if leftover and not self.tool_call_complete:
+            self.visible_parts.append(leftover)
+            return leftover
+        return ""
+
+    def _consume(self, text: str) -> str:
+        visible: List[str] = []
+        while text and not self.tool_call_complete:
+            if not self._in_block:
+                fence_index = text.find(JSON_FENCE_OPEN)
+                if fence_index == -1:
+                    held = self._partial_fence_length(text)
+                    visible.append(text[:len(text) - held])
+                    self._pending = text[len(text) - held:]
+                    return "".join(visible)
+                visible.append(text[:fence_index])
+                self._pending = ""
+                self._start_block()
+                text = text[fence_index + len(JSON_FENCE_OPEN):]
+            else:
+                text = self._consume_block(text, visible)
+        return "".join(visible)
+
+    def _consume_block(self, text: str, visible: List[str]) -> str:
+        for index, char in enumerate(text):
+            self._block_chars.append(char)
+            if self._depth == 0:
+                if char in OPENING_BRACKETS:
+                    self._depth = 1
+                elif not char.isspace():
+                    # Not a JSON object after the fence; give the text back to the user.
+                    visible.append(JSON_FENCE_OPEN + "".join(self._block_chars))
+                    self._in_block = False
+                    return text[index + 1:]
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in OPENING_BRACKETS:
+                self._depth += 1
+            elif char in CLOSING_BRACKETS:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_block(visible)
+                    return text[index + 1:]
+        return ""
+
+    def _start_block(self) -> None:
+        self._in_block = True
+        self._block_chars = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def _finish_block(self, visible: List[str]) -> None:
+        block = "".join(self._block_chars).strip()
+        self._in_block = False
+        try:
+            parsed = loads(block)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to decode streamed JSON block: {block}")
+            visible.append(JSON_FENCE_OPEN + "".join(self._block_chars))
+            return
+        tool_calls = as_tool_calls(parsed)
+        if tool_calls is not None:
+            self.tool_calls = tool_calls
+        else:
+            visible.append(JSON_FENCE_OPEN + "".join(self._block_chars))
+
+    @staticmethod
+    def _partial_fence_length(text: str) -> int:
+        for length in range(min(len(JSON_FENCE_OPEN) - 1, len(text)), 0, -1):
+            if JSON_FENCE_OPEN.startswith(text[-length:]):
+                return length
+        return 0
+
+class JsonArrayStreamParser:
+    """
+    Incrementally decodes the items of a top-level JSON array from byte chunks, e.g. a large API
+    response while it downloads.
+
+    Every complete item is decoded by the C JSON decoder (JSONDecoder.raw_decode) and handed out
+    right away; only the undecoded tail of the text is buffered. An item cut off at the end of a
+    chunk is decoded again once the next chunk arrives.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._started = False
+        self.finished = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """The array items completed by this chunk. Raises ValueError if the data is not a JSON array."""
+        buffer = self._buffer + self._utf8.decode(chunk)
+        position = _WHITESPACE.match(buffer).end()
+        if not self._started and position < len(buffer):
+            if buffer[position] != "[":
+                raise ValueError("Expected a JSON array.")
+            self._started = True
+            position += 1
+        items: List[Any] = []
+        while self._started and not self.finished:
+            position = _ITEM_SEPARATOR.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                self.finished = True
+                position += 1
+                break
+            try:
+                item, end = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            if isinstance(item, (int, float)) and (end == len(buffer) or buffer[end] not in _NUMBER_TERMINATORS):
+                # A number is only complete once the character after it arrived (e.g. "12" may become "12.5e3").
+                break
+            items.append(item)
+            position = end
+        self._buffer = buffer[position:]
+        return items
+
+    def close(self) -> None:
+        """Raises ValueError if the data ended before the array did."""
+        rest = self._buffer + self._utf8.decode(b"", final=True)
+        if not self.finished or rest.strip():
+            raise ValueError(f"Incomplete or invalid JSON array near: {rest[:80]!r}")
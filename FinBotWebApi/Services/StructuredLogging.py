@@ -0,0 +1,190 @@
+import os
+import sys
+import queue
+import random
+import reprlib
+import atexit
+import logging
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import Counter
+
+from Services.Tracing import current_span
+from Services.JsonCodec import dumps
+
+LOG_LEVEL = os.getenv("FINBOT_LOG_LEVEL", "INFO").upper()
+# "json" (one object per line) or "text" (the previous human-readable lines).
+LOG_FORMAT = os.getenv("FINBOT_LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("FINBOT_LOG_QUEUE_SIZE", "10000"))
+# Longer messages and fields are cut to this many characters, with a marker saying how much was left out.
+LOG_FIELD_MAX_CHARS = int(os.getenv("FINBOT_LOG_FIELD_MAX_CHARS", "2000"))
+# Share of INFO/DEBUG records with a truncated field that are written; warnings and errors always are.
+LOG_LARGE_PAYLOAD_SAMPLE_RATE = float(os.getenv("FINBOT_LOG_LARGE_PAYLOAD_SAMPLE_RATE", "0.1"))
+
+LOG_RECORDS_DROPPED = Counter('finbot_log_records_dropped_total', 'Log records not written', ['reason'])
+LOG_FIELDS_TRUNCATED = Counter('finbot_log_fields_truncated_total', 'Log messages and fields cut to FINBOT_LOG_FIELD_MAX_CHARS')
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("finbot_log_request_id", default=None)
+session_id_var: ContextVar[Optional[str]] = ContextVar("finbot_log_session_id", default=None)
+user_id_var: ContextVar[Optional[str]] = ContextVar("finbot_log_user_id", default=None)
+
+# Non-string fields are rendered with bounded nesting and item counts, so a large result is never
+# serialized in full just to be cut afterwards.
+_field_repr = reprlib.Repr()
+_field_repr.maxlevel = 3
+_field_repr.maxlist = _field_repr.maxtuple = _field_repr.maxdict = _field_repr.maxset = 20
+_field_repr.maxstring = _field_repr.maxother = LOG_FIELD_MAX_CHARS
+
+def log_fields(**fields: Any) -> Dict[str, Any]:
+    """`extra` for a record carrying payload fields, e.g. logger.info("Ollama raw response", extra=log_fields(response=text))."""
+    return {"fields": fields}
+
+def bind_log_context(session_id: Optional[str] = None, user_id: Optional[str] = None) -> None:
+    """Tags the records logged from here on in the current request with its chat session and user."""
+    if session_id is not None:
+        session_id_var.set(session_id)
+    if user_id is not None:
+        user_id_var.set(user_id)
+
+def _truncate(text: str) -> Tuple[str, bool]:
+    if len(text) <= LOG_FIELD_MAX_CHARS:
+        return text, False
+    LOG_FIELDS_TRUNCATED.inc()
+    return f"{text[:LOG_FIELD_MAX_CHARS]}...[{len(text) - LOG_FIELD_MAX_CHARS} more chars]", True
+
+def _render_field(value: Any) -> Tuple[Any, bool]:
+    """The value as written to the log, and whether it is a large payload that had to be shortened."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value, False
+    if isinstance(value, str):
+        return _truncate(value)
+    text, cut = _truncate(_field_repr.repr(value))
+    abbreviated = isinstance(value, (list, tuple, dict, set, frozenset)) and len(value) > _field_repr.maxlist
+    return text, cut or abbreviated
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread through a bounded queue.
+
+    Everything that needs the request's state happens here, on the thread that logs: the message is
+    formatted and cut, payload fields are rendered and cut, large INFO/DEBUG records are sampled and
+    the correlation IDs are read from the context. Formatting and I/O happen on the listener
+    thread. A full queue drops the record instead of blocking the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> Optional[logging.LogRecord]:
+        message, large = _truncate(record.getMessage())
+        rendered = {}
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            rendered[key], cut = _render_field(value)
+            large = large or cut
+        if large and record.levelno < logging.WARNING and random.random() >= LOG_LARGE_PAYLOAD_SAMPLE_RATE:
+            LOG_RECORDS_DROPPED.labels(reason="sampled").inc()
+            return None
+
+        record.msg, record.args = message, None
+        record.fields = rendered
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        record.user_id = user_id_var.get()
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None and span.sampled else None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            prepared = self.prepare(record)
+            if prepared is not None:
+                self.enqueue(prepared)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.queue.put_nowait(record)
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per record, with the correlation IDs and payload fields as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "session_id", "user_id", "trace_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return dumps(entry)
+
+class TextLogFormatter(logging.Formatter):
+    """The previous line format, with payload fields and the request ID appended as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = [f"{key}={value!r}" for key, value in (getattr(record, "fields", None) or {}).items()]
+        if getattr(record, "request_id", None):
+            extras.append(f"request_id={record.request_id}")
+        return f"{line} {' '.join(extras)}" if extras else line
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[BoundedQueueHandler] = None
+_lock = threading.Lock()
+
+def _start_listener() -> None:
+    global _listener
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonLogFormatter() if LOG_FORMAT == "json" else TextLogFormatter())
+    _listener = QueueListener(_handler.queue, output)
+    _listener.start()
+
+def _restart_listener_after_fork() -> None:
+    # Threads do not survive fork() and the parent's listener may have held the queue's lock, so a
+    # forked worker gets a fresh queue and its own listener thread.
+    if _listener is not None:
+        _handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _start_listener()
+
+def configure_logging() -> None:
+    """
+    Routes the root logger through the bounded queue to a listener thread. Called at import and
+    again from the lifespan, which restarts the listener if an earlier shutdown stopped it.
+    """
+    global _handler
+    with _lock:
+        if _handler is None:
+            _handler = BoundedQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(_handler)
+            root.setLevel(LOG_LEVEL)
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
+            atexit.register(flush_logging)
+        if _listener is None:
+            _start_listener()
+
+def flush_logging() -> None:
+    """Writes out the queued records and stops the listener thread (at shutdown)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
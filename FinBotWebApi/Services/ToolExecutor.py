@@ -0,0 +1,34 @@
+import os
+import asyncio
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+SYNC_TOOL_MAX_WORKERS = int(os.getenv("FINBOT_SYNC_TOOL_MAX_WORKERS", "4"))
+
+_sync_tool_executor = ThreadPoolExecutor(max_workers=SYNC_TOOL_MAX_WORKERS, thread_name_prefix="finbot-sync-tool")
+
+async def execute_tool(python_function: Callable[..., Any], tool_args: Dict[str, Any]) -> Any:
+    """
+    Runs a tool function without blocking the event loop.
+
+    Coroutine tools are awaited directly. Synchronous tools (e.g. calculator, FAQ lookup)
+    are only allowed to run on the bounded sync tool thread pool.
+    """
+    if inspect.iscoroutinefunction(python_function):
+        return await python_function(**tool_args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sync_tool_executor, partial(python_function, **tool_args))
+
+async def run_blocking(function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Runs CPU-bound work of an async tool (e.g. aggregating a large result) on the sync tool thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sync_tool_executor, partial(function, *args, **kwargs))
+
+def shutdown_tool_executor() -> None:
+    logger.info("Shutting down the sync tool thread pool.")
+    _sync_tool_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,118 @@
+import os
+import re
+import math
+import logging
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Sequence, Set
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+TOOL_ROUTER_ENABLED = os.getenv("FINBOT_TOOL_ROUTER_ENABLED", "true").lower() == "true"
+TOOL_ROUTER_TOP_K = int(os.getenv("FINBOT_TOOL_ROUTER_TOP_K", "2"))
+TOOL_ROUTER_MIN_SCORE = float(os.getenv("FINBOT_TOOL_ROUTER_MIN_SCORE", "1.0"))
+TOOL_ROUTER_HISTORY_TURNS = int(os.getenv("FINBOT_TOOL_ROUTER_HISTORY_TURNS", "4"))
+
+PROMPT_TOOLS_SELECTED = Histogram('finbot_prompt_tools_selected', 'Tool schemas included in a generation prompt', buckets=(1, 2, 4, 6, 8, 10, 15, 20, 30))
+
+KEYWORD_WEIGHT = 2.0
+HISTORY_WEIGHT = 0.5
+
+STOPWORDS = {
+    "a", "an", "the", "my", "me", "i", "to", "of", "for", "and", "or", "is", "are", "in", "on", "it", "its",
+    "this", "that", "be", "with", "your", "you", "please", "show", "list", "get", "all", "by", "using",
+    "use", "e", "g", "do", "does", "did", "can", "could", "would", "will", "id", "etc", "from", "at", "if",
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens with stopwords removed and a light suffix stemming."""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        tokens.append(stem(word))
+    return tokens
+
+def stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    for suffix in ("ing", "ed", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix) and not word.endswith("ss"):
+            return word[:-len(suffix)]
+    return word
+
+def _tool_text(tool: Dict[str, Any]) -> str:
+    parts = [tool.get("name", "").replace("_", " "), tool.get("description", "")]
+    schema = tool.get("parameters") or {}
+    properties = schema.get("properties") or tool.get("arguments") or {}
+    for name, spec in properties.items():
+        parts.append(name)
+        parts.append(spec.get("description", "") if isinstance(spec, dict) else "")
+    return " ".join(parts)
+
+class ToolRouter:
+    """
+    Lexical pre-LLM router that picks the tool groups relevant to a message.
+
+    Each group (one Tools/* module) is indexed from its tool names, descriptions and parameter
+    descriptions plus its routing keywords. Query terms are weighted by inverse group frequency,
+    so words shared by every group carry little weight.
+    """
+
+    def __init__(self, tool_groups: Dict[str, List[Dict[str, Any]]], routing_keywords: Dict[str, Sequence[str]]):
+        self.group_names = list(tool_groups)
+        self.tool_groups = tool_groups
+        self.tool_to_group = {tool["name"]: group for group, tools in tool_groups.items() for tool in tools}
+        self._weights: Dict[str, Dict[str, float]] = defaultdict(dict)
+
+        group_terms: Dict[str, Dict[str, float]] = {}
+        for group, tools in tool_groups.items():
+            terms = {term: 1.0 for tool in tools for term in tokenize(_tool_text(tool))}
+            for keyword in routing_keywords.get(group, []):
+                for term in tokenize(keyword):
+                    terms[term] = KEYWORD_WEIGHT
+            group_terms[group] = terms
+
+        document_frequency: Dict[str, int] = defaultdict(int)
+        for terms in group_terms.values():
+            for term in terms:
+                document_frequency[term] += 1
+        group_count = len(tool_groups)
+        for group, terms in group_terms.items():
+            for term, weight in terms.items():
+                self._weights[term][group] = weight * math.log(1 + group_count / document_frequency[term])
+
+    def score(self, text: str) -> Dict[str, float]:
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(text)):
+            for group, weight in self._weights.get(term, {}).items():
+                scores[group] += weight
+        return scores
+
+    def select(self, message: str, history: Sequence[Any] = ()) -> FrozenSet[str]:
+        """
+        Returns the top-k groups for the message plus every group whose tool is referenced by name
+        in the recent history. Recent turns also contribute to the lexical score at reduced weight,
+        which keeps short follow-ups ("and for my savings?") routed to the conversation's topic.
+        An empty result means nothing matched; callers decide on the fallback.
+        """
+        recent_turns = list(history)[-TOOL_ROUTER_HISTORY_TURNS:]
+        scores = self.score(message)
+        for turn in recent_turns:
+            for group, value in self.score(turn.content).items():
+                scores[group] += value * HISTORY_WEIGHT
+
+        ranked = sorted((group for group, value in scores.items() if value >= TOOL_ROUTER_MIN_SCORE), key=lambda group: -scores[group])
+        selected: Set[str] = set(ranked[:TOOL_ROUTER_TOP_K])
+        for turn in recent_turns:
+            for tool_name, group in self.tool_to_group.items():
+                if tool_name in turn.content:
+                    selected.add(group)
+        return frozenset(selected)
+
+    def tools_for(self, groups: FrozenSet[str]) -> List[Dict[str, Any]]:
+        """Tool schemas for the given groups in canonical group order, so equal selections give byte-identical prompts."""
+        tools = [tool for group in self.group_names if group in groups for tool in self.tool_groups[group]]
+        PROMPT_TOOLS_SELECTED.observe(len(tools))
+        return tools
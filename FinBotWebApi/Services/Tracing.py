@@ -0,0 +1,221 @@
+import os
+import time
+import queue
+import random
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from prometheus_client import Counter, Histogram
+
+from Services.JsonCodec import dumps
+
+logger = logging.getLogger(__name__)
+
+# Where sampled traces go: "" (nowhere), "jsonl" (FINBOT_TRACE_FILE) or "otlp". OTLP needs the
+# optional opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http packages and is
+# configured with the standard OTEL_EXPORTER_OTLP_* variables (default http://localhost:4318).
+TRACE_EXPORTER = os.getenv("FINBOT_TRACE_EXPORTER", "").lower()
+TRACE_FILE = os.getenv("FINBOT_TRACE_FILE", "finbot-traces.jsonl")
+# Share of chat requests whose spans are exported. Stage histograms always see every request.
+TRACE_SAMPLE_RATE = float(os.getenv("FINBOT_TRACE_SAMPLE_RATE", "0.05"))
+TRACE_QUEUE_SIZE = int(os.getenv("FINBOT_TRACE_QUEUE_SIZE", "10000"))
+TRACE_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "finbot")
+
+STAGE_DURATION = Histogram('finbot_stage_duration_seconds', 'Wall time of each chat pipeline stage', ['stage', 'tool'],
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+TRACE_SPANS_EXPORTED = Counter('finbot_trace_spans_exported_total', 'Sampled spans handed to the trace exporter')
+TRACE_SPANS_DROPPED = Counter('finbot_trace_spans_dropped_total', 'Sampled spans dropped because the export queue was full')
+
+T = TypeVar("T")
+
+class Span:
+    """
+    One timed stage of a request. Spans nest through a context variable, so a span opened while
+    another is current becomes its child (also across asyncio tasks created inside it).
+
+    Every span feeds STAGE_DURATION; only spans of sampled traces carry IDs and attributes and
+    reach the exporter. The tool label is inherited from the parent when not given.
+    """
+    __slots__ = ("name", "tool", "parent", "sampled", "trace_id", "span_id", "start_ns", "started", "duration", "attributes", "error", "otel")
+
+    def __init__(self, name: str, tool: Optional[str], parent: Optional["Span"], sampled: bool, attributes: Dict[str, Any]):
+        self.name = name
+        self.tool = tool or (parent.tool if parent is not None else "")
+        self.parent = parent
+        self.sampled = sampled
+        self.error: Optional[str] = None
+        self.duration = 0.0
+        self.otel = None
+        if sampled:
+            self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+            self.span_id = f"{random.getrandbits(64):016x}"
+            self.start_ns = time.time_ns()
+            self.attributes = attributes
+        self.started = time.perf_counter()
+
+    def set(self, **attributes: Any) -> None:
+        if self.sampled:
+            self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent.span_id if self.parent is not None else None,
+            "name": self.name,
+            "tool": self.tool or None,
+            "startTimeUnixNano": self.start_ns,
+            "durationMs": round(self.duration * 1000, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSON-lines file from a background thread, so requests never wait on disk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._write, name="finbot-trace-writer", daemon=True)
+        self._thread.start()
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span.to_dict())
+            TRACE_SPANS_EXPORTED.inc()
+        except queue.Full:
+            TRACE_SPANS_DROPPED.inc()
+
+    def _write(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as trace_file:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                trace_file.write(dumps(record) + "\n")
+                if self._queue.empty():
+                    trace_file.flush()
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+class OtlpSpanExporter:
+    """Mirrors spans into OpenTelemetry SDK spans, batched to an OTLP/HTTP collector."""
+
+    def __init__(self):
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter as _OTLPSpanExporter
+        from opentelemetry.trace import Status, StatusCode
+
+        self._provider = TracerProvider(resource=Resource.create({"service.name": TRACE_SERVICE_NAME}))
+        self._provider.add_span_processor(BatchSpanProcessor(_OTLPSpanExporter(), max_queue_size=TRACE_QUEUE_SIZE))
+        self._tracer = self._provider.get_tracer("finbot")
+        self._set_span_in_context = otel_trace.set_span_in_context
+        self._error_status = lambda description: Status(StatusCode.ERROR, description)
+
+    def on_start(self, span: Span) -> None:
+        parent = span.parent.otel if span.parent is not None else None
+        context = self._set_span_in_context(parent) if parent is not None else None
+        span.otel = self._tracer.start_span(span.name, context=context, start_time=span.start_ns)
+
+    def on_end(self, span: Span) -> None:
+        if span.otel is None:
+            return
+        attributes = {key: value if isinstance(value, (str, bool, int, float)) else str(value) for key, value in span.attributes.items() if value is not None}
+        if span.tool:
+            attributes["finbot.tool"] = span.tool
+        span.otel.set_attributes(attributes)
+        if span.error:
+            span.otel.set_status(self._error_status(span.error))
+        span.otel.end(end_time=span.start_ns + int(span.duration * 1e9))
+        TRACE_SPANS_EXPORTED.inc()
+
+    def shutdown(self) -> None:
+        self._provider.shutdown()
+
+_exporter = None
+_current_span: ContextVar[Optional[Span]] = ContextVar("finbot_current_span", default=None)
+
+def start_tracing() -> None:
+    """Creates the configured span exporter. Called from the FastAPI lifespan; without it nothing is exported."""
+    global _exporter
+    if _exporter is not None or TRACE_SAMPLE_RATE <= 0 or not TRACE_EXPORTER:
+        return
+    if TRACE_EXPORTER == "jsonl":
+        _exporter = JsonlSpanExporter(TRACE_FILE)
+    elif TRACE_EXPORTER == "otlp":
+        try:
+            _exporter = OtlpSpanExporter()
+        except ImportError as e:
+            logger.warning(f"OTLP trace export needs opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http ({e}); traces are not exported.")
+            return
+    else:
+        logger.warning(f"Unknown FINBOT_TRACE_EXPORTER '{TRACE_EXPORTER}'; traces are not exported.")
+        return
+    logger.info(f"Tracing {TRACE_SAMPLE_RATE:.0%} of requests to '{TRACE_EXPORTER}'.")
+
+def shutdown_tracing() -> None:
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def set_span_attributes(**attributes: Any) -> None:
+    """Adds attributes to the current span, if there is one and its trace is sampled."""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+@contextmanager
+def span(name: str, tool: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """
+    Times a stage as a child of the current span; without a current span it starts a new trace,
+    which is sampled with probability TRACE_SAMPLE_RATE. Exceptions mark the span as failed.
+    """
+    parent = _current_span.get()
+    sampled = parent.sampled if parent is not None else (_exporter is not None and random.random() < TRACE_SAMPLE_RATE)
+    current = Span(name, tool, parent, sampled, attributes)
+    exporter = _exporter if sampled else None
+    if exporter is not None:
+        exporter.on_start(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.started
+        STAGE_DURATION.labels(stage=name, tool=current.tool or "none").observe(current.duration)
+        if exporter is not None:
+            exporter.on_end(current)
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Closed from another context, e.g. an async generator finalized by a different task.
+            _current_span.set(parent)
+
+def traced(stage: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorator running every call of a coroutine function inside a span named `stage`."""
+    def decorator(function: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with span(stage):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorator
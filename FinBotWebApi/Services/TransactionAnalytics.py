@@ -0,0 +1,229 @@
+import heapq
+import logging
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# FinTrack stores every amount as decimal(18, 2), so money is held as integer cents.
+MINOR_UNITS_PER_UNIT = 100
+CENTS = Decimal("0.01")
+GROUP_FIELDS = ("category", "account", "currency", "type")
+
+def to_minor_units(amounts: List[Any]) -> np.ndarray:
+    """
+    Exact integer cents for a column of amounts.
+
+    JSON numbers arrive as floats; rounding amount * 100 recovers the stored two-decimal value
+    exactly for any amount below 2**53 cents (about 90 trillion). Values numpy cannot read as
+    numbers are converted through Decimal one by one.
+    """
+    try:
+        return np.rint(np.asarray(amounts, dtype=np.float64) * MINOR_UNITS_PER_UNIT).astype(np.int64)
+    except (TypeError, ValueError):
+        return np.array([int((Decimal(str(amount)) * MINOR_UNITS_PER_UNIT).to_integral_value()) for amount in amounts], dtype=np.int64)
+
+def from_minor_units(value: int) -> Decimal:
+    return Decimal(int(value)).scaleb(-2)
+
+def average(total_minor: int, count: int) -> Decimal:
+    return (Decimal(int(total_minor)) / count / MINOR_UNITS_PER_UNIT).quantize(CENTS, rounding=ROUND_HALF_EVEN) if count else Decimal("0.00")
+
+def _labels(encoder: Dict[str, int]) -> np.ndarray:
+    return np.array(list(encoder), dtype=str) if encoder else np.array([], dtype=str)
+
+def _group_sums(keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Distinct keys with the exact int64 sum and the count of their values (sort + reduceat, no float accumulation)."""
+    if len(keys) == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    sums = np.add.reduceat(values[order], starts)
+    counts = np.diff(np.append(starts, len(keys)))
+    return sorted_keys[starts], sums, counts
+
+@dataclass
+class GroupTotal:
+    key: str
+    currency: str
+    total_minor: int
+    count: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"key": self.key, "currency": self.currency, "total": from_minor_units(self.total_minor),
+                "count": self.count, "average": average(self.total_minor, self.count)}
+
+class TransactionFrame:
+    """
+    Columnar view of a FinTrack transaction list (TransactionDto JSON) for aggregation.
+
+    Amounts are int64 cents, dates are datetime64[D] and names are dictionary-encoded, so
+    filters are boolean masks and group-bys are a single sort over integer keys. Transactions
+    without an amount or a date are left out.
+    """
+
+    def __init__(self, transactions: List[Dict[str, Any]]):
+        # One pass over the rows: strings are dictionary-encoded on the fly (JSON strings are used
+        # as they are) and each distinct date is parsed only once.
+        self.rows: List[Dict[str, Any]] = []
+        amounts: List[Any] = []
+        account_ids: List[int] = []
+        day_codes, currency_codes, category_codes, type_codes, account_codes = [], [], [], [], []
+        days: Dict[str, int] = {}
+        currencies: Dict[str, int] = {}
+        categories: Dict[str, int] = {}
+        types: Dict[str, int] = {}
+        accounts: Dict[str, int] = {}
+        for item in transactions:
+            if not isinstance(item, dict) or item.get("amount") is None or not item.get("transactionDateUtc"):
+                continue
+            category = item.get("category") or {}
+            account = item.get("account") or {}
+            self.rows.append(item)
+            amounts.append(item["amount"])
+            account_ids.append(account.get("id") or -1)
+            day_codes.append(days.setdefault(item["transactionDateUtc"][:10], len(days)))
+            currency_codes.append(currencies.setdefault(item.get("currency") or "", len(currencies)))
+            category_codes.append(categories.setdefault(category.get("name") or "Unknown", len(categories)))
+            type_codes.append(types.setdefault(category.get("type") or "Unknown", len(types)))
+            account_codes.append(accounts.setdefault(account.get("name") or "Unknown", len(accounts)))
+
+        self.amount = to_minor_units(amounts)
+        self.account_id = np.array(account_ids, dtype=np.int64)
+        self.day = _labels(days).astype("datetime64[D]")[np.array(day_codes, dtype=np.int64)]
+        self.columns = {
+            "currency": (_labels(currencies), np.array(currency_codes, dtype=np.int64)),
+            "category": (_labels(categories), np.array(category_codes, dtype=np.int64)),
+            "type": (_labels(types), np.array(type_codes, dtype=np.int64)),
+            "account": (_labels(accounts), np.array(account_codes, dtype=np.int64)),
+        }
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def select(self, start: Optional[date] = None, end: Optional[date] = None, category_type: Optional[str] = None,
+               account_id: Optional[int] = None, category: Optional[str] = None) -> np.ndarray:
+        """Boolean mask of the transactions within [start, end] (inclusive) that match every given filter."""
+        mask = np.ones(len(self.rows), dtype=bool)
+        if start is not None:
+            mask &= self.day >= np.datetime64(start, "D")
+        if end is not None:
+            mask &= self.day <= np.datetime64(end, "D")
+        if account_id is not None:
+            mask &= self.account_id == account_id
+        for column, wanted in (("type", category_type), ("category", category)):
+            if wanted is not None:
+                labels, codes = self.columns[column]
+                matching = np.flatnonzero(np.char.lower(labels) == wanted.lower()) if len(labels) else []
+                mask &= np.isin(codes, matching)
+        return mask
+
+    def totals_by_currency(self, mask: np.ndarray) -> List[GroupTotal]:
+        return self.group_totals("currency", mask)
+
+    def group_totals(self, by: str, mask: np.ndarray) -> List[GroupTotal]:
+        """Totals per value of `by` and currency, largest first."""
+        labels, codes = self.columns[by]
+        currency_labels, currency_codes = self.columns["currency"]
+        width = max(1, len(currency_labels))
+        keys, sums, counts = _group_sums(codes[mask] * width + currency_codes[mask], self.amount[mask])
+        totals = [GroupTotal(str(labels[key // width]), str(currency_labels[key % width]), int(total), int(count))
+                  for key, total, count in zip(keys.tolist(), sums.tolist(), counts.tolist())]
+        return sorted(totals, key=lambda group: -abs(group.total_minor))
+
+    def monthly_totals(self, mask: np.ndarray) -> List[GroupTotal]:
+        """Totals per calendar month ("YYYY-MM") and currency, oldest month first."""
+        currency_labels, currency_codes = self.columns["currency"]
+        width = max(1, len(currency_labels))
+        months = self.day[mask].astype("datetime64[M]").astype(np.int64)
+        keys, sums, counts = _group_sums(months * width + currency_codes[mask], self.amount[mask])
+        return [GroupTotal(str(np.datetime64(int(key // width), "M")), str(currency_labels[key % width]), int(total), int(count))
+                for key, total, count in zip(keys.tolist(), sums.tolist(), counts.tolist())]
+
+    def largest(self, mask: np.ndarray, top_n: int) -> List[Dict[str, Any]]:
+        """The `top_n` transactions with the largest amounts, largest first."""
+        indices = np.flatnonzero(mask)
+        if len(indices) > top_n:
+            indices = indices[np.argpartition(-self.amount[indices], top_n - 1)[:top_n]]
+        indices = indices[np.argsort(-self.amount[indices], kind="stable")]
+        return [self.rows[index] for index in indices.tolist()]
+
+def _merge_totals(running: Dict[Tuple[str, str], List[int]], totals: List[GroupTotal]) -> None:
+    for group in totals:
+        entry = running.setdefault((group.key, group.currency), [0, 0])
+        entry[0] += group.total_minor
+        entry[1] += group.count
+
+def _transaction_date(row: Dict[str, Any]) -> str:
+    return str(row["transactionDateUtc"])
+
+def _transaction_amount(row: Dict[str, Any]) -> float:
+    return float(row["amount"])
+
+class TransactionAggregator:
+    """
+    Reduces a stream of transaction batches with memory bounded by the batch size, however long
+    the user's history is.
+
+    Each batch becomes a TransactionFrame whose exact per-group cent sums are merged into running
+    totals; only the rows a result actually shows (the largest and the most recent ones) are kept.
+    The results are the same as aggregating one frame over all transactions.
+    """
+
+    def __init__(self, start: Optional[date] = None, end: Optional[date] = None, category_type: Optional[str] = None,
+                 category: Optional[str] = None, group_by: Optional[str] = None, monthly: bool = False, largest: int = 0, recent: int = 0):
+        self.filters = {"start": start, "end": end, "category_type": category_type, "category": category}
+        self.group_by = group_by
+        self.monthly = monthly
+        self.largest_n = largest
+        self.recent_n = recent
+        self.count = 0
+        self.currencies: Dict[Tuple[str, str], List[int]] = {}
+        self.groups: Dict[Tuple[str, str], List[int]] = {}
+        self.months: Dict[Tuple[str, str], List[int]] = {}
+        self.largest_rows: List[Dict[str, Any]] = []
+        self.recent_rows: List[Dict[str, Any]] = []
+
+    def add(self, transactions: List[Dict[str, Any]]) -> None:
+        frame = TransactionFrame(transactions)
+        mask = frame.select(**self.filters)
+        self.count += int(mask.sum())
+        _merge_totals(self.currencies, frame.totals_by_currency(mask))
+        if self.group_by:
+            _merge_totals(self.groups, frame.group_totals(self.group_by, mask))
+        if self.monthly:
+            _merge_totals(self.months, frame.monthly_totals(mask))
+        if self.largest_n:
+            self.largest_rows = heapq.nlargest(self.largest_n, self.largest_rows + frame.largest(mask, self.largest_n), key=_transaction_amount)
+        if self.recent_n:
+            selected = [frame.rows[index] for index in np.flatnonzero(mask).tolist()]
+            self.recent_rows = heapq.nlargest(self.recent_n, self.recent_rows + selected, key=_transaction_date)
+
+    @staticmethod
+    def _totals(running: Dict[Tuple[str, str], List[int]]) -> List[GroupTotal]:
+        return [GroupTotal(key, currency, total, count) for (key, currency), (total, count) in running.items()]
+
+    def totals_by_currency(self) -> List[GroupTotal]:
+        return sorted(self._totals(self.currencies), key=lambda group: -abs(group.total_minor))
+
+    def group_totals(self) -> List[GroupTotal]:
+        """Totals per value of `group_by` and currency, largest first."""
+        return sorted(self._totals(self.groups), key=lambda group: -abs(group.total_minor))
+
+    def monthly_totals(self) -> List[GroupTotal]:
+        """Totals per calendar month ("YYYY-MM") and currency, oldest month first."""
+        return sorted(self._totals(self.months), key=lambda group: (group.key, group.currency))
+
+    def largest(self) -> List[Dict[str, Any]]:
+        """The transactions with the largest amounts, largest first."""
+        return self.largest_rows
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """The most recent transactions, newest first."""
+        return self.recent_rows
@@ -35,19 +35,20 @@ CREATE_ACCOUNT_TOOL = {
     }
 }
 
-def get_user_accounts(auth_token: Optional[str]) -> List[Dict[str, Any]]:
+async def get_user_accounts(auth_token: Optional[str]) -> List[Dict[str, Any]]:
     logger.info("Python: get_user_accounts called.")
-    result = _make_api_request("/Account", auth_token)
+    result = await _make_api_request("/Account", auth_token)
     return result if isinstance(result, list) else [result] if isinstance(result, dict) and "error" in result else []
 
-def get_account_details(account_id: int, auth_token: Optional[str]) -> Dict[str, Any]:
+async def get_account_details(account_id: int, auth_token: Optional[str]) -> Dict[str, Any]:
     logger.info(f"Python: get_account_details called. AccountID: {account_id}")
-    return _make_api_request(f"/Account/{account_id}", auth_token)
+    return await _make_api_request(f"/Account/{account_id}", auth_token)
 
-def create_account(name: str, type: str, currency: str, auth_token: Optional[str], is_active: bool = True) -> Dict[str, Any]:
+async def create_account(name: str, type: str, currency: str, auth_token: Optional[str], is_active: bool = True) -> Dict[str, Any]:
     logger.info(f"Python: create_account called. Name: {name}, Type: {type}, IsActive: {is_active}")
     payload = {"name": name, "type": type.upper(), "is_active": is_active, "currency": currency.upper()}
-    return _make_api_request("/Account", auth_token, method="POST", json_data=payload)
+    return await _make_api_request("/Account", auth_token, method="POST", json_data=payload)
 
 ACCOUNT_AVAILABLE_TOOLS = [GET_USER_ACCOUNTS_TOOL, GET_ACCOUNT_DETAILS_TOOL, CREATE_ACCOUNT_TOOL]
+ACCOUNT_ROUTING_KEYWORDS = ["account", "accounts", "balance", "balances", "bank", "wallet", "checking", "savings", "card", "cash", "money", "funds"]
 ACCOUNT_FUNCTION_MAPPING = {"get_user_accounts": get_user_accounts, "get_account_details": get_account_details, "create_account": create_account}
\ No newline at end of file
@@ -0,0 +1,198 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+from Services.TransactionAnalytics import TransactionAggregator, GROUP_FIELDS, average, from_minor_units
+from .TransactionTools import read_transaction_result
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("this_month", "last_month", "last_30_days", "last_90_days", "this_year", "last_year", "all")
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 50
+
+_FILTER_PROPERTIES = {
+    "period": {"type": "STRING", "description": "Time window: 'this_month', 'last_month', 'last_30_days', 'last_90_days', 'this_year', 'last_year' or 'all' (default). Ignored when startDate or endDate is given."},
+    "startDate": {"type": "STRING", "description": "Optional first day to include (YYYY-MM-DD)."},
+    "endDate": {"type": "STRING", "description": "Optional last day to include (YYYY-MM-DD)."},
+    "categoryType": {"type": "STRING", "description": "'Expense' (default), 'Income' or 'All'."},
+    "accountId": {"type": "INTEGER", "description": "Optional ID of a single account to analyze."},
+}
+
+GET_SPENDING_BREAKDOWN_TOOL = {
+    "name": "get_spending_breakdown",
+    "description": "Exact amounts, counts and averages of the user's transactions grouped by category, account, currency or type. Use this for questions like 'what did I spend per category last month' instead of adding up transactions yourself.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "groupBy": {"type": "STRING", "description": "'category' (default), 'account', 'currency' or 'type'."},
+            **_FILTER_PROPERTIES,
+            "topN": {"type": "INTEGER", "description": "How many of the largest groups to return (default 10)."},
+        },
+        "required": []
+    }
+}
+
+GET_MONTHLY_TREND_TOOL = {
+    "name": "get_monthly_trend",
+    "description": "Month-by-month amounts of the user's transactions (e.g. how spending changed over the year) with the average per month.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            **_FILTER_PROPERTIES,
+            "category": {"type": "STRING", "description": "Optional category name to restrict the trend to (e.g. 'Groceries')."},
+        },
+        "required": []
+    }
+}
+
+GET_LARGEST_TRANSACTIONS_TOOL = {
+    "name": "get_largest_transactions",
+    "description": "The user's largest transactions, e.g. their biggest expenses last month.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "topN": {"type": "INTEGER", "description": "How many transactions to return (default 5)."},
+            **_FILTER_PROPERTIES,
+        },
+        "required": []
+    }
+}
+
+def resolve_period(period: Optional[str], startDate: Optional[str], endDate: Optional[str], today: Optional[date] = None) -> Tuple[Optional[date], Optional[date]]:
+    """The inclusive date range for the arguments; explicit dates win over a named period. Raises ValueError on bad input."""
+    if startDate or endDate:
+        start = date.fromisoformat(startDate[:10]) if startDate else None
+        end = date.fromisoformat(endDate[:10]) if endDate else None
+        return start, end
+    period = (period or "all").lower()
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}'. Use one of: {', '.join(PERIODS)}.")
+    today = today or datetime.now(timezone.utc).date()
+    first_of_month = today.replace(day=1)
+    if period == "this_month":
+        return first_of_month, today
+    if period == "last_month":
+        last_month_end = first_of_month - timedelta(days=1)
+        return last_month_end.replace(day=1), last_month_end
+    if period == "last_30_days":
+        return today - timedelta(days=29), today
+    if period == "last_90_days":
+        return today - timedelta(days=89), today
+    if period == "this_year":
+        return today.replace(month=1, day=1), today
+    if period == "last_year":
+        return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+    return None, None
+
+def _category_type(categoryType: Optional[str]) -> Optional[str]:
+    value = (categoryType or "Expense").strip().capitalize()
+    if value not in ("Expense", "Income", "All"):
+        raise ValueError("categoryType must be 'Expense', 'Income' or 'All'.")
+    return None if value == "All" else value
+
+def _describe_filters(start: Optional[date], end: Optional[date], category_type: Optional[str]) -> Dict[str, Any]:
+    return {"from": start.isoformat() if start else None, "to": end.isoformat() if end else None, "categoryType": category_type or "All"}
+
+def _spending_breakdown(aggregator: TransactionAggregator, top_n: int) -> Dict[str, Any]:
+    groups = aggregator.group_totals()
+    return {
+        "groupBy": aggregator.group_by,
+        **_describe_filters(aggregator.filters["start"], aggregator.filters["end"], aggregator.filters["category_type"]),
+        "transactionCount": aggregator.count,
+        "totals": [group.to_dict() for group in aggregator.totals_by_currency()],
+        "groups": [group.to_dict() for group in groups[:top_n]],
+        "omittedGroups": max(0, len(groups) - top_n),
+    }
+
+def _calendar_months(first: date, last: date) -> List[str]:
+    """Every calendar month ("YYYY-MM") from the month of `first` through the month of `last`."""
+    months, year, month = [], first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def _monthly_trend(aggregator: TransactionAggregator) -> Dict[str, Any]:
+    totals = {(month.key, month.currency): month for month in aggregator.monthly_totals()}
+    # Months without transactions count as zero: the average is over every calendar month of the
+    # period, and an open-ended period runs from (or to) the first (or last) month with data.
+    months: List[str] = []
+    if totals:
+        keys = sorted(month for month, _ in totals)
+        months = _calendar_months(aggregator.filters["start"] or date.fromisoformat(keys[0] + "-01"),
+                                  aggregator.filters["end"] or date.fromisoformat(keys[-1] + "-01"))
+    sums: Dict[str, int] = {}
+    for (_, currency), total in totals.items():
+        sums[currency] = sums.get(currency, 0) + total.total_minor
+    currencies = sorted(sums)
+    rows = [{"month": month, "currency": currency,
+             "total": from_minor_units(totals[month, currency].total_minor) if (month, currency) in totals else from_minor_units(0),
+             "count": totals[month, currency].count if (month, currency) in totals else 0}
+            for month in months for currency in currencies]
+    return {
+        **_describe_filters(aggregator.filters["start"], aggregator.filters["end"], aggregator.filters["category_type"]),
+        "category": aggregator.filters["category"],
+        "months": rows,
+        "averagePerMonth": [{"currency": currency, "average": average(sums[currency], len(months)), "months": len(months)} for currency in currencies],
+    }
+
+def _largest_transactions(aggregator: TransactionAggregator) -> Dict[str, Any]:
+    return {
+        **_describe_filters(aggregator.filters["start"], aggregator.filters["end"], aggregator.filters["category_type"]),
+        "transactions": [{
+            "id": item.get("id"),
+            "date": str(item.get("transactionDateUtc"))[:10],
+            "description": item.get("description"),
+            "category": (item.get("category") or {}).get("name"),
+            "account": (item.get("account") or {}).get("name"),
+            "amount": item.get("amount"),
+            "currency": item.get("currency"),
+        } for item in aggregator.largest()],
+    }
+
+def _top_n(topN: Optional[int], default: int) -> int:
+    return max(1, min(int(topN or default), MAX_TOP_N))
+
+async def get_spending_breakdown(auth_token: Optional[str], groupBy: str = "category", period: Optional[str] = None, startDate: Optional[str] = None,
+                                 endDate: Optional[str] = None, categoryType: Optional[str] = None, accountId: Optional[int] = None, topN: Optional[int] = None) -> Dict[str, Any]:
+    logger.info(f"Python: get_spending_breakdown called. GroupBy: {groupBy}, Period: {period}, From: {startDate}, To: {endDate}, Type: {categoryType}")
+    try:
+        group_by = (groupBy or "category").lower()
+        if group_by not in GROUP_FIELDS:
+            raise ValueError(f"groupBy must be one of: {', '.join(GROUP_FIELDS)}.")
+        start, end = resolve_period(period, startDate, endDate)
+        category_type = _category_type(categoryType)
+        top_n = _top_n(topN, DEFAULT_TOP_N)
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}
+    variant = {"result": "spending_breakdown", "start": start, "end": end, "type": category_type, "groupBy": group_by, "topN": top_n}
+    return await read_transaction_result(auth_token, accountId, variant, lambda: TransactionAggregator(start, end, category_type, group_by=group_by),
+                                         lambda aggregator: _spending_breakdown(aggregator, top_n))
+
+async def get_monthly_trend(auth_token: Optional[str], period: Optional[str] = None, startDate: Optional[str] = None, endDate: Optional[str] = None,
+                            categoryType: Optional[str] = None, accountId: Optional[int] = None, category: Optional[str] = None) -> Dict[str, Any]:
+    logger.info(f"Python: get_monthly_trend called. Period: {period}, From: {startDate}, To: {endDate}, Type: {categoryType}, Category: {category}")
+    try:
+        start, end = resolve_period(period, startDate, endDate)
+        category_type = _category_type(categoryType)
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}
+    variant = {"result": "monthly_trend", "start": start, "end": end, "type": category_type, "category": category}
+    return await read_transaction_result(auth_token, accountId, variant, lambda: TransactionAggregator(start, end, category_type, category, monthly=True), _monthly_trend)
+
+async def get_largest_transactions(auth_token: Optional[str], topN: Optional[int] = None, period: Optional[str] = None, startDate: Optional[str] = None,
+                                   endDate: Optional[str] = None, categoryType: Optional[str] = None, accountId: Optional[int] = None) -> Dict[str, Any]:
+    logger.info(f"Python: get_largest_transactions called. TopN: {topN}, Period: {period}, From: {startDate}, To: {endDate}, Type: {categoryType}")
+    try:
+        start, end = resolve_period(period, startDate, endDate)
+        category_type = _category_type(categoryType)
+        top_n = _top_n(topN, 5)
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}
+    variant = {"result": "largest_transactions", "start": start, "end": end, "type": category_type, "topN": top_n}
+    return await read_transaction_result(auth_token, accountId, variant, lambda: TransactionAggregator(start, end, category_type, largest=top_n), _largest_transactions)
+
+ANALYTICS_AVAILABLE_TOOLS = [GET_SPENDING_BREAKDOWN_TOOL, GET_MONTHLY_TREND_TOOL, GET_LARGEST_TRANSACTIONS_TOOL]
+ANALYTICS_ROUTING_KEYWORDS = ["spend", "spent", "spending", "per", "breakdown", "trend", "monthly", "average", "most", "largest", "biggest", "top", "compare", "changed"]
+ANALYTICS_FUNCTION_MAPPING = {"get_spending_breakdown": get_spending_breakdown, "get_monthly_trend": get_monthly_trend, "get_largest_transactions": get_largest_transactions}
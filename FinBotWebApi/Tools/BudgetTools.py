@@ -46,17 +46,17 @@ GET_CATEGORIES_TOOL = {
     "parameters": {"type": "OBJECT", "properties": {}, "required": []}
 }
 
-def get_budgets(auth_token: Optional[str]) -> List[Dict[str, Any]]:
+async def get_budgets(auth_token: Optional[str]) -> List[Dict[str, Any]]:
     """Fetches all budgets for the user."""
     logger.info("Python: get_budgets called.")
-    return _make_api_request("/Budgets", auth_token)
+    return await _make_api_request("/Budgets", auth_token)
 
-def get_budget_details(budgetId: int, auth_token: Optional[str]) -> Dict[str, Any]:
+async def get_budget_details(budgetId: int, auth_token: Optional[str]) -> Dict[str, Any]:
     """Fetches the details of a specific budget."""
     logger.info(f"Python: get_budget_details called. BudgetID: {budgetId}")
-    return _make_api_request(f"/Budgets/{budgetId}", auth_token)
+    return await _make_api_request(f"/Budgets/{budgetId}", auth_token)
 
-def create_budget(
+async def create_budget(
     name: str, 
     category: str,
     allocatedAmount: Decimal,
@@ -79,12 +79,12 @@ def create_budget(
         "endDate": endDate,
         "isActive": isActive
     }
-    return _make_api_request("/Budgets", auth_token, method="POST", json_data=payload)
+    return await _make_api_request("/Budgets", auth_token, method="POST", json_data=payload)
 
-def get_categories(auth_token: Optional[str]) -> List[Dict[str, Any]]:
+async def get_categories(auth_token: Optional[str]) -> List[Dict[str, Any]]:
     """Fetches all categories from the CategoriesController."""
     logger.info("Python: get_categories called.")
-    return _make_api_request("/Categories", auth_token)
+    return await _make_api_request("/Categories", auth_token)
 
 
 BUDGET_AVAILABLE_TOOLS = [
@@ -94,6 +94,8 @@ BUDGET_AVAILABLE_TOOLS = [
     GET_CATEGORIES_TOOL,
 ]
 
+BUDGET_ROUTING_KEYWORDS = ["budget", "budgets", "limit", "allocate", "allocated", "overspend", "overspending", "goal", "fund", "category", "categories"]
+
 BUDGET_FUNCTION_MAPPING = {
     "get_budgets": get_budgets,
     "get_budget_details": get_budget_details,
@@ -34,4 +34,5 @@ def calculate_sum(values: List[Any]) -> Dict[str, Any]:
         return {"error": "Invalid data provided. Please provide a list of numbers."}
 
 CALCULATOR_AVAILABLE_TOOLS = [CALCULATOR_TOOL]
+CALCULATOR_ROUTING_KEYWORDS = ["sum", "total", "add", "calculate", "calculation", "subtract", "minus", "difference", "altogether", "combined"]
 CALCULATOR_FUNCTION_MAPPING = {"calculate_sum": calculate_sum}
\ No newline at end of file
@@ -1,8 +1,14 @@
 import json
 import os
-from typing import List, Dict, Optional
+import logging
+from typing import Dict
+
+from Services.FaqIndex import FaqIndex
+
+logger = logging.getLogger(__name__)
 
 FAQ_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'faq_data.json')
+FAQ_INDEX = FaqIndex(FAQ_FILE_PATH)
 
 def get_application_faq(query: str) -> Dict:
     """
@@ -12,24 +18,13 @@ def get_application_faq(query: str) -> Dict:
     :return: A dictionary containing the answer or a not found message.
     """
     try:
-        with open(FAQ_FILE_PATH, 'r', encoding='utf-8') as f:
-            faq_data: List[Dict] = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        hits = FAQ_INDEX.search(query, top_k=1)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"FAQ knowledge base could not be loaded: {e}")
         return {"error": "Knowledge base is currently unavailable."}
 
-    query_words = set(query.lower().split())
-    best_match = None
-    max_score = 0
-
-    for item in faq_data:
-        keywords = set(item.get("keywords", []))
-        score = len(query_words.intersection(keywords))
-
-        if score > max_score:
-            max_score = score
-            best_match = item
-
-    if best_match and max_score > 0:
+    if hits:
+        best_match = hits[0].entry
         return {
             "question_found": best_match["question"],
             "answer": best_match["answer"]
@@ -52,6 +47,8 @@ FAQ_AVAILABLE_TOOLS = [
     }
 ]
 
+FAQ_ROUTING_KEYWORDS = ["how", "what", "why", "help", "feature", "features", "secure", "security", "privacy", "data", "app", "application", "fintrack", "support", "export", "report", "reports", "currency", "currencies", "debt", "chatbot", "password", "delete"]
+
 FAQ_FUNCTION_MAPPING = {
     "get_application_faq": get_application_faq
 }
\ No newline at end of file
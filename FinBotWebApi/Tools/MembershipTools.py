@@ -47,23 +47,23 @@ CANCEL_SUBSCRIPTION_TOOL = {
     }
 }
 
-def get_available_membership_plans(auth_token: Optional[str]) -> List[Dict[str, Any]]:
+async def get_available_membership_plans(auth_token: Optional[str]) -> List[Dict[str, Any]]:
     """Fetches all available and active membership plans."""
     logger.info("Python: get_available_membership_plans called.")
-    return _make_api_request("/Membership/plans", auth_token)
+    return await _make_api_request("/Membership/plans", auth_token)
 
-def get_current_user_membership(auth_token: Optional[str]) -> Dict[str, Any]:
+async def get_current_user_membership(auth_token: Optional[str]) -> Dict[str, Any]:
     """Retrieves the user's current active membership status."""
     logger.info("Python: get_current_user_membership called.")
-    return _make_api_request("/Membership/current", auth_token)
+    return await _make_api_request("/Membership/current", auth_token)
 
-def get_user_membership_history(auth_token: Optional[str]) -> List[Dict[str, Any]]:
+async def get_user_membership_history(auth_token: Optional[str]) -> List[Dict[str, Any]]:
     """Retrieves the user's entire membership history."""
     logger.info("Python: get_user_membership_history called.")
-    result = _make_api_request("/Membership/history", auth_token)
+    result = await _make_api_request("/Membership/history", auth_token)
     return result if isinstance(result, list) else [result] if "error" in result else []
 
-def subscribe_to_plan(planId: int, auth_token: Optional[str], autoRenew: bool = True) -> Dict[str, Any]:
+async def subscribe_to_plan(planId: int, auth_token: Optional[str], autoRenew: bool = True) -> Dict[str, Any]:
     """
     Initiates a subscription to a membership plan for the user.
     Corresponds to the /Membership/create-checkout-session endpoint.
@@ -73,12 +73,12 @@ def subscribe_to_plan(planId: int, auth_token: Optional[str], autoRenew: bool =
         "planId": planId,
         "autoRenew": autoRenew
     }
-    return _make_api_request("/Membership/create-checkout-session", auth_token, method="POST", json_data=payload)
+    return await _make_api_request("/Membership/create-checkout-session", auth_token, method="POST", json_data=payload)
 
-def cancel_subscription(userMembershipId: int, auth_token: Optional[str]) -> Dict[str, Any]:
+async def cancel_subscription(userMembershipId: int, auth_token: Optional[str]) -> Dict[str, Any]:
     """Cancels a user's active subscription."""
     logger.info(f"Python: cancel_subscription called. UserMembershipID: {userMembershipId}")
-    return _make_api_request(f"/Membership/{userMembershipId}/cancel", auth_token, method="POST")
+    return await _make_api_request(f"/Membership/{userMembershipId}/cancel", auth_token, method="POST")
 
 
 MEMBERSHIP_AVAILABLE_TOOLS = [
@@ -89,6 +89,8 @@ MEMBERSHIP_AVAILABLE_TOOLS = [
     CANCEL_SUBSCRIPTION_TOOL,
 ]
 
+MEMBERSHIP_ROUTING_KEYWORDS = ["membership", "subscription", "subscribe", "subscribed", "plan", "plans", "premium", "pro", "plus", "upgrade", "downgrade", "cancel", "renew", "billing", "tier"]
+
 MEMBERSHIP_FUNCTION_MAPPING = {
     "get_available_membership_plans": get_available_membership_plans,
     "get_current_user_membership": get_current_user_membership,
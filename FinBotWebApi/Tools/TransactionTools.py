@@ -1,10 +1,20 @@
+import os
 import logging
-from typing import List, Dict, Any, Optional
+from contextlib import aclosing
+from typing import List, Dict, Any, Optional, Callable
 from decimal import Decimal
-from ._api_helpers import _make_api_request
+
+from Services.ToolExecutor import run_blocking
+from Services.TransactionAnalytics import TransactionAggregator
+from Services.Tracing import span
+from ._api_helpers import _make_api_request, _stream_api_batches, _cached_api_read, ApiStreamError
 
 logger = logging.getLogger(__name__)
 
+# Most recent transactions listed by get_all_transactions / get_transactions_by_account_id; the
+# rest are only counted and totalled.
+TRANSACTION_DIGEST_ITEMS = int(os.getenv("FINBOT_TRANSACTION_DIGEST_ITEMS", "20"))
+
 GET_TRANSACTION_CATEGORIES_TOOL = {
     "name": "get_transaction_categories",
     "description": "Lists all user-defined transaction categories (for both income and expense). Useful for seeing available categories before adding a transaction.",
@@ -41,38 +51,84 @@ CREATE_TRANSACTION_TOOL = {
     }
 }
 
-GET_ALL_TRANSACTIONS_TOOL = {"name": "get_all_transactions", "description": "Lists all transactions.", "parameters": {}}
+GET_ALL_TRANSACTIONS_TOOL = {"name": "get_all_transactions", "description": "Lists the user's most recent transactions with the count and totals of all of them.", "parameters": {}}
 GET_TRANSACTIONS_BY_ACCOUNT_TOOL = {
     "name": "get_transactions_by_account_id",
-    "description": "Lists all transactions for a specific account.",
+    "description": "Lists the most recent transactions of a specific account with the count and totals of all of them.",
     "parameters": {
         "type": "OBJECT", "properties": {"accountId": {"type": "INTEGER", "description": "The ID of the account."}}, "required": ["accountId"]
     }
 }
 
-def get_transaction_categories(auth_token: Optional[str]) -> List[Dict[str, Any]]:
+async def get_transaction_categories(auth_token: Optional[str]) -> List[Dict[str, Any]]:
     logger.info("Python: get_transaction_categories called.")
-    return _make_api_request("/TransactionCategory", auth_token)
+    return await _make_api_request("/TransactionCategory", auth_token)
 
-def create_transaction_category(name: str, type: str, auth_token: Optional[str]) -> Dict[str, Any]:
+async def create_transaction_category(name: str, type: str, auth_token: Optional[str]) -> Dict[str, Any]:
     logger.info(f"Python: create_transaction_category called. Name: {name}, Type: {type}")
     if type.lower() not in ['income', 'expense']:
         return {"error": "Invalid category type. Must be 'Income' or 'Expense'."}
     payload = {"name": name, "type": type.capitalize()}
-    return _make_api_request("/TransactionCategory", auth_token, method="POST", json_data=payload)
+    return await _make_api_request("/TransactionCategory", auth_token, method="POST", json_data=payload)
 
-def create_transaction(categoryId: int, accountId: int, amount: Decimal, currency: str, transactionDateUtc: str, auth_token: Optional[str], description: Optional[str] = None) -> Dict[str, Any]:
+async def create_transaction(categoryId: int, accountId: int, amount: Decimal, currency: str, transactionDateUtc: str, auth_token: Optional[str], description: Optional[str] = None) -> Dict[str, Any]:
     logger.info(f"Python: create_transaction called. CategoryID: {categoryId}, AccountID: {accountId}, Amount: {amount}")
     payload = {"categoryId": categoryId, "accountId": accountId, "amount": amount, "currency": currency.upper(), "transactionDateUtc": transactionDateUtc, "description": description}
-    return _make_api_request("/Transactions", auth_token, method="POST", json_data=payload)
+    return await _make_api_request("/Transactions", auth_token, method="POST", json_data=payload)
+
+def _transactions_endpoint(accountId: Optional[int]) -> str:
+    return f"/Transactions/account-id/{accountId}" if accountId is not None else "/Transactions"
+
+async def aggregate_transactions(aggregator: TransactionAggregator, auth_token: Optional[str], accountId: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Streams the user's transactions (or one account's) through the aggregator batch by batch.
+    Returns the error result when the request fails, otherwise None.
+    """
+    endpoint = _transactions_endpoint(accountId)
+    with span("api_stream", endpoint=endpoint) as stream_span:
+        try:
+            async with aclosing(_stream_api_batches(endpoint, auth_token)) as batches:
+                async for batch in batches:
+                    await run_blocking(aggregator.add, batch)
+                    stream_span.set(items=aggregator.count)
+        except ApiStreamError as e:
+            stream_span.set(error=e.result.get("error"))
+            # FinTrack answers 404 when there are no transactions yet; that is an empty result, not an error.
+            if e.result.get("error") != "API Error: 404":
+                return e.result
+    return None
+
+async def read_transaction_result(auth_token: Optional[str], accountId: Optional[int], variant: Dict[str, Any],
+                                  make_aggregator: Callable[[], TransactionAggregator], build: Callable[[TransactionAggregator], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Streams the transactions into a new aggregator and builds the tool result from it. Concurrent
+    identical requests share one stream and the finished result is cached (see _cached_api_read);
+    `variant` must name the result and every argument it depends on.
+    """
+    async def read() -> Dict[str, Any]:
+        aggregator = make_aggregator()
+        return await aggregate_transactions(aggregator, auth_token, accountId) or build(aggregator)
+    return await _cached_api_read(_transactions_endpoint(accountId), auth_token, variant, read)
+
+def _transaction_digest(aggregator: TransactionAggregator) -> Dict[str, Any]:
+    recent = aggregator.recent()
+    return {
+        "count": aggregator.count,
+        "totals": [group.to_dict() for group in sorted(aggregator.group_totals(), key=lambda group: (group.key, group.currency))],
+        "recent": recent,
+        "omittedItems": aggregator.count - len(recent),
+    }
 
-def get_all_transactions(auth_token: Optional[str]) -> List[Dict[str, Any]]:
+async def get_all_transactions(auth_token: Optional[str]) -> Dict[str, Any]:
     logger.info("Python: get_all_transactions called.")
-    return _make_api_request("/Transactions", auth_token)
+    return await read_transaction_result(auth_token, None, {"result": "digest", "recent": TRANSACTION_DIGEST_ITEMS},
+                                         lambda: TransactionAggregator(group_by="type", recent=TRANSACTION_DIGEST_ITEMS), _transaction_digest)
 
-def get_transactions_by_account_id(accountId: int, auth_token: Optional[str]) -> List[Dict[str, Any]]:
+async def get_transactions_by_account_id(accountId: int, auth_token: Optional[str]) -> Dict[str, Any]:
     logger.info(f"Python: get_transactions_by_account_id called. Account ID: {accountId}")
-    return _make_api_request(f"/Transactions/account-id/{accountId}", auth_token)
+    return await read_transaction_result(auth_token, accountId, {"result": "digest", "recent": TRANSACTION_DIGEST_ITEMS},
+                                         lambda: TransactionAggregator(group_by="type", recent=TRANSACTION_DIGEST_ITEMS), _transaction_digest)
 
 TRANSACTION_AVAILABLE_TOOLS = [GET_TRANSACTION_CATEGORIES_TOOL, CREATE_TRANSACTION_CATEGORY_TOOL, CREATE_TRANSACTION_TOOL, GET_ALL_TRANSACTIONS_TOOL, GET_TRANSACTIONS_BY_ACCOUNT_TOOL]
+TRANSACTION_ROUTING_KEYWORDS = ["transaction", "transactions", "spend", "spent", "spending", "expense", "expenses", "income", "purchase", "payment", "paid", "buy", "bought", "month", "earned", "salary", "history", "record"]
 TRANSACTION_FUNCTION_MAPPING = {"get_transaction_categories": get_transaction_categories, "create_transaction_category": create_transaction_category, "create_transaction": create_transaction, "get_all_transactions": get_all_transactions, "get_transactions_by_account_id": get_transactions_by_account_id}
\ No newline at end of file
@@ -1,20 +1,56 @@
 import json
 import logging
 import os
-from typing import List, Dict, Any, Optional
-import requests
-from decimal import Decimal
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable
+import httpx
+
+from Services.HttpClients import get_http_client, FINTRACK_POOL
+from Services.ApiResponseCache import ApiResponseCache, API_CACHE_ENABLED, user_identity
+from Services.SingleFlight import SingleFlight
+from Services.StreamParser import JsonArrayStreamParser
+from Services.Tracing import traced, set_span_attributes
+from Services.StructuredLogging import log_fields
+from Services.JsonCodec import dumps_bytes, loads
 
 logger = logging.getLogger(__name__)
 FINTRACK_API_BASE_URL = os.getenv("FINTRACK_API_BASE_URL", "http://localhost:8090")
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return str(obj)
-        return super(DecimalEncoder, self).default(obj)
+# Seconds a GET response stays cached, by endpoint prefix (the longest matching prefix wins).
+# Endpoints without a prefix here are never cached. Override with e.g. '{"/Transactions": 10}'.
+API_CACHE_TTLS: Dict[str, float] = {
+    "/Account": 30,
+    "/Budgets": 30,
+    "/Categories": 300,
+    "/TransactionCategory": 300,
+    "/Transactions": 30,
+    "/Membership": 30,
+    "/Membership/plans": 600,
+    **json.loads(os.getenv("FINBOT_API_CACHE_TTLS", "{}")),
+}
+# Cached endpoint prefixes a write may change. Transactions also move account balances and
+# budget progress; a write to an unlisted endpoint drops all of the user's entries.
+API_CACHE_INVALIDATIONS: Dict[str, List[str]] = {
+    "/Account": ["/Account"],
+    "/Budgets": ["/Budgets"],
+    "/TransactionCategory": ["/TransactionCategory", "/Categories"],
+    "/Transactions": ["/Transactions", "/Account", "/Budgets"],
+    "/Membership": ["/Membership", "/Membership/plans"],
+}
+
+API_RESPONSE_CACHE = ApiResponseCache()
+SINGLE_FLIGHT_ENABLED = os.getenv("FINBOT_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+_api_reads_in_flight = SingleFlight("fintrack_get", copy_results=False)
+# Streamed reads hand back a result built from the stream, which callers may change, so each gets a copy.
+_api_streams_in_flight = SingleFlight("fintrack_stream")
+# Items handed to the caller at a time by _stream_api_batches; bounds the parsed objects held per request.
+STREAM_BATCH_SIZE = int(os.getenv("FINBOT_STREAM_BATCH_SIZE", "2000"))
+
+def _match_prefix(endpoint: str, prefixes) -> Optional[str]:
+    matches = [prefix for prefix in prefixes if endpoint == prefix or endpoint.startswith(prefix + "/")]
+    return max(matches, key=len) if matches else None
 
-def _make_api_request(endpoint: str, auth_token: Optional[str], method: str = "GET", params: Optional[Dict] = None, json_data: Optional[Dict] = None) -> Dict[str, Any] | List[Dict[str, Any]]:
+@traced("api_request")
+async def _make_api_request(endpoint: str, auth_token: Optional[str], method: str = "GET", params: Optional[Dict] = None, json_data: Optional[Dict] = None) -> Dict[str, Any] | List[Dict[str, Any]]:
     if not auth_token:
         logger.error("Auth Token not provided for API request. Endpoint: %s", endpoint)
         return {"error": "Authentication token is missing."}
@@ -23,29 +59,134 @@ def _make_api_request(endpoint: str, auth_token: Optional[str], method: str = "G
     serialized_data = None
     if method.upper() in ["POST", "PUT"] and json_data is not None:
         headers["Content-Type"] = "application/json"
-        serialized_data = json.dumps(json_data, cls=DecimalEncoder)
+        serialized_data = dumps_bytes(json_data)
 
     url = f"{FINTRACK_API_BASE_URL}{endpoint}"
-    
+    set_span_attributes(method=method.upper(), endpoint=endpoint)
+    identity = user_identity(auth_token)
+    cache_group = _match_prefix(endpoint, API_CACHE_TTLS) if API_CACHE_ENABLED and method.upper() == "GET" else None
+    if cache_group is not None:
+        cache_key = API_RESPONSE_CACHE.make_key(identity, endpoint, params)
+        cached = API_RESPONSE_CACHE.get(cache_key, cache_group)
+        if cached is not None:
+            logger.info(f"Python: Served {method} {url} from the API cache.")
+            set_span_attributes(cache="hit")
+            return cached
+        cache_generation = API_RESPONSE_CACHE.generation()
+
     try:
-        logger.info(f"Python: Sending request to API: {method} {url}, Data: {serialized_data or json_data}")
-        response = requests.request(method=method.upper(), url=url, headers=headers, params=params, data=serialized_data, timeout=15)
+        logger.info(f"Python: Sending request to API: {method} {url}", extra=log_fields(params=params, payload=json_data))
+        if SINGLE_FLIGHT_ENABLED and method.upper() == "GET":
+            # Only reads are collapsed; a write must reach the API once per caller.
+            flight_key = (identity, method.upper(), url, tuple(sorted((str(name), str(value)) for name, value in (params or {}).items())))
+            response = await _api_reads_in_flight.do(flight_key, lambda: get_http_client(FINTRACK_POOL).request("GET", url, headers=headers, params=params))
+        else:
+            response = await get_http_client(FINTRACK_POOL).request(method.upper(), url, headers=headers, params=params, content=serialized_data)
         
+        set_span_attributes(status_code=response.status_code, response_bytes=len(response.content))
         if response.status_code == 204:
             logger.info(f"API returned 204 No Content. Endpoint: {url}")
             return {"message": "Operation completed successfully."} if method.upper() == "DELETE" else {}
             
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
+        result = loads(response.content)
+        if cache_group is not None and response.status_code == 200:
+            API_RESPONSE_CACHE.put(cache_key, cache_group, response.content, API_CACHE_TTLS[cache_group], cache_generation)
+        return result
+    except httpx.HTTPStatusError as http_err:
         logger.error(f"Python: API HTTP Error: {http_err} - Response: {getattr(http_err.response, 'text', 'No response')}")
         try:
-            return {"error": f"API Error: {http_err.response.status_code}", "details": http_err.response.json()}
+            return {"error": f"API Error: {http_err.response.status_code}", "details": loads(http_err.response.content)}
         except ValueError:
             return {"error": f"API Error: {http_err.response.status_code}", "details": http_err.response.text}
-    except requests.exceptions.RequestException as req_err:
+    except httpx.RequestError as req_err:
         logger.error(f"Python: API Request Error: {req_err}")
         return {"error": f"Unable to reach API: {req_err}"}
     except Exception as e:
         logger.error(f"Python: General error in API request: {e}", exc_info=True)
-        return {"error": f"An unknown error occurred: {e}"}
\ No newline at end of file
+        return {"error": f"An unknown error occurred: {e}"}
+    finally:
+        # Writes invalidate even when they fail: a timed-out request may still have been applied.
+        if API_CACHE_ENABLED and method.upper() != "GET":
+            write_group = _match_prefix(endpoint, API_CACHE_INVALIDATIONS)
+            API_RESPONSE_CACHE.invalidate(identity, API_CACHE_INVALIDATIONS[write_group] if write_group else API_CACHE_TTLS)
+
+async def _cached_api_read(endpoint: str, auth_token: Optional[str], variant: Dict[str, Any], read: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Runs `read`, a GET of `endpoint` reduced to a result (e.g. a streamed transaction digest),
+    behind the same API cache and single-flight as _make_api_request. The result is cached under
+    the endpoint's key extended by `variant`, which names the reduction and its arguments, in the
+    endpoint's cache group, so the writes that invalidate the endpoint drop it too. Error results
+    are not cached.
+    """
+    if not auth_token:
+        return await read()
+    identity = user_identity(auth_token)
+    cache_group = _match_prefix(endpoint, API_CACHE_TTLS) if API_CACHE_ENABLED else None
+    cache_key = API_RESPONSE_CACHE.make_key(identity, endpoint, variant)
+    if cache_group is not None:
+        cached = API_RESPONSE_CACHE.get(cache_key, cache_group)
+        if cached is not None:
+            logger.info(f"Python: Served GET {endpoint} ({variant}) from the API cache.")
+            return cached
+        cache_generation = API_RESPONSE_CACHE.generation()
+
+    result = await (_api_streams_in_flight.do(cache_key, read) if SINGLE_FLIGHT_ENABLED else read())
+    if cache_group is not None and not (isinstance(result, dict) and "error" in result):
+        API_RESPONSE_CACHE.put(cache_key, cache_group, dumps_bytes(result), API_CACHE_TTLS[cache_group], cache_generation)
+    return result
+
+class ApiStreamError(Exception):
+    """Raised by _stream_api_batches with the error payload _make_api_request would have returned."""
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("error"))
+        self.result = result
+
+async def _stream_api_batches(endpoint: str, auth_token: Optional[str], params: Optional[Dict] = None, batch_size: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yields the items of a JSON array response in lists of up to `batch_size` (default
+    STREAM_BATCH_SIZE) while the body is
+    still downloading, so a large result is never held in memory as a whole.
+
+    The body is decoded incrementally (JsonArrayStreamParser) and the items are dropped once the
+    caller has seen them. The body itself is never stored, so callers share and cache what they
+    reduce it to through _cached_api_read. Raises ApiStreamError on failure.
+    """
+    if not auth_token:
+        logger.error("Auth Token not provided for API request. Endpoint: %s", endpoint)
+        raise ApiStreamError({"error": "Authentication token is missing."})
+
+    headers = {"Authorization": f"Bearer {auth_token}", "Accept": "application/json"}
+    url = f"{FINTRACK_API_BASE_URL}{endpoint}"
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    parser = JsonArrayStreamParser()
+    items: List[Dict[str, Any]] = []
+    try:
+        logger.info(f"Python: Streaming response from API: GET {url}")
+        async with get_http_client(FINTRACK_POOL).stream("GET", url, headers=headers, params=params) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                logger.error(f"Python: API HTTP Error: {response.status_code} for {url} - Response: {body[:500]}")
+                try:
+                    details = loads(body)
+                except ValueError:
+                    details = body
+                raise ApiStreamError({"error": f"API Error: {response.status_code}", "details": details})
+            if response.status_code == 204:
+                return
+            async for chunk in response.aiter_bytes():
+                items.extend(parser.feed(chunk))
+                while len(items) >= batch_size:
+                    batch = items[:batch_size]
+                    del items[:batch_size]
+                    yield batch
+            parser.close()
+            if items:
+                yield items
+    except httpx.RequestError as req_err:
+        logger.error(f"Python: API Request Error: {req_err}")
+        raise ApiStreamError({"error": f"Unable to reach API: {req_err}"}) from req_err
+    except ValueError as json_err:
+        logger.error(f"Python: Invalid JSON streamed from {url}: {json_err}")
+        raise ApiStreamError({"error": f"An unknown error occurred: {json_err}"}) from json_err
@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for serving FinBot with several worker processes (Uvicorn workers):
+
+    gunicorn FinBotWebApi:app
+
+Each worker imports the app once and keeps its tool registries, FAQ index, caches and HTTP pools
+for its lifetime. Per-worker state to keep in mind:
+
+- Chat history has to be shared, since consecutive turns of a session may reach different
+  workers; with more than one worker the SQLite history backend is the default.
+- Response, API and Ollama-context caches are per worker; a miss only costs speed. API cache
+  invalidation on writes is also per worker, so another worker may serve a cached read for up to
+  its FINBOT_API_CACHE_TTLS entry.
+- FINBOT_LLM_MAX_CONCURRENCY limits each worker; set FINBOT_LLM_TOTAL_CONCURRENCY to split one
+  limit for Ollama across all workers instead.
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('FINBOT_PORT', '8000')}"
+workers = int(os.getenv("FINBOT_WORKERS", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+# Longer than the slowest Ollama call (FINBOT_OLLAMA_READ_TIMEOUT, 120s by default).
+timeout = int(os.getenv("FINBOT_WORKER_TIMEOUT", "180"))
+graceful_timeout = int(os.getenv("FINBOT_WORKER_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Set before any worker imports prometheus_client, so every worker writes its samples there and
+# /metrics can merge them (Services/Metrics.py).
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/finbot-prometheus")
+if workers > 1:
+    os.environ.setdefault("FINBOT_HISTORY_BACKEND", "sqlite")
+if os.getenv("FINBOT_LLM_TOTAL_CONCURRENCY"):
+    os.environ["FINBOT_LLM_MAX_CONCURRENCY"] = str(max(1, int(os.environ["FINBOT_LLM_TOTAL_CONCURRENCY"]) // workers))
+
+def on_starting(server):
+    from Services.Metrics import reset_multiprocess_dir
+    reset_multiprocess_dir()
+
+def child_exit(server, worker):
+    from Services.Metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)